@@ -0,0 +1,191 @@
+import contextlib
+import glob
+import os
+import queue
+import re
+import threading
+import wave
+
+import numpy as np
+
+
+FORMATS = ("wav", "flac")
+
+
+class ResponseArchiver:
+    """
+    Keeps the audio of the last `keep` responses in `directory` as response-1
+    (newest) to response-`keep`, 24 kHz mono PCM16 in WAV or, if the soundfile
+    package is installed, FLAC files.
+
+    Chunks are streamed to a temporary file by a writer thread as they arrive, so
+    neither memory nor the event loop pays for long answers. `commit` closes the
+    file and, still on the writer thread, rotates the history and renames the new
+    file into place with an atomic replace. `save` stores a whole response at once
+    (e.g. from say()), apart from the one in progress.
+    """
+
+    def __init__(self, directory, keep=3, fmt="wav", rate=24000):
+        self.directory = directory
+        self.keep = keep
+        self.rate = rate
+        self.format = fmt
+        if fmt not in FORMATS:
+            print(f"⚠️ Unknown response history format '{fmt}', using wav")
+            self.format = "wav"
+        elif fmt == "flac":
+            try:
+                import soundfile  # noqa: F401
+            except ImportError:
+                print("⚠️ FLAC response history needs the soundfile package, using wav")
+                self.format = "wav"
+
+        # Bytes of the response in progress, as seen by the caller.
+        self.pending = 0
+        self._file = None
+        self._path = None
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="billy-archiver", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, chunk: bytes):
+        """Append a PCM16 chunk to the response in progress."""
+        if self.keep <= 0 or not chunk:
+            return
+        self.pending += len(chunk)
+        self._queue.put(("write", chunk))
+
+    def commit(self) -> int:
+        """Save the response in progress as response-1; returns its size in bytes."""
+        size, self.pending = self.pending, 0
+        if size:
+            self._queue.put(("commit", None))
+        return size
+
+    def save(self, pcm: bytes):
+        """Save a complete PCM16 response as response-1."""
+        if self.keep > 0 and pcm:
+            self._queue.put(("save", pcm))
+
+    def discard(self):
+        """Drop the response in progress, e.g. after an interruption."""
+        if self.pending:
+            self.pending = 0
+            self._queue.put(("discard", None))
+
+    def flush(self, timeout=5.0) -> bool:
+        """
+        Wait until everything queued so far has been written; False if that took
+        longer than `timeout` seconds or the writer thread is gone.
+        """
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            action, payload = self._queue.get()
+            try:
+                if action == "write":
+                    self._write(payload)
+                elif action == "commit":
+                    self._commit()
+                elif action == "save":
+                    self._save(payload)
+                elif action == "discard" and self._file is not None:
+                    self._close()
+                    os.remove(self._path)
+                elif action == "flush":
+                    payload.set()
+            except Exception as e:
+                # Whatever went wrong, e.g. a wave.Error, the thread has to live on
+                # for the next response.
+                print(f"⚠️ Saving response audio failed: {e}")
+                if action != "save":
+                    self._drop()
+
+    def _write(self, chunk):
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._path = os.path.join(self.directory, f".response.tmp.{self.format}")
+            self._file = self._open(self._path)
+        self._append(self._file, chunk)
+
+    def _append(self, file, chunk):
+        if self.format == "flac":
+            file.write(np.frombuffer(chunk, dtype=np.int16))
+        else:
+            # The header is patched once, on close.
+            file.writeframesraw(chunk)
+
+    def _open(self, path):
+        if self.format == "flac":
+            import soundfile
+
+            return soundfile.SoundFile(
+                path, "w", self.rate, 1, subtype="PCM_16", format="FLAC"
+            )
+        # Stays open across writes until _close() or _save() closes it.
+        wf = wave.open(path, "wb")  # noqa: SIM115
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(self.rate)
+        return wf
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _drop(self):
+        """Forget the response in progress after a failure, and its partial file."""
+        file, self._file = self._file, None
+        if file is None:
+            return
+        with contextlib.suppress(Exception):
+            file.close()
+        with contextlib.suppress(OSError):
+            os.remove(self._path)
+
+    def _commit(self):
+        if self._file is None:
+            return
+        self._close()
+        self._publish(self._path)
+
+    def _save(self, pcm):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f".response.save.tmp.{self.format}")
+        file = self._open(path)
+        try:
+            self._append(file, pcm)
+        finally:
+            file.close()
+        self._publish(path)
+
+    def _publish(self, path):
+        """Rotate the history and move the finished file at `path` to response-1."""
+        self.rotate()
+        target = self.history_path(1)
+        os.replace(path, target)
+        print(f"🎨 Saved response audio to {target}")
+
+    def history_path(self, index, fmt=None):
+        return os.path.join(self.directory, f"response-{index}.{fmt or self.format}")
+
+    def rotate(self):
+        """Make room for a new response-1, dropping what falls off the end."""
+        for path in glob.glob(os.path.join(self.directory, "response-*.*")):
+            match = re.fullmatch(r"response-(\d+)\.(wav|flac)", os.path.basename(path))
+            if match and int(match.group(1)) >= self.keep:
+                os.remove(path)
+        for index in range(self.keep - 1, 0, -1):
+            for fmt in FORMATS:
+                if os.path.exists(self.history_path(index, fmt)):
+                    os.replace(
+                        self.history_path(index, fmt), self.history_path(index + 1, fmt)
+                    )
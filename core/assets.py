@@ -0,0 +1,146 @@
+import glob
+import os
+import threading
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+from .config import PLAYBACK_VOLUME
+from .resample import StreamingResampler, to_int16
+
+
+SOUNDS_DIR = "sounds"
+WAKE_UP_DIR = os.path.join(SOUNDS_DIR, "wake-up", "custom")
+WAKE_UP_DIR_DEFAULT = os.path.join(SOUNDS_DIR, "wake-up", "default")
+SYSTEM_CLIPS = ("error", "noapikey", "nowifi", "speakertest")
+OUTPUT_RATE = 48000
+ANALYSIS_RATE = 24000
+
+
+@dataclass
+class Clip:
+    """A sound decoded once and kept ready for the output engine."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    frames: np.ndarray  # 48 kHz stereo int16, what the output engine plays
+    mono: np.ndarray  # 24 kHz mono int16, what the lip-sync planner analyses
+
+    @property
+    def duration(self) -> float:
+        return len(self.frames) / OUTPUT_RATE
+
+    @property
+    def nbytes(self) -> int:
+        return self.frames.nbytes + self.mono.nbytes
+
+
+# Clips are cached by path and revalidated against the file's mtime and size on
+# every lookup (a stat is far cheaper than re-reading the WAV from the SD card), so
+# clips the webconfig regenerates are picked up on the next press.
+_clips: dict[str, Clip] = {}
+_dirs: dict[str, tuple[int, list[str]]] = {}
+_lock = threading.Lock()
+
+
+def _decode(path, stat) -> Clip:
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV files are supported")
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    mono = samples.reshape((-1, channels)).mean(axis=1, dtype=np.float32)
+    out = to_int16(
+        StreamingResampler(rate, OUTPUT_RATE).process(mono), gain=PLAYBACK_VOLUME
+    )
+    return Clip(
+        path=path,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        frames=np.repeat(out[:, np.newaxis], 2, axis=1),
+        mono=StreamingResampler(rate, ANALYSIS_RATE).process_int16(mono),
+    )
+
+
+def load(path) -> Clip:
+    """Return the decoded clip for `path`, reading it only if it is new or changed."""
+    path = os.path.normpath(path)
+    stat = os.stat(path)
+    with _lock:
+        clip = _clips.get(path)
+        if clip and clip.mtime_ns == stat.st_mtime_ns and clip.size == stat.st_size:
+            return clip
+
+    clip = _decode(path, stat)
+    with _lock:
+        _clips[path] = clip
+    return clip
+
+
+def system_clip(name) -> Clip | None:
+    """One of the sounds/<name>.wav clips, or None if the file doesn't exist."""
+    path = os.path.join(SOUNDS_DIR, f"{name}.wav")
+    try:
+        return load(path)
+    except FileNotFoundError:
+        return None
+
+
+def _list_wavs(directory) -> list[str]:
+    # Adding, removing or renaming a file bumps the directory mtime.
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _lock:
+        cached = _dirs.get(directory)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    paths = sorted(
+        os.path.normpath(p) for p in glob.glob(os.path.join(directory, "*.wav"))
+    )
+    with _lock:
+        _dirs[directory] = (mtime, paths)
+        for stale in [
+            p for p in _clips if os.path.dirname(p) == os.path.normpath(directory)
+        ]:
+            if stale not in paths:
+                del _clips[stale]
+    return paths
+
+
+def wake_up_clip_paths() -> list[str]:
+    """Custom wake-up clips, or the default ones if there are no custom clips."""
+    return _list_wavs(WAKE_UP_DIR) or _list_wavs(WAKE_UP_DIR_DEFAULT)
+
+
+def memory_bytes() -> int:
+    with _lock:
+        return sum(clip.nbytes for clip in _clips.values())
+
+
+def preload():
+    """Decode the wake-up and system clips up front, so no press waits on the disk."""
+    paths = wake_up_clip_paths() + [
+        os.path.join(SOUNDS_DIR, f"{name}.wav") for name in SYSTEM_CLIPS
+    ]
+    for path in paths:
+        try:
+            load(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not load {path}: {e}")
+
+    with _lock:
+        count = len(_clips)
+        seconds = sum(clip.duration for clip in _clips.values())
+    print(
+        f"📦 Cached {count} sound clips ({seconds:.1f}s of audio, "
+        f"{memory_bytes() / 1024 / 1024:.1f} MB)"
+    )
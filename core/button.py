@@ -1,4 +1,3 @@
-import asyncio
 import contextlib
 import threading
 import time
@@ -6,7 +5,7 @@ from concurrent.futures import CancelledError
 
 from gpiozero import Button
 
-from . import audio, config
+from . import assets, audio, config, realtime, runtime, trace
 from .movements import move_head
 from .session import BillySession
 
@@ -59,40 +58,59 @@ def on_button():
                 # and that will raise CancelledError because it's a logical place to
                 # stop.
                 with contextlib.suppress(CancelledError):
-                    future = asyncio.run_coroutine_threadsafe(
-                        session_instance.stop_session(), session_instance.loop
-                    )
-                    future.result()  # Wait until it's fully stopped
+                    # Wait until it's fully stopped
+                    runtime.run(session_instance.stop_session())
                 print("✅ Session stopped.")
             except Exception as e:
                 print(f"⚠️ Error stopping session ({type(e)}): {e}")
         is_active = False  # ✅ Ensure this is always set after stopping
         return
 
+    press_time = time.monotonic()
+    trace.begin("conversation", start=press_time)
+    trace.mark("button", press_time)
     audio.ensure_playback_worker_started(config.CHUNK_MS)
-    threading.Thread(target=audio.play_random_wake_up_clip, daemon=True).start()
     is_active = True
     interrupt_event = threading.Event()  # Fresh event for each session
+    session_instance = BillySession(
+        interrupt_event=interrupt_event, press_time=press_time
+    )
+    session_instance.last_activity[0] = time.time()
     print("🎤 Button pressed. Listening...")
 
-    def run_session():
-        global session_instance, is_active
+    # The wake-up clip plays while the session connects and the mic already
+    # captures, instead of holding up either of them.
+    threading.Thread(
+        target=play_wake_up_clip, args=(session_instance,), daemon=True
+    ).start()
+
+    def run_session(session):
+        global is_active
         try:
             move_head("on")
-            session_instance = BillySession(interrupt_event=interrupt_event)
-            session_instance.last_activity[0] = time.time()
-            asyncio.run(session_instance.start())
+            runtime.run(session.start())
         finally:
             move_head("off")
             is_active = False
             print("🕐 Waiting for button press...")
 
-    session_thread = threading.Thread(target=run_session, daemon=True)
+    session_thread = threading.Thread(
+        target=run_session, args=(session_instance,), daemon=True
+    )
     session_thread.start()
 
 
+def play_wake_up_clip(session: BillySession):
+    try:
+        audio.play_random_wake_up_clip()
+    finally:
+        session.wake_clip_finished()
+
+
 def start_loop():
     audio.detect_devices(debug=config.DEBUG_MODE)
+    assets.preload()
+    realtime.request_prewarm()
     button.when_pressed = on_button
     print("🎦 Ready. Press button to start a voice session. Press Ctrl+C to quit.")
     print("🕐 Waiting for button press...")
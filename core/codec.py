@@ -0,0 +1,129 @@
+from functools import cache
+
+import numpy as np
+
+from .resample import StreamingResampler
+
+
+# PCM16 audio on the realtime API, and everywhere in Billy's playback path, is
+# 24 kHz mono; G.711 is 8 kHz, one byte per sample.
+API_RATE = 24000
+
+
+def _ulaw_tables():
+    """G.711 μ-law encode (int16 → byte, indexed by the uint16 view) and decode LUTs."""
+    x = np.arange(-32768, 32768, dtype=np.int32)
+    sign = np.where(x < 0, 0x80, 0)
+    # 14-bit magnitude, rounded like the reference implementation (and audioop);
+    # the clip keeps the loudest values in the top segment.
+    magnitude = np.minimum(np.abs(x >> 2), 8158) + 0x21
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    mantissa = (magnitude >> (exponent + 1)) & 0x0F
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[x & 0xFFFF] = ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    magnitude = (((u & 0x0F) << 3) + 0x84) << ((u >> 4) & 0x07)
+    decode = np.where(u & 0x80, 0x84 - magnitude, magnitude - 0x84).astype(np.int16)
+    return encode, decode
+
+
+def _alaw_tables():
+    """G.711 A-law encode (int16 → byte, indexed by the uint16 view) and decode LUTs."""
+    x = np.arange(-32768, 32768, dtype=np.int32)
+    sign = np.where(x >= 0, 0x80, 0)
+    magnitude = np.where(x >= 0, x, -x - 1)
+    segment = np.floor(np.log2(np.maximum(magnitude, 1))).astype(np.int32) - 7
+    exponent = np.where(magnitude >= 256, segment, 0)
+    mantissa = np.where(magnitude >= 256, magnitude >> (exponent + 3), magnitude >> 4)
+    mantissa &= 0x0F
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[x & 0xFFFF] = (sign | (exponent << 4) | mantissa) ^ 0x55
+
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (a >> 4) & 0x07
+    magnitude = ((a & 0x0F) << 4) + 8
+    magnitude = np.where(
+        exponent > 0, (magnitude + 0x100) << np.maximum(exponent - 1, 0), magnitude
+    )
+    decode = np.where(a & 0x80, magnitude, -magnitude).astype(np.int16)
+    return encode, decode
+
+
+class Codec:
+    """
+    One of the realtime API's audio formats. G.711 codecs are table lookups:
+    `encode` maps int16 samples to bytes and `decode` maps bytes back to int16,
+    without Python loops.
+    """
+
+    def __init__(self, name, rate, tables=None):
+        self.name = name
+        self.rate = rate
+        self._encode, self._decode = tables or (None, None)
+
+    @property
+    def bytes_per_sample(self) -> int:
+        return 2 if self._encode is None else 1
+
+    def encode(self, samples: np.ndarray) -> bytes:
+        samples = np.asarray(samples, dtype=np.int16)
+        if self._encode is None:
+            return samples.tobytes()
+        return self._encode[samples.view(np.uint16)].tobytes()
+
+    def decode(self, data: bytes) -> np.ndarray:
+        if self._decode is None:
+            return np.frombuffer(data, dtype=np.int16)
+        return self._decode[np.frombuffer(data, dtype=np.uint8)]
+
+
+CODECS = {
+    "pcm16": Codec("pcm16", API_RATE),
+    "g711_ulaw": Codec("g711_ulaw", 8000, _ulaw_tables()),
+    "g711_alaw": Codec("g711_alaw", 8000, _alaw_tables()),
+}
+
+
+@cache
+def get(name: str) -> Codec:
+    """The codec called `name`; unknown names fall back to pcm16 (warned once)."""
+    codec = CODECS.get(name)
+    if codec is None:
+        print(f"⚠️ Unknown audio codec '{name}', using pcm16")
+        return CODECS["pcm16"]
+    return codec
+
+
+class Encoder:
+    """Resamples a continuous stream from `src_rate` to the codec's rate and encodes it."""
+
+    def __init__(self, codec: Codec, src_rate: int):
+        self.codec = codec
+        self.src_rate = src_rate
+        self.resampler = StreamingResampler(src_rate, codec.rate)
+
+    def reset(self):
+        self.resampler.reset()
+
+    def encode(self, samples) -> bytes:
+        return self.codec.encode(self.resampler.process_int16(samples))
+
+
+class Decoder:
+    """
+    Decodes a continuous stream of audio deltas to PCM16 bytes at `dst_rate`, the
+    format the playback worker, lip-sync and response history expect.
+    """
+
+    def __init__(self, codec: Codec, dst_rate=API_RATE):
+        self.codec = codec
+        self.resampler = StreamingResampler(codec.rate, dst_rate)
+
+    def reset(self):
+        self.resampler.reset()
+
+    def decode(self, data: bytes) -> bytes:
+        if self.resampler.passthrough and self.codec.bytes_per_sample == 2:
+            return data
+        return self.resampler.process_int16(self.codec.decode(data)).tobytes()
@@ -75,6 +75,19 @@ Use your backstory to inspire jokes, metaphors, or occasional references in conv
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini-realtime-preview")
 VOICE = os.getenv("VOICE", "ash")
+# Base URI of the realtime API; point it at test/mock_realtime.py to run offline.
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime"
+)
+
+# === Realtime Connection ===
+# Keep a configured realtime session connected between button presses. Off by
+# default: an idle connection is held open (and renewed) even if nobody talks.
+REALTIME_PREWARM = os.getenv("REALTIME_PREWARM", "false").lower() == "true"
+# How long a pre-warm requested over MQTT (billy/prewarm) is kept alive.
+REALTIME_PREWARM_HOLD_SECONDS = int(os.getenv("REALTIME_PREWARM_HOLD_SECONDS", "300"))
+# Reconnect idle pre-warmed sessions before the server's 30 minute session limit.
+REALTIME_SESSION_MAX_AGE = int(os.getenv("REALTIME_SESSION_MAX_AGE", "1500"))
 
 # === Modes ===
 DEBUG_MODE = os.getenv("DEBUG_MODE", "true").lower() == "true"
@@ -84,18 +97,62 @@ DEBUG_MODE_INCLUDE_DELTA = (
 TEXT_ONLY_MODE = os.getenv("TEXT_ONLY_MODE", "false").lower() == "true"
 RUN_MODE = os.getenv("RUN_MODE", "normal").lower()
 
+# === Session Recording ===
+# Record every realtime session's websocket events (and so the mic audio sent) to
+# gzipped JSON lines in this directory, for test/replay_session.py (empty = off).
+SESSION_RECORD_DIR = os.getenv("SESSION_RECORD_DIR", "")
+
+# === Latency Tracing ===
+# Per-turn latency traces are appended here as JSON lines (empty = don't write).
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(ROOT_DIR, "traces", "turns.jsonl"))
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(1024 * 1024)))
+# How many recent traces the p50/p95 summary on billy/latency is computed over.
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "200"))
+
 # === Billy Hardware ===
 BILLY_MODEL = os.getenv("BILLY_MODEL", "modern").strip().lower()
 BILLY_PINS = os.getenv("BILLY_PINS", "new").strip().lower()
+# "auto" (MotorKit with the adafruit_motor_hat pin profile, otherwise none),
+# "motorkit", "simulator" (records a command timeline, no hardware) or "none".
+MOTOR_DRIVER = os.getenv("MOTOR_DRIVER", "auto").strip().lower()
+# The motor watchdog keeps each motor's on time within any MOTOR_DUTY_WINDOW_SEC
+# below MOTOR_MAX_DUTY_CYCLE, on top of its 30 s limit per continuous run.
+MOTOR_DUTY_WINDOW_SEC = float(os.getenv("MOTOR_DUTY_WINDOW_SEC", "120"))
+MOTOR_MAX_DUTY_CYCLE = float(os.getenv("MOTOR_MAX_DUTY_CYCLE", "0.75"))
+# The simulator's timeline is written here (.csv or .json) on exit (empty = don't).
+MOTOR_TIMELINE_FILE = os.getenv("MOTOR_TIMELINE_FILE", "")
 
 # === Audio Config ===
 SPEAKER_PREFERENCE = os.getenv("SPEAKER_PREFERENCE")
 MIC_PREFERENCE = os.getenv("MIC_PREFERENCE")
 MIC_TIMEOUT_SECONDS = int(os.getenv("MIC_TIMEOUT_SECONDS", "5"))
 SILENCE_THRESHOLD = int(os.getenv("SILENCE_THRESHOLD", "2000"))
+# Mic chunks captured while Billy plays audio (e.g. the wake-up clip) are only sent
+# if they are louder than this, so his own voice isn't mistaken for the user's.
+ECHO_GATE_THRESHOLD = int(os.getenv("ECHO_GATE_THRESHOLD", str(SILENCE_THRESHOLD * 2)))
+# Local voice activity gate (core.vad): only speech, with MIC_VAD_PREROLL_MS before
+# it and MIC_VAD_HANGOVER_MS after it, is streamed to the realtime API.
+MIC_VAD = os.getenv("MIC_VAD", "false").lower() == "true"
+MIC_VAD_THRESHOLD = int(os.getenv("MIC_VAD_THRESHOLD", str(SILENCE_THRESHOLD // 2)))
+MIC_VAD_FLATNESS = float(os.getenv("MIC_VAD_FLATNESS", "0.45"))
+MIC_VAD_HANGOVER_MS = int(os.getenv("MIC_VAD_HANGOVER_MS", "800"))
+MIC_VAD_PREROLL_MS = int(os.getenv("MIC_VAD_PREROLL_MS", "300"))
+MIC_VAD_KEEPALIVE_MS = int(os.getenv("MIC_VAD_KEEPALIVE_MS", "2000"))
+# How much mic audio can be buffered while the realtime session is still connecting.
+MIC_PREROLL_MS = int(os.getenv("MIC_PREROLL_MS", "5000"))
 CHUNK_MS = int(os.getenv("CHUNK_MS", "50"))
+# Audio format on the realtime websocket: pcm16 (24 kHz), or G.711 g711_ulaw or
+# g711_alaw (8 kHz, 1 byte per sample: a third of the bytes, telephone quality).
+AUDIO_CODEC = os.getenv("AUDIO_CODEC", "pcm16").strip().lower()
+OUTPUT_BUFFER_MS = int(os.getenv("OUTPUT_BUFFER_MS", "150"))
 PLAYBACK_VOLUME = 1
 MOUTH_ARTICULATION = int(os.getenv("MOUTH_ARTICULATION", "5"))
+# Mouth flaps are scheduled this much ahead of their audio to cover motor spin-up.
+MOUTH_LATENCY_MS = int(os.getenv("MOUTH_LATENCY_MS", "40"))
+# The audio of the last RESPONSE_HISTORY_KEEP responses is kept in
+# sounds/response-history (0 = none), as wav or, with soundfile installed, flac.
+RESPONSE_HISTORY_KEEP = int(os.getenv("RESPONSE_HISTORY_KEEP", "3"))
+RESPONSE_HISTORY_FORMAT = os.getenv("RESPONSE_HISTORY_FORMAT", "wav").strip().lower()
 
 # === GPIO Config ===
 if BILLY_PINS == "legacy":
@@ -115,6 +172,18 @@ MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", "")
 HA_HOST = os.getenv("HA_HOST")
 HA_TOKEN = os.getenv("HA_TOKEN")
 HA_LANG = os.getenv("HA_LANG", "en")
+# Deadline for one Home Assistant request, retries included, and how often failed
+# connections or gateway errors are retried within it.
+HA_TIMEOUT_SECONDS = float(os.getenv("HA_TIMEOUT_SECONDS", "8"))
+HA_RETRIES = int(os.getenv("HA_RETRIES", "2"))
+# Idle connections to HA are kept open this long for the next request; HA's own
+# server closes them after 75 s.
+HA_KEEPALIVE_SECONDS = float(os.getenv("HA_KEEPALIVE_SECONDS", "30"))
+
+# === Tools ===
+# Function calls (Home Assistant, personality updates) that take longer than this
+# are cancelled and reported to the model as failed.
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "15"))
 
 # === Personality Config ===
 ALLOW_UPDATE_PERSONALITY_INI = (
@@ -0,0 +1,48 @@
+import binascii
+import json
+import re
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson parses the realtime API's events several times faster than the standard
+# library on a Pi; it's optional (pip install orjson).
+JSON_BACKEND = "orjson" if orjson else "json"
+loads = orjson.loads if orjson else json.loads
+
+AUDIO_DELTA = "response.audio.delta"
+
+# The server puts "type" first; an audio delta's other fields are short ids and
+# indexes, followed by the base64 payload, which never contains quotes.
+_AUDIO_DELTA_HEAD = re.compile(r'\{\s*"type"\s*:\s*"response\.audio\.delta"')
+_DELTA_KEY = re.compile(r'"delta"\s*:\s*"')
+
+
+def parse(message) -> dict:
+    """
+    Decode one realtime event. Audio deltas, most of the traffic by far, are
+    recognised from their first bytes and only their `delta` is extracted,
+    without parsing the JSON; anything unusual falls back to a full parse.
+    """
+    if isinstance(message, str):
+        head = _AUDIO_DELTA_HEAD.match(message)
+        if head:
+            key = _DELTA_KEY.search(message, head.end())
+            if key:
+                start = key.end()
+                end = message.find('"', start)
+                if end > 0 and message.find("\\", start, end) < 0:
+                    return {"type": AUDIO_DELTA, "delta": message[start:end]}
+    return loads(message)
+
+
+def decode_audio(delta: str) -> bytes:
+    """
+    Base64 audio payload → bytes. binascii reads the str directly, skipping the
+    ASCII copy and checks base64.b64decode makes first. The result is not a
+    reused buffer on purpose: it goes to the playback queue as it is.
+    """
+    return binascii.a2b_base64(delta)
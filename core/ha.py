@@ -1,35 +1,217 @@
+import asyncio
+import contextlib
+import random
+import time
+from bisect import bisect_left
+
 import aiohttp
 
-from core.config import HA_HOST, HA_LANG, HA_TOKEN
+from core import runtime
+from core.config import (
+    HA_HOST,
+    HA_KEEPALIVE_SECONDS,
+    HA_LANG,
+    HA_RETRIES,
+    HA_TIMEOUT_SECONDS,
+    HA_TOKEN,
+)
+
+
+# Upper bounds in ms of the latency histogram's buckets; slower calls land in a
+# last, open-ended bucket.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Gateway errors, e.g. while HA or a proxy in front of it restarts. A 504 means
+# the request may have reached HA, so it is only retried for idempotent methods.
+RETRY_STATUSES = (502, 503)
+IDEMPOTENT_RETRY_STATUSES = (502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+# First retry within 0-200 ms, then 0-400 ms, ...
+RETRY_BASE_SECONDS = 0.2
 
 
 def ha_available():
     return bool(HA_HOST and HA_TOKEN)
 
 
+class HomeAssistantError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class HomeAssistantClient:
+    """
+    A long-lived client for the Home Assistant REST API. Connections are pooled
+    and kept alive between calls, so a smart-home command after the first one
+    skips DNS, TCP and TLS setup.
+
+    Each call has a deadline covering all of its attempts. Failures to connect
+    and gateway errors are retried after an exponential backoff with full jitter,
+    while the deadline allows. A POST is not retried once it may have reached HA
+    (e.g. the connection dropped mid-request), as HA may already have acted on it
+    (think of a toggle); GETs are. A timeout ends the call either way.
+
+    The aiohttp session belongs to the loop it was opened on, normally the
+    runtime loop (see core.runtime). Using the client from another loop raises
+    until it has been closed on its own loop.
+    """
+
+    def __init__(
+        self,
+        host=HA_HOST,
+        token=HA_TOKEN,
+        timeout=HA_TIMEOUT_SECONDS,
+        retries=HA_RETRIES,
+        keepalive=HA_KEEPALIVE_SECONDS,
+    ):
+        self.host = (host or "").rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.retries = retries
+        self.keepalive = keepalive
+        self._session: aiohttp.ClientSession | None = None
+        self._loop = None
+
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self.connections = 0
+        self.reused = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def _open(self):
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_connection_created)
+        trace.on_connection_reuseconn.append(self._on_connection_reused)
+        self._loop = asyncio.get_running_loop()
+        self._session = aiohttp.ClientSession(
+            headers={"Authorization": f"Bearer {self.token}"},
+            connector=aiohttp.TCPConnector(
+                limit=4, keepalive_timeout=self.keepalive, ttl_dns_cache=300
+            ),
+            trace_configs=[trace],
+        )
+        return self._session
+
+    async def _on_connection_created(self, *_):
+        self.connections += 1
+
+    async def _on_connection_reused(self, *_):
+        self.reused += 1
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            return self._open()
+        if self._loop is not asyncio.get_running_loop():
+            # Its connections belong to that loop and can only be closed there.
+            raise RuntimeError(
+                "Home Assistant client is open on another event loop; close() it there"
+            )
+        return self._session
+
+    async def post(self, path, payload, timeout=None) -> dict:
+        """POST `payload` as JSON to `path` and return the JSON response."""
+        return await self.request("POST", path, payload, timeout)
+
+    async def request(self, method, path, payload=None, timeout=None) -> dict:
+        """Send `payload` (if any) as JSON to `path` and return the JSON response."""
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        self.calls += 1
+        try:
+            while True:
+                try:
+                    return await self._attempt(method, path, payload, deadline)
+                except TimeoutError:
+                    raise
+                except (aiohttp.ClientConnectionError, HomeAssistantError) as e:
+                    if not self._retryable(e, idempotent):
+                        raise
+                    delay = random.uniform(0, RETRY_BASE_SECONDS * 2**attempt)
+                    attempt += 1
+                    if attempt > self.retries or time.monotonic() + delay >= deadline:
+                        raise
+                    self.retried += 1
+                    print(f"🔁 Home Assistant request failed ({e!r}), retrying")
+                    await asyncio.sleep(delay)
+        except BaseException:
+            self.failures += 1
+            raise
+        finally:
+            ms = (time.monotonic() - started) * 1000
+            self.histogram[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+
+    @staticmethod
+    def _retryable(error, idempotent) -> bool:
+        if isinstance(error, HomeAssistantError):
+            statuses = IDEMPOTENT_RETRY_STATUSES if idempotent else RETRY_STATUSES
+            return error.status in statuses
+        # Only a failed connect is sure not to have reached HA; any other connection
+        # error may have come after the request was sent.
+        return idempotent or isinstance(error, aiohttp.ClientConnectorError)
+
+    async def _attempt(self, method, path, payload, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError
+        async with self.session().request(
+            method,
+            self.host + path,
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=remaining),
+        ) as resp:
+            if resp.status != 200:
+                raise HomeAssistantError(f"HTTP {resp.status}", status=resp.status)
+            return await resp.json()
+
+    def stats(self) -> dict:
+        buckets = [f"≤{ms}ms" for ms in LATENCY_BUCKETS_MS] + [
+            f">{LATENCY_BUCKETS_MS[-1]}ms"
+        ]
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retried,
+            "connections": self.connections,
+            "reused": self.reused,
+            "latency": dict(zip(buckets, self.histogram)),
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+client = HomeAssistantClient()
+
+
 async def send_conversation_prompt(prompt: str) -> str | None:
     if not ha_available():
         print("⚠️ Home Assistant not configured.")
         return None
 
-    url = f"{HA_HOST.rstrip('/')}/api/conversation/process"
-    headers = {
-        "Authorization": f"Bearer {HA_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
     payload = {"text": prompt, "language": HA_LANG}
 
     try:
-        async with (
-            aiohttp.ClientSession() as session,
-            session.post(url, headers=headers, json=payload) as resp,
-        ):
-            if resp.status == 200:
-                data = await resp.json()
-                return data.get("response", "")
-            print(f"⚠️ HA API returned HTTP {resp.status}")
-            return None
+        data = await client.post("/api/conversation/process", payload)
+        return data.get("response", "")
+    except TimeoutError:
+        print(f"⏱️ Home Assistant didn't answer within {client.timeout:g}s")
+        return None
+    except HomeAssistantError as e:
+        print(f"⚠️ HA API returned {e}")
+        return None
     except Exception as e:
         print(f"❌ Error reaching Home Assistant API: {e}")
         return None
+
+
+def close():
+    """Thread-safe: close the client's pooled connections on the runtime loop."""
+    if client._session is None:
+        return
+    with contextlib.suppress(Exception):
+        runtime.submit(client.close()).result(timeout=2)
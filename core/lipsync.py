@@ -0,0 +1,122 @@
+import time
+
+import numpy as np
+
+from .config import CHUNK_MS, MOUTH_ARTICULATION, MOUTH_LATENCY_MS
+from .motor_scheduler import PRIORITY_SPEECH
+
+
+def articulation_multiplier():
+    """Return direct articulation multiplier (1 = normal, higher = slower)."""
+    return max(0, min(10, float(MOUTH_ARTICULATION)))
+
+
+class LipSyncPlanner:
+    """
+    Turns audio into mouth flaps ahead of time. Each delta is analysed when it is
+    handed to the output engine, together with the time its first sample will reach
+    the speaker; flaps are then scheduled on the motor scheduler for the moment
+    their audio plays, moved earlier by `latency_ms` to cover motor spin-up.
+
+    The envelope is the RMS of `frame_ms` frames smoothed with separate attack and
+    release time constants, so a mouth opens quickly on a syllable but doesn't
+    chatter on the dips inside it. Samples that don't fill a whole frame are carried
+    over to the next delta.
+    """
+
+    def __init__(
+        self,
+        scheduler,
+        pin,
+        rate=24000,
+        frame_ms=CHUNK_MS,
+        threshold=1500,
+        min_flap_gap=0.15,
+        attack_ms=10,
+        release_ms=60,
+        latency_ms=MOUTH_LATENCY_MS,
+    ):
+        self.scheduler = scheduler
+        self.pin = pin
+        self.rate = rate
+        self.frame = max(1, int(rate * frame_ms / 1000))
+        self.frame_seconds = self.frame / rate
+        self.threshold = threshold
+        self.min_flap_gap = min_flap_gap
+        self.attack = np.exp(-self.frame_seconds / (attack_ms / 1000))
+        self.release = np.exp(-self.frame_seconds / (release_ms / 1000))
+        self.latency = latency_ms / 1000
+        self.flaps = 0
+        self.reset()
+
+    def reset(self):
+        """Forget envelope state and carried-over samples, e.g. after a flush."""
+        self._level = 0.0
+        self._last_flap = float("-inf")
+        self._carry = np.zeros(0, dtype=np.float32)
+
+    def envelope(self, samples) -> np.ndarray:
+        """Smoothed RMS of each whole frame in `samples` (carry-over excluded)."""
+        samples = np.asarray(samples, dtype=np.float32)
+        count = len(samples) // self.frame
+        rms = np.sqrt(
+            np.mean(
+                np.square(samples[: count * self.frame].reshape(count, self.frame)),
+                axis=1,
+            )
+        )
+
+        env = np.empty_like(rms)
+        level = self._level
+        for i, value in enumerate(rms):
+            coef = self.attack if value > level else self.release
+            level = value + coef * (level - value)
+            env[i] = level
+        self._level = level
+        return env
+
+    def plan(self, samples, at=None, priority=PRIORITY_SPEECH, tag="lipsync") -> int:
+        """
+        Schedule flaps for `samples`, whose first sample plays at monotonic time `at`
+        (None = now). Returns the number of flaps scheduled.
+        """
+        at = time.monotonic() if at is None else at
+        samples = np.concatenate((self._carry, np.asarray(samples, dtype=np.float32)))
+        start = at - len(self._carry) / self.rate
+
+        env = self.envelope(samples)
+        self._carry = samples[len(env) * self.frame :]
+        return self.plan_envelope(env, start, priority, tag)
+
+    def plan_envelope(self, env, at, priority=PRIORITY_SPEECH, tag="lipsync") -> int:
+        """Schedule flaps for an already smoothed envelope whose first frame plays at `at`."""
+        duration_scale = articulation_multiplier()
+        scheduled = 0
+        for i in np.flatnonzero(env > self.threshold):
+            frame_at = at + i * self.frame_seconds
+            if frame_at - self._last_flap < self.min_flap_gap:
+                continue
+
+            normalized = min(env[i] / 32768.0, 1.0)
+            speed = int(
+                np.clip(np.interp(normalized, [0.005, 0.15], [25, 100]), 25, 100)
+            )
+            duration_ms = np.clip(
+                np.interp(normalized, [0.005, 0.15], [15, 70]),
+                15,
+                self.frame_seconds * 1000,
+            )
+
+            self._last_flap = frame_at
+            self.scheduler.pulse(
+                self.pin,
+                speed,
+                duration_ms / 1000 * duration_scale,
+                frame_at - self.latency,
+                priority,
+                tag,
+            )
+            scheduled += 1
+
+        self.flaps += scheduled
+        return scheduled
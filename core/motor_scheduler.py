@@ -0,0 +1,192 @@
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+# Event priorities: on a channel that is currently driven by a higher priority,
+# lower priority events are dropped instead of fighting over the motor. Speech
+# gestures and interludes share a level, since an interlude deliberately takes the
+# head back from a speaking pose.
+PRIORITY_SPEECH = 10
+PRIORITY_INTERLUDE = PRIORITY_SPEECH
+PRIORITY_SONG = 20
+PRIORITY_WATCHDOG = 100
+
+# Events due within this long of each other are applied together, so the driver
+# can send them to the motor board in one bus transaction.
+COALESCE_SECONDS = 0.002
+
+
+@dataclass(order=True)
+class MotorEvent:
+    at: float
+    seq: int
+    pin: int = field(compare=False)
+    throttle: float = field(compare=False)
+    priority: int = field(compare=False, default=PRIORITY_SPEECH)
+    tag: str | None = field(compare=False, default=None)
+    cancelled: bool = field(compare=False, default=False)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class MotorScheduler:
+    """
+    One thread that applies throttle changes from a heap-ordered timeline, instead
+    of a timer thread per flap. Times are time.monotonic() seconds.
+
+    `apply({pin: throttle, ...})` is called on the scheduler thread with the
+    changes of all events that fire together (the last one wins per pin). A
+    channel that was switched on at some priority belongs to that priority
+    until it is switched off again; events of a lower priority for that channel are
+    skipped meanwhile, so e.g. an interlude can't cut into song choreography, and
+    the watchdog always wins.
+    """
+
+    def __init__(self, apply):
+        self.apply = apply
+        self._heap: list[MotorEvent] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._owner: dict[int, int] = {}
+        self._thread: threading.Thread | None = None
+        self.fired = 0
+        self.skipped = 0
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="billy-motors", daemon=True
+            )
+            self._thread.start()
+
+    def schedule(self, at, pin, throttle, priority=PRIORITY_SPEECH, tag=None):
+        """Set `pin` to `throttle` percent at monotonic time `at` (None = now)."""
+        event = MotorEvent(
+            time.monotonic() if at is None else at,
+            next(self._seq),
+            pin,
+            throttle,
+            priority,
+            tag,
+        )
+        with self._cond:
+            heapq.heappush(self._heap, event)
+            self._ensure_thread()
+            self._cond.notify()
+        return event
+
+    def sequence(self, pin, steps, at=None, priority=PRIORITY_SPEECH, tag=None):
+        """Schedule `(offset_seconds, throttle)` steps relative to `at`."""
+        start = time.monotonic() if at is None else at
+        return [
+            self.schedule(start + offset, pin, throttle, priority, tag)
+            for offset, throttle in steps
+        ]
+
+    def pulse(
+        self, pin, throttle, duration, at=None, priority=PRIORITY_SPEECH, tag=None
+    ):
+        """Switch a channel on for `duration` seconds."""
+        return self.sequence(pin, [(0, throttle), (duration, 0)], at, priority, tag)
+
+    def ramp(
+        self,
+        pin,
+        start,
+        end,
+        duration,
+        steps=5,
+        at=None,
+        priority=PRIORITY_SPEECH,
+        tag=None,
+    ):
+        """Move a channel linearly from `start` to `end` throttle over `duration`."""
+        return self.sequence(
+            pin,
+            [
+                (duration * i / steps, start + (end - start) * i / steps)
+                for i in range(steps + 1)
+            ],
+            at,
+            priority,
+            tag,
+        )
+
+    def cancel(self, tag=None, pin=None, below=None):
+        """
+        Cancel pending events matching all given filters: a tag, a channel, and/or
+        a priority strictly below `below`. With no filters, cancels everything.
+        """
+        with self._cond:
+            for event in self._heap:
+                if tag is not None and event.tag != tag:
+                    continue
+                if pin is not None and event.pin != pin:
+                    continue
+                if below is not None and event.priority >= below:
+                    continue
+                event.cancelled = True
+            self._cond.notify()
+
+    def release(self, pin=None):
+        """Forget channel ownership, e.g. after motors were stopped directly."""
+        with self._cond:
+            if pin is None:
+                self._owner.clear()
+            else:
+                self._owner.pop(pin, None)
+
+    def has_pending(self, tag=None, pin=None) -> bool:
+        with self._cond:
+            return any(
+                not event.cancelled
+                and (tag is None or event.tag == tag)
+                and (pin is None or event.pin == pin)
+                for event in self._heap
+            )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                delay = self._heap[0].at - now
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                changes = self._take_due(now)
+
+            if not changes:
+                continue
+            try:
+                self.apply(changes)
+            except Exception as e:
+                print(f"⚠️ Motor event failed on pins {list(changes)}: {e}")
+
+    def _take_due(self, now) -> dict:
+        """Pop the events due at `now` and return their changes; needs the lock."""
+        changes = {}
+        while self._heap and self._heap[0].at <= now + COALESCE_SECONDS:
+            event = heapq.heappop(self._heap)
+            if event.cancelled:
+                continue
+            owner = self._owner.get(event.pin)
+            if owner is not None and event.priority < owner:
+                self.skipped += 1
+                continue
+            if event.throttle:
+                self._owner[event.pin] = event.priority
+            else:
+                self._owner.pop(event.pin, None)
+            changes[event.pin] = event.throttle
+            self.fired += 1
+        return changes
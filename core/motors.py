@@ -0,0 +1,258 @@
+import csv
+import json
+import struct
+import threading
+import time
+from collections import deque
+
+
+class MotorDriver:
+    """
+    Sets motor channels (1-4) to a signed throttle between -1.0 and 1.0. The base
+    class drives nothing, for machines without a motor board.
+
+    The last value written to each channel is cached and writes that wouldn't
+    change it are dropped; the changes passed to one `set_many` call reach the
+    hardware as a single bus transaction (`_write`).
+    """
+
+    name = "none"
+
+    def __init__(self):
+        self.values = {}
+        self.commands = 0
+        self.redundant = 0
+        self.transactions = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def set(self, channel: int, value: float):
+        self.set_many({channel: value})
+
+    def set_many(self, changes: dict):
+        """Set several channels at once, e.g. everything the scheduler fired together."""
+        with self._lock:
+            self.commands += len(changes)
+            changed = {
+                channel: value
+                for channel, value in changes.items()
+                if self.values.get(channel) != value
+            }
+            self.redundant += len(changes) - len(changed)
+            if not changed:
+                return
+            self._write(changed)
+            self.values.update(changed)
+            self.transactions += 1
+            self._recent.append(time.monotonic())
+
+    def _write(self, changes: dict):
+        """Send changed channels to the hardware in one transaction."""
+
+    def transactions_per_second(self) -> int:
+        """Bus transactions in the last second."""
+        with self._lock:
+            cutoff = time.monotonic() - 1.0
+            while self._recent and self._recent[0] < cutoff:
+                self._recent.popleft()
+            return len(self._recent)
+
+    def bus_stats(self) -> dict:
+        return {
+            "commands": self.commands,
+            "redundant": self.redundant,
+            "transactions": self.transactions,
+            "transactions_per_second": self.transactions_per_second(),
+        }
+
+    def close(self):
+        pass
+
+
+class MotorKitDriver(MotorDriver):
+    """
+    Adafruit Motor HAT: DC motors on a PCA9685 PWM controller on the I2C bus,
+    driven the way adafruit_motorkit/adafruit_motor do it (fast decay, 0 = brake),
+    but with the PWM registers of every changed motor written in one auto-increment
+    I2C transaction instead of one transaction per PWM channel.
+    """
+
+    name = "motorkit"
+
+    ADDRESS = 0x60
+    FREQUENCY = 1600
+    # LED0_ON_L; each PWM channel has 4 registers (ON_L, ON_H, OFF_L, OFF_H).
+    LED0 = 0x06
+    # Motor → (enable, in1, in2) PWM channels, as wired on the Motor HAT.
+    CHANNELS = {1: (8, 9, 10), 2: (13, 11, 12), 3: (2, 3, 4), 4: (7, 5, 6)}
+
+    def __init__(self):
+        super().__init__()
+        import board
+        from adafruit_pca9685 import PCA9685
+
+        self.pca = PCA9685(board.I2C(), address=self.ADDRESS)
+        # Also switches register auto-increment on.
+        self.pca.frequency = self.FREQUENCY
+        # Register words per PWM channel, for the channels between changed ones.
+        self.regs = {}
+        for enable, in1, in2 in self.CHANNELS.values():
+            self.regs[enable] = self._duty(0xFFFF)
+            self.regs[in1] = self.regs[in2] = self._duty(0)
+        self._write_channels(sorted(self.regs))
+
+    @staticmethod
+    def _duty(value):
+        """(ON, OFF) register words for a 16-bit duty cycle, as adafruit_pca9685."""
+        if value == 0xFFFF:
+            return (0x1000, 0)
+        return (0, (value + 1) >> 4)
+
+    def _write(self, changes: dict):
+        pwm = []
+        for channel, value in changes.items():
+            if channel not in self.CHANNELS:
+                continue
+            _, in1, in2 = self.CHANNELS[channel]
+            if value == 0:
+                # Brake, like adafruit_motor's DCMotor at throttle 0.
+                self.regs[in1] = self.regs[in2] = self._duty(0xFFFF)
+            else:
+                duty = int(0xFFFF * min(abs(value), 1.0))
+                self.regs[in1] = self._duty(duty if value > 0 else 0)
+                self.regs[in2] = self._duty(0 if value > 0 else duty)
+            pwm += (in1, in2)
+        if pwm:
+            self._write_channels(pwm)
+
+    def _write_channels(self, channels):
+        """Write the span of PWM channels from the lowest to the highest given."""
+        first, last = min(channels), max(channels)
+        data = bytearray([self.LED0 + 4 * first])
+        for channel in range(first, last + 1):
+            data += struct.pack("<HH", *self.regs.get(channel, (0, 0)))
+        with self.pca.i2c_device as i2c:
+            i2c.write(data)
+
+    def close(self):
+        self.set_many({channel: 0.0 for channel in self.CHANNELS})
+        self.pca.deinit()
+
+
+class SimulatedDriver(MotorDriver):
+    """
+    Records every throttle change per channel with its time.monotonic() timestamp
+    instead of driving hardware, so benchmarks can measure flaps, duty cycle and
+    command rate.
+
+    Like the watchdog does on real hardware, a channel left on for longer than
+    `max_on` seconds is switched off at that point; those trips are counted and
+    show up in the timeline as a zero command.
+    """
+
+    name = "simulator"
+
+    def __init__(self, max_on=None, clock=time.monotonic):
+        super().__init__()
+        self.max_on = max_on
+        self.clock = clock
+        self.start = clock()
+        # (time, channel, throttle), in the order commands were applied.
+        self.timeline = []
+        self.trips = 0
+        self._on_since = {}
+
+    def _write(self, changes: dict):
+        now = self.clock()
+        self._enforce(now)
+        for channel, value in changes.items():
+            self.timeline.append((now, channel, value))
+            if not value:
+                self._on_since.pop(channel, None)
+            elif channel not in self._on_since:
+                self._on_since[channel] = now
+
+    def _enforce(self, now):
+        if self.max_on is None:
+            return
+        for channel, since in list(self._on_since.items()):
+            if now - since >= self.max_on:
+                self.timeline.append((since + self.max_on, channel, 0.0))
+                del self._on_since[channel]
+                self.values[channel] = 0.0
+                self.trips += 1
+
+    def stats(self, until=None) -> dict:
+        """Per-channel commands, flaps (off → on), on time and duty cycle."""
+        with self._lock:
+            until = self.clock() if until is None else until
+            self._enforce(until)
+            timeline = sorted(self.timeline, key=lambda entry: entry[0])
+
+        elapsed = max(until - self.start, 1e-9)
+        channels = {}
+        since = {}
+        for at, channel, value in timeline:
+            stats = channels.setdefault(
+                channel, {"commands": 0, "flaps": 0, "on_seconds": 0.0}
+            )
+            stats["commands"] += 1
+            if value and channel not in since:
+                since[channel] = at
+                stats["flaps"] += 1
+            elif not value and channel in since:
+                stats["on_seconds"] += at - since.pop(channel)
+        for channel, at in since.items():
+            channels[channel]["on_seconds"] += until - at
+
+        for stats in channels.values():
+            stats["duty_cycle"] = round(stats["on_seconds"] / elapsed, 4)
+            stats["on_seconds"] = round(stats["on_seconds"], 3)
+        commands = sum(stats["commands"] for stats in channels.values())
+        return {
+            "seconds": round(elapsed, 3),
+            "commands": commands,
+            "commands_per_second": round(commands / elapsed, 1),
+            "watchdog_trips": self.trips,
+            "channels": channels,
+        }
+
+    def dump(self, path):
+        """
+        Write the timeline, in seconds since the driver was created, as CSV, or
+        JSON if `path` ends in .json.
+        """
+        with self._lock:
+            rows = [
+                (round(at - self.start, 6), channel, value)
+                for at, channel, value in sorted(self.timeline, key=lambda e: e[0])
+            ]
+        with open(path, "w", newline="") as f:
+            if path.endswith(".json"):
+                keys = ("time", "channel", "throttle")
+                json.dump([dict(zip(keys, row)) for row in rows], f, indent=1)
+                return
+            writer = csv.writer(f)
+            writer.writerow(("time", "channel", "throttle"))
+            writer.writerows(rows)
+
+
+def create_driver(name: str, motor_hat: bool = False, max_on=None) -> MotorDriver:
+    """
+    Build the driver called `name`: "motorkit", "simulator", "none", or "auto"
+    (MotorKit if the pin profile is the Adafruit Motor HAT, otherwise none). If the
+    Motor HAT can't be opened, e.g. there is no I2C bus, motors are disabled.
+    """
+    if name == "auto":
+        name = "motorkit" if motor_hat else "none"
+
+    if name == "simulator":
+        return SimulatedDriver(max_on=max_on)
+    if name == "motorkit":
+        try:
+            return MotorKitDriver()
+        except (ImportError, OSError, RuntimeError, ValueError) as e:
+            print(f"⚠️ MotorKit unavailable, motors disabled: {e}")
+    elif name != "none":
+        print(f"⚠️ Unknown MOTOR_DRIVER '{name}', motors disabled")
+    return MotorDriver()
@@ -2,27 +2,45 @@ import atexit
 import random
 import threading
 import time
-from threading import Lock, Thread
+from collections import deque
+
+from .config import (
+    BILLY_PINS,
+    MOTOR_DRIVER,
+    MOTOR_DUTY_WINDOW_SEC,
+    MOTOR_MAX_DUTY_CYCLE,
+    MOTOR_TIMELINE_FILE,
+    is_classic_billy,
+)
+from .lipsync import LipSyncPlanner
+from .motor_scheduler import (
+    COALESCE_SECONDS,
+    PRIORITY_INTERLUDE,
+    PRIORITY_SONG,
+    PRIORITY_SPEECH,
+    PRIORITY_WATCHDOG,
+    MotorScheduler,
+)
+from .motors import create_driver
 
-import numpy as np
-
-from .config import BILLY_PINS, MOUTH_ARTICULATION, is_classic_billy
 
 # === Configuration ===
 USE_THIRD_MOTOR = is_classic_billy()
 print(f"⚙️ Using third motor: {USE_THIRD_MOTOR} | Pin profile: {BILLY_PINS}")
 
 # === Motor Control Setup ===
-USE_MOTOR_KIT = BILLY_PINS == "adafruit_motor_hat"
-
-if USE_MOTOR_KIT:
-    import board
-    from adafruit_motorkit import MotorKit
-    kit = MotorKit(i2c=board.I2C())
-    print("🔧 MotorKit initialized")
-else:
-    print("🔧 Using GPIO-based motor control (not implemented yet)")
-    kit = None
+WATCHDOG_TIMEOUT_SEC = 30  # max continuous ON time per pin
+# A pin stopped for its duty cycle stays off until its on time in the window is
+# back under this share of the allowed maximum.
+COOL_DOWN_RATIO = 0.8
+
+driver = create_driver(
+    MOTOR_DRIVER,
+    motor_hat=BILLY_PINS == "adafruit_motor_hat",
+    # Only a backstop in the simulator: the watchdog below stops channels first.
+    max_on=WATCHDOG_TIMEOUT_SEC + 1,
+)
+print(f"🔧 Motor driver: {driver.name}")
 
 # -------------------------------------------------------------------
 # Motor mapping
@@ -31,104 +49,112 @@ FLIP_MOUTH_DIRECTION = True
 FLIP_HEAD_DIRECTION = False
 FLIP_TAIL_DIRECTION = True
 
-# For compatibility with existing code that expects pin numbers
+# Pin numbers are the Motor HAT channels: motor1=mouth, motor2=head, motor3=body.
+# Note: body is used for tail movement in the current implementation
 MOUTH = 1
 HEAD = 2
 TAIL = 3  # Using body motor for tail
 
-if USE_MOTOR_KIT:
-    # MotorKit provides 4 motors: motor1, motor2, motor3, motor4
-    # We map: motor1=mouth, motor2=body, motor3=head
-    # Note: body is used for tail movement in the current implementation
-    
-    if MOUTH == 1:
-        MOUTH_MOTOR = kit.motor1
-    if MOUTH == 2:
-        MOUTH_MOTOR = kit.motor2
-    if MOUTH == 3:
-        MOUTH_MOTOR = kit.motor3
-
-    if HEAD == 1:
-        HEAD_MOTOR = kit.motor1
-    if HEAD == 2:
-        HEAD_MOTOR = kit.motor2
-    if HEAD == 3:
-        HEAD_MOTOR = kit.motor3
-
-    if TAIL == 1:
-        TAIL_MOTOR = kit.motor1
-    if TAIL == 2:
-        TAIL_MOTOR = kit.motor2
-    if TAIL == 3:
-        TAIL_MOTOR = kit.motor3
-else:
-    # GPIO-based motor control (placeholder for future implementation)
-    MOUTH_MOTOR = None
-    HEAD_MOTOR = None
-    TAIL_MOTOR = None
-
-# All motor references for tracking
-motor_refs = [MOUTH_MOTOR, TAIL_MOTOR, HEAD_MOTOR]
 motor_pins = [MOUTH, TAIL, HEAD]  # For compatibility with existing code
 
 # === State ===
-_head_tail_lock = Lock()
 _motor_watchdog_running = False
-_last_flap = 0
-_mouth_open_until = 0
-_last_rms = 0
 head_out = False
 
 # === Throttle tracking (so watchdog can see motor activity) ===
 _throttle = {pin: {"throttle": 0, "since": None} for pin in motor_pins}
-_motor_map = {MOUTH: MOUTH_MOTOR, TAIL: TAIL_MOTOR, HEAD: HEAD_MOTOR}
 
+# === Watchdog State ===
+# (stop event, reason) per active pin, armed when the pin switches on.
+_deadlines = {}
+# [on, off or None] monotonic intervals per pin, for the sliding duty-cycle window.
+_on_intervals = {pin: deque() for pin in motor_pins}
+# Pins stopped for exceeding their duty cycle, held off until back under it.
+_cooling = set()
+watchdog_trips = {pin: {"max_on": 0, "duty_cycle": 0} for pin in motor_pins}
+_watchdog_lock = threading.RLock()
 
-def set_throttle(pin: int, throttle: float):
-    """Start/adjust throttle on motor and remember when it went active."""
-    if not USE_MOTOR_KIT:
-        print(f"⚠️ Motor control not available - GPIO mode not implemented yet")
-        return
-        
-    motor = _motor_map.get(pin)
-    if motor is None:
-        return
 
+def _throttle_value(pin: int, throttle: float) -> float:
     # Convert percentage to throttle (-1.0 to 1.0)
     throttle_value = max(-1.0, min(1.0, throttle / 100.0))
 
     # Apply direction flip based on motor type
-    if pin == MOUTH and FLIP_MOUTH_DIRECTION:
-        throttle_value = -throttle_value
-    elif pin == HEAD and FLIP_HEAD_DIRECTION:
-        throttle_value = -throttle_value
-    elif pin == TAIL and FLIP_TAIL_DIRECTION:
+    if (
+        (pin == MOUTH and FLIP_MOUTH_DIRECTION)
+        or (pin == HEAD and FLIP_HEAD_DIRECTION)
+        or (pin == TAIL and FLIP_TAIL_DIRECTION)
+    ):
         throttle_value = -throttle_value
+    return throttle_value
+
+
+def _track_throttle(pin: int, throttle_value: float):
+    with _watchdog_lock:
+        was_active = _throttle[pin]["since"] is not None
+        if abs(throttle_value) > 0:
+            _throttle[pin]["throttle"] = throttle_value
+            _throttle[pin]["since"] = (
+                time.time()
+                if _throttle[pin]["since"] is None
+                else _throttle[pin]["since"]
+            )
+            if not was_active:
+                now = time.monotonic()
+                _on_intervals[pin].append([now, None])
+                _arm_watchdog(pin, now)
+        else:
+            _throttle[pin]["throttle"] = 0
+            _throttle[pin]["since"] = None
+            if was_active:
+                _disarm_watchdog(pin, time.monotonic())
+
+
+def _hold_off(values: dict) -> dict:
+    """
+    Keep pins the watchdog stopped for their duty cycle off until enough of their
+    on time has left the window (see COOL_DOWN_RATIO), instead of switching them
+    on only to be stopped again right away.
+    """
+    if not _cooling:
+        return values
+    limit = COOL_DOWN_RATIO * MOTOR_MAX_DUTY_CYCLE * MOTOR_DUTY_WINDOW_SEC
+    now = time.monotonic()
+    with _watchdog_lock:
+        for pin in list(_cooling):
+            if _on_seconds(pin, now) < limit:
+                _cooling.discard(pin)
+            elif values.get(pin):
+                values[pin] = 0.0
+    return values
 
-    motor.throttle = throttle_value
 
-    if abs(throttle_value) > 0:
-        _throttle[pin]["throttle"] = throttle_value
-        _throttle[pin]["since"] = (
-            time.time() if _throttle[pin]["since"] is None else _throttle[pin]["since"]
-        )
-    else:
-        _throttle[pin]["throttle"] = 0
-        _throttle[pin]["since"] = None
+def set_throttle(pin: int, throttle: float):
+    """Start/adjust throttle on motor and remember when it went active."""
+    throttle_value = _hold_off({pin: _throttle_value(pin, throttle)})[pin]
+    driver.set(pin, throttle_value)
+    _track_throttle(pin, throttle_value)
 
 
 def clear_throttle(pin: int):
     """Stop throttle on motor and clear active since timestamp."""
-    if not USE_MOTOR_KIT:
-        return
-        
-    motor = _motor_map.get(pin)
-    if motor is None:
-        return
+    driver.set(pin, 0.0)
+    _track_throttle(pin, 0)
+
 
-    motor.throttle = 0
-    _throttle[pin]["throttle"] = 0
-    _throttle[pin]["since"] = None
+def _apply_throttles(changes: dict):
+    """Apply `{pin: throttle percent}` in one driver write."""
+    values = _hold_off({
+        pin: _throttle_value(pin, throttle) for pin, throttle in changes.items()
+    })
+    driver.set_many(values)
+    for pin, throttle_value in values.items():
+        _track_throttle(pin, throttle_value)
+
+
+# All timed motor changes go through one scheduler thread (see core.motor_scheduler),
+# which hands everything due at the same moment to the driver together.
+scheduler = MotorScheduler(_apply_throttles)
 
 
 # === Motor Helpers ===
@@ -139,136 +165,98 @@ def brake_motor(pin1, pin2=None):
         clear_throttle(pin2)
 
 
-def run_motor_async(motor_pin, low_pin=None, speed_percent=100, duration=0.3, brake=True):
-    # MotorKit handles the low pin internally, so we ignore it
+def run_motor_async(
+    motor_pin,
+    low_pin=None,
+    speed_percent=100,
+    duration=0.3,
+    brake=True,  # pylint: disable=unused-argument
+    at=None,
+    priority=PRIORITY_SPEECH,
+    tag=None,
+):
+    # MotorKit handles the low pin and braking internally, so we ignore them
     # For GPIO mode, low_pin would be used for H-bridge control
-    set_throttle(motor_pin, float(speed_percent))
-    if brake:
-        threading.Timer(duration, lambda: brake_motor(motor_pin, low_pin)).start()
-    else:
-        # still auto-close after duration, but just clear throttle (no active brake)
-        threading.Timer(duration, lambda: clear_throttle(motor_pin)).start()
+    scheduler.pulse(motor_pin, float(speed_percent), duration, at, priority, tag)
 
 
 # === Movement Functions (keep signatures/behavior) ===
-def move_mouth(speed_percent, duration, brake=False):
-    run_motor_async(MOUTH, None, speed_percent, duration, brake)
+def move_mouth(speed_percent, duration, brake=False, at=None, priority=PRIORITY_SPEECH):
+    run_motor_async(MOUTH, None, speed_percent, duration, brake, at, priority)
 
 
-def stop_mouth():
-    brake_motor(MOUTH, None)
+def stop_mouth(priority=PRIORITY_SPEECH):
+    scheduler.schedule(None, MOUTH, 0, priority)
 
 
-def move_head(state="on"):
+def move_head(state="on", at=None, priority=PRIORITY_SPEECH, tag=None):
     global head_out
 
-    def _move_head_on():
-        # Move head to extended position
-        set_throttle(HEAD, 80)
-        time.sleep(0.5)
-        set_throttle(HEAD, 100)  # stay extended
-
     if state == "on":
         if not head_out:
-            threading.Thread(target=_move_head_on, daemon=True).start()
+            # Move head to extended position, then stay extended
+            scheduler.sequence(HEAD, [(0, 80), (0.5, 100)], at, priority, tag)
             head_out = True
     else:
-        # Stop head motor
-        brake_motor(HEAD, None)
+        # Stop head motor, dropping a still pending extension
+        scheduler.cancel(pin=HEAD, below=priority + 1)
+        scheduler.schedule(at, HEAD, 0, priority, tag)
         head_out = False
 
 
-def move_tail(duration=0.2):
+def schedule_head_moves(moves, start=None, priority=PRIORITY_SONG, tag="song"):
+    """Schedule `(offset, duration)` head extensions relative to `start`."""
+    start = time.monotonic() if start is None else start
+    for offset, duration in moves:
+        scheduler.sequence(
+            HEAD,
+            [(offset, 80), (offset + 0.5, 100), (offset + duration, 0)],
+            start,
+            priority,
+            tag,
+        )
+
+
+def is_head_out() -> bool:
+    return _pin_is_active(HEAD)
+
+
+def move_tail(duration=0.2, at=None, priority=PRIORITY_SPEECH, tag=None):
     """
     Move tail using the body motor (motor2).
     MotorKit handles the motor control internally.
     For GPIO mode, this would control the tail motor via H-bridge.
     """
-    run_motor_async(TAIL, None, speed_percent=80, duration=duration)
-
+    run_motor_async(TAIL, None, 80, duration, at=at, priority=priority, tag=tag)
 
-def move_tail_async(duration=0.3):
-    threading.Thread(target=move_tail, args=(duration,), daemon=True).start()
 
-
-def _articulation_multiplier():
-    """Return direct articulation multiplier (1 = normal, higher = slower)."""
-    return max(0, min(10, float(MOUTH_ARTICULATION)))
+def move_tail_async(duration=0.3, priority=PRIORITY_SPEECH):
+    # Scheduling never blocks, so this is the same as move_tail.
+    move_tail(duration, priority=priority)
 
 
 # === Mouth Sync ===
-def flap_from_pcm_chunk(
-    audio, threshold=1500, min_flap_gap=0.15, chunk_ms=40, sample_rate=24000  # pylint: disable=unused-argument
-):
-    global _last_flap, _mouth_open_until, _last_rms
-    now = time.time()
-
-    if audio.size == 0:
-        return
-
-    rms = np.sqrt(np.mean(audio.astype(np.float32) ** 2))
-    # peak = np.max(np.abs(audio))  # Not used in current implementation
-
-    # Smooth out sudden fluctuations
-    if '_last_rms' not in globals():
-        _last_rms = rms
-    alpha = 1  # smoothing factor
-    rms = alpha * rms + (1 - alpha) * _last_rms
-    _last_rms = rms
-
-    # If too quiet and mouth might be open, stop motor
-    if rms < threshold / 2 and now >= _mouth_open_until:
-        stop_mouth()
-        return
-
-    if rms <= threshold or (now - _last_flap) < min_flap_gap:
-        return
-
-    normalized = np.clip(rms / 32768.0, 0.0, 1.0)
-    # dyn_range = peak / (rms + 1e-5)  # Not used in current implementation
-
-    # Flap speed and duration scaling
-    speed = int(np.clip(np.interp(normalized, [0.005, 0.15], [25, 100]), 25, 100))
-    duration_ms = np.interp(normalized, [0.005, 0.15], [15, 70])
-
-    duration_ms = np.clip(duration_ms, 15, chunk_ms)
-    duration = duration_ms / 1000.0
-
-    duration *= _articulation_multiplier()
-
-    _last_flap = now
-    _mouth_open_until = now + duration
-
-    move_mouth(speed, duration, brake=False)
+# Flaps are planned from the audio ahead of the speaker (see core.lipsync).
+lipsync = LipSyncPlanner(scheduler, MOUTH)
 
 
 # === Interlude Behavior ===
-def _interlude_routine():
-    try:
-        move_head("off")
-        time.sleep(random.uniform(0.2, 2))
-        flap_count = random.randint(1, 3)
-        for _ in range(flap_count):
-            move_tail()
-            time.sleep(random.uniform(0.25, 0.9))
-        if random.random() < 0.9:
-            move_head("on")
-    except Exception as e:
-        print(f"⚠️ Interlude error: {e}")
-
-
 def interlude():
-    """Run head/tail interlude in a background thread if not already running."""
-    if _head_tail_lock.locked():
+    """Schedule a head/tail interlude unless one is still playing out."""
+    if scheduler.has_pending(tag="interlude"):
         return
-    Thread(target=lambda: _interlude_routine(), daemon=True).start()
 
-
-# === Motor Watchdog (per-pin continuous activity) ===
-WATCHDOG_TIMEOUT_SEC = 30  # max continuous ON time per pin
-WATCHDOG_POLL_SEC = 1.0  # poll cadence
+    at = time.monotonic()
+    move_head("off", at, PRIORITY_INTERLUDE, "interlude")
+    at += random.uniform(0.2, 2)
+    for _ in range(random.randint(1, 3)):
+        move_tail(at=at, priority=PRIORITY_INTERLUDE, tag="interlude")
+        at += random.uniform(0.25, 0.9)
+    if random.random() < 0.9:
+        move_head("on", at, PRIORITY_INTERLUDE, "interlude")
 
 
+# === Motor Watchdog (per-pin deadlines) ===
 def _mate_for(pin: int):  # pylint: disable=unused-argument
     """
     MotorKit handles motor control internally, so no mate pins needed.
@@ -278,9 +266,61 @@ def _mate_for(pin: int):  # pylint: disable=unused-argument
     return None
 
 
-def _stop_channel(pin: int):
-    """Stop one motor safely."""
-    clear_throttle(pin)
+def _on_seconds(pin: int, now: float) -> float:
+    """How long `pin` was on during the last MOTOR_DUTY_WINDOW_SEC."""
+    window_start = now - MOTOR_DUTY_WINDOW_SEC
+    intervals = _on_intervals[pin]
+    while intervals and intervals[0][1] is not None and intervals[0][1] <= window_start:
+        intervals.popleft()
+    return sum(
+        max(0.0, (now if off is None else off) - max(on, window_start))
+        for on, off in intervals
+    )
+
+
+def _arm_watchdog(pin: int, now: float):
+    """
+    Schedule the stop for an active pin: WATCHDOG_TIMEOUT_SEC after it switched on,
+    or sooner if staying on would push its duty cycle over MOTOR_MAX_DUTY_CYCLE.
+    """
+    if not _motor_watchdog_running:
+        return
+    max_on_at = _on_intervals[pin][-1][0] + WATCHDOG_TIMEOUT_SEC
+    allowance = MOTOR_MAX_DUTY_CYCLE * MOTOR_DUTY_WINDOW_SEC - _on_seconds(pin, now)
+    duty_at = now + max(allowance, 0.0)
+    if duty_at < max_on_at:
+        at, reason = duty_at, "duty_cycle"
+    else:
+        at, reason = max_on_at, "max_on"
+    event = scheduler.schedule(at, pin, 0, PRIORITY_WATCHDOG, "watchdog")
+    _deadlines[pin] = (event, reason)
+
+
+def _disarm_watchdog(pin: int, now: float):
+    """Cancel the stop of a pin that switched off, or count it if that was the stop."""
+    intervals = _on_intervals[pin]
+    if intervals and intervals[-1][1] is None:
+        intervals[-1][1] = now
+    deadline = _deadlines.pop(pin, None)
+    if deadline is None:
+        return
+    event, reason = deadline
+    # The scheduler may apply an event up to COALESCE_SECONDS early.
+    if event.cancelled or now < event.at - COALESCE_SECONDS:
+        event.cancel()
+        return
+
+    watchdog_trips[pin][reason] += 1
+    if reason == "max_on":
+        print(
+            f"⏱️ Watchdog: pin {pin} active > {WATCHDOG_TIMEOUT_SEC}s → braking channel"
+        )
+    elif pin not in _cooling:
+        _cooling.add(pin)
+        print(
+            f"⏱️ Watchdog: pin {pin} above {MOTOR_MAX_DUTY_CYCLE:.0%} duty cycle "
+            f"over {MOTOR_DUTY_WINDOW_SEC}s → holding it off to cool down"
+        )
 
 
 def _pin_is_active(pin: int) -> bool:
@@ -290,50 +330,62 @@ def _pin_is_active(pin: int) -> bool:
 
 def stop_all_motors():
     print("🛑 Stopping all motors")
-    for pin in motor_pins:
-        clear_throttle(pin)
+    scheduler.cancel()
+    scheduler.release()
+    _apply_throttles({pin: 0 for pin in motor_pins})
 
 
 def is_motor_active():
     return any(_pin_is_active(pin) for pin in motor_pins)
 
 
-def motor_watchdog():
-    """Stop any single pin that stays active longer than WATCHDOG_TIMEOUT_SEC."""
-    global _motor_watchdog_running
-    _motor_watchdog_running = True
+def duty_cycle(pin: int) -> float:
+    """Share of the last MOTOR_DUTY_WINDOW_SEC that `pin` was on."""
+    with _watchdog_lock:
+        return _on_seconds(pin, time.monotonic()) / MOTOR_DUTY_WINDOW_SEC
 
-    # Track continuous-on start time per pin
-    since_on = {pin: None for pin in motor_pins}
 
-    while _motor_watchdog_running:
-        now = time.time()
-        for pin in motor_pins:
-            active = _pin_is_active(pin)
-            if active:
-                if since_on[pin] is None:
-                    since_on[pin] = now
-                else:
-                    if (now - since_on[pin]) >= WATCHDOG_TIMEOUT_SEC:
-                        print(
-                            f"⏱️ Watchdog: pin {pin} active > {WATCHDOG_TIMEOUT_SEC}s → braking channel"
-                        )
-                        _stop_channel(pin)
-                        since_on[pin] = None
-            else:
-                since_on[pin] = None
-        time.sleep(WATCHDOG_POLL_SEC)
+def watchdog_stats() -> dict:
+    """Trips per reason and current duty cycle for every pin."""
+    with _watchdog_lock:
+        return {
+            pin: {**watchdog_trips[pin], "duty": round(duty_cycle(pin), 4)}
+            for pin in motor_pins
+        }
 
 
 def start_motor_watchdog():
-    Thread(target=motor_watchdog, daemon=True).start()
+    """
+    Stop any pin that stays on longer than WATCHDOG_TIMEOUT_SEC, or that would go
+    over MOTOR_MAX_DUTY_CYCLE. There is no polling: each pin gets a stop scheduled
+    when it switches on, which is cancelled when it switches off in time.
+    """
+    global _motor_watchdog_running
+    with _watchdog_lock:
+        _motor_watchdog_running = True
+        now = time.monotonic()
+        for pin in motor_pins:
+            if _pin_is_active(pin) and pin not in _deadlines:
+                _arm_watchdog(pin, now)
 
 
 def stop_motor_watchdog():
     global _motor_watchdog_running
-    _motor_watchdog_running = False
+    with _watchdog_lock:
+        _motor_watchdog_running = False
+        for event, _ in _deadlines.values():
+            event.cancel()
+        _deadlines.clear()
 
 
-# Ensure safe shutdown
-atexit.register(stop_all_motors)
+def dump_motor_timeline(path=MOTOR_TIMELINE_FILE):
+    """Write the simulated driver's command timeline to `path`, if both exist."""
+    if path and hasattr(driver, "dump"):
+        driver.dump(path)
+        print(f"💾 Motor timeline written to {path}")
+
+
+# Ensure safe shutdown (atexit runs these last to first)
+atexit.register(dump_motor_timeline)
 atexit.register(stop_motor_watchdog)
+atexit.register(stop_all_motors)
@@ -3,7 +3,13 @@ import subprocess
 
 import paho.mqtt.client as mqtt
 
-from .config import MQTT_HOST, MQTT_PASSWORD, MQTT_PORT, MQTT_USERNAME
+from .config import (
+    MQTT_HOST,
+    MQTT_PASSWORD,
+    MQTT_PORT,
+    MQTT_USERNAME,
+    REALTIME_PREWARM_HOLD_SECONDS,
+)
 from .movements import stop_all_motors
 
 
@@ -36,6 +42,7 @@ def on_connect(client, userdata, flags, rc):
         mqtt_send_discovery()
         client.subscribe("billy/command")
         client.subscribe("billy/say")
+        client.subscribe("billy/prewarm")
     else:
         print(f"⚠️ MQTT connection failed with code {rc}")
 
@@ -152,6 +159,25 @@ def mqtt_send_discovery():
         retain=True,
     )
 
+    # Button to warm up a realtime session ahead of a likely conversation
+    payload_prewarm = {
+        "name": "Billy Prewarm",
+        "unique_id": "billy_prewarm",
+        "command_topic": "billy/prewarm",
+        "payload_press": "prewarm",
+        "device": {
+            "identifiers": ["billy_bass"],
+            "name": "Big Mouth Billy Bass",
+            "model": "Billy Bassistant",
+            "manufacturer": "Thom Koopman",
+        },
+    }
+    mqtt_client.publish(
+        "homeassistant/button/billy/prewarm/config",
+        json.dumps(payload_prewarm),
+        retain=True,
+    )
+
 
 def on_message(client, userdata, msg):
     print(f" \n📩 MQTT message received: {msg.topic} = {msg.payload.decode()} ")
@@ -165,6 +191,16 @@ def on_message(client, userdata, msg):
                 print(f"\n⚠️ Error stopping motors: {e}")
             stop_mqtt()
             subprocess.Popen(["sudo", "shutdown", "now"])
+    elif msg.topic == "billy/prewarm":
+        from core.realtime import request_prewarm
+
+        # Payload may carry a hold time in seconds, e.g. from a presence sensor.
+        try:
+            hold = float(msg.payload.decode().strip())
+        except ValueError:
+            hold = REALTIME_PREWARM_HOLD_SECONDS
+        print(f"🔥 Pre-warm requested over MQTT (hold {hold:.0f}s)")
+        request_prewarm(hold_seconds=hold)
     elif msg.topic == "billy/say":
         print(f"📩 Received SAY command: {msg.payload.decode()}")
 
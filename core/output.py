@@ -0,0 +1,253 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+import sounddevice as sd
+
+from .ringbuffer import RingBuffer
+
+
+class PlaybackHandle:
+    """
+    Completes once the audio queued before it has left the speaker, judged by the
+    output stream's clock. Await it from asyncio or `wait()` on it from a thread;
+    the result is True if the audio played out and False if playback was stopped
+    first.
+    """
+
+    def __init__(self):
+        self.future = Future()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout=None):
+        """Block until resolved; returns the result, or None on timeout."""
+        try:
+            return self.future.result(timeout)
+        except TimeoutError:
+            return None
+
+    def resolve(self, played: bool):
+        with contextlib.suppress(InvalidStateError):
+            self.future.set_result(played)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+
+class OutputEngine:
+    """
+    Keeps one PortAudio output stream open and feeds it from a callback that reads a
+    preallocated ring buffer. Producers push already-processed frames with `write`,
+    which only waits for ring space, so DSP runs ahead of the device clock and a
+    short stall on a Python thread no longer becomes a gap in the audio.
+    """
+
+    def __init__(
+        self,
+        samplerate=48000,
+        channels=2,
+        device=None,
+        buffer_ms=200,
+        capacity_ms=1000,
+        blocksize=0,
+        stream_factory=None,
+        speed=1.0,
+    ):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.device = device
+        self.blocksize = blocksize
+        # sd.OutputStream, or e.g. test/virtual_output.VirtualOutputStream for offline
+        # runs, which can drain faster than real time by `speed` (0 = unthrottled).
+        self.stream_factory = stream_factory or sd.OutputStream
+        self.speed = speed
+        self.clock = time.monotonic
+        self.target_frames = int(samplerate * buffer_ms / 1000)
+        self.ring = RingBuffer(int(samplerate * capacity_ms / 1000), channels)
+        self.stream = None
+        self.active = False
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_frames = 0
+        self.device_underflows = 0
+        self._lock = threading.Lock()
+
+        # (ring frame, handle) pairs, resolved once that frame has been heard.
+        self._marks = deque()
+        self._marks_cond = threading.Condition()
+        self._marks_thread = None
+        # Ring frame at the start of the last callback buffer and the monotonic
+        # time it reaches the DAC, as reported by PortAudio.
+        self._clock = (0, time.monotonic())
+        self._latency = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.stream is not None and self.stream.active
+
+    def start(self):
+        """Open and start the output stream if it isn't running already."""
+        with self._lock:
+            if self.is_open:
+                return
+            if self.stream is not None:
+                self._close_stream()
+            self.stream = self.stream_factory(
+                samplerate=self.samplerate,
+                channels=self.channels,
+                dtype='int16',
+                device=self.device,
+                blocksize=self.blocksize,
+                callback=self._callback,
+            )
+            self.stream.start()
+            self._latency = float(self.stream.latency)
+            if hasattr(self.stream, "clock"):
+                # A virtual stream keeps its own time; see test/virtual_output.py.
+                self.clock = self.stream.clock
+                self.stream.pending = self.ring.available
+            print("🔈 Output stream opened")
+
+            if self._marks_thread is None or not self._marks_thread.is_alive():
+                self._marks_thread = threading.Thread(
+                    target=self._complete_marks, name="billy-output-marks", daemon=True
+                )
+                self._marks_thread.start()
+
+    def close(self):
+        with self._lock:
+            self._close_stream()
+
+    def _close_stream(self):
+        if self.stream is None:
+            return
+        try:
+            self.stream.stop()
+            self.stream.close()
+        except Exception as e:
+            print(f"⚠️ Error closing output stream: {e}")
+        self.stream = None
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.device_underflows += 1
+        count = self.ring.read_into(outdata)
+        if count:
+            # Only buffers carrying ring data move the clock, so once the ring runs
+            # dry the end of the last audio keeps its (past) play time.
+            delay = time_info.outputBufferDacTime - time_info.currentTime
+            if not 0 < delay < 1:
+                delay = self._latency
+            self._clock = (self.ring.consumed - count, self.clock() + delay)
+        if count < frames:
+            outdata[count:] = 0
+            if self.active:
+                self.underruns += 1
+
+    def buffered_frames(self) -> int:
+        return self.ring.available()
+
+    def buffered_seconds(self) -> float:
+        return self.ring.available() / self.samplerate
+
+    def latency(self) -> float:
+        """Output latency PortAudio reports for the device, in seconds."""
+        stream = self.stream
+        return float(stream.latency) if stream is not None else 0.0
+
+    def playout_time(self) -> float:
+        """Monotonic time at which the next written frame should be audible."""
+        return self.clock() + self.buffered_seconds() + self.latency()
+
+    def write(self, frames, timeout=2.0) -> int:
+        """
+        Queue frames for playback, waiting while more than the target amount of
+        audio is already buffered. Frames that still don't fit after `timeout`
+        seconds (e.g. the device stopped pulling) are dropped and counted as an
+        overrun. Returns the number of frames queued.
+        """
+        frames = frames.reshape(-1, self.channels)
+        deadline = time.monotonic() + timeout
+        written = 0
+
+        while written < len(frames):
+            room = min(self.ring.free(), self.target_frames - self.ring.available())
+            if room > 0:
+                written += self.ring.write(frames[written : written + room])
+                continue
+
+            if time.monotonic() >= deadline or not self.is_open:
+                self.overruns += 1
+                self.dropped_frames += len(frames) - written
+                break
+
+            # Sleep roughly until a quarter of the target buffer has drained.
+            drain = self.target_frames / self.samplerate / 4
+            time.sleep(max(0.002, drain / self.speed if self.speed > 0 else 0))
+
+        return written
+
+    def flush(self):
+        """Drop everything that hasn't reached the device yet."""
+        self.ring.request_flush()
+        self.cancel_marks()
+
+    def mark(self, handle: PlaybackHandle):
+        """Resolve `handle` once every frame written so far has been played."""
+        with self._marks_cond:
+            self._marks.append((self.ring.written, handle))
+            self._marks_cond.notify()
+
+    def cancel_marks(self):
+        with self._marks_cond:
+            marks, self._marks = self._marks, deque()
+        for _, handle in marks:
+            handle.resolve(False)
+
+    def _complete_marks(self):
+        while True:
+            with self._marks_cond:
+                while not self._marks:
+                    self._marks_cond.wait()
+                frame, handle = self._marks[0]
+
+            if not self.is_open:
+                self.cancel_marks()
+                continue
+
+            pending = frame - self.ring.consumed
+            if pending > 0:
+                # Not even handed to the device yet.
+                self._sleep(min(max(pending / self.samplerate, 0.002), 0.05))
+                continue
+
+            clock_frame, clock_time = self._clock
+            remaining = (
+                clock_time + (frame - clock_frame) / self.samplerate - self.clock()
+            )
+            if remaining > 0:
+                self._sleep(min(remaining, 0.05))
+                continue
+
+            with self._marks_cond:
+                if self._marks and self._marks[0][1] is handle:
+                    self._marks.popleft()
+            handle.resolve(True)
+
+    def _sleep(self, seconds):
+        """Sleep for `seconds` of stream time."""
+        time.sleep(seconds / self.speed if self.speed > 0 else 0.001)
+
+    def stats(self) -> dict:
+        return {
+            "buffered_ms": round(self.buffered_seconds() * 1000, 1),
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+            "device_underflows": self.device_underflows,
+        }
@@ -2,6 +2,7 @@
 import configparser
 import os
 import shutil
+import threading
 
 
 class PersonalityProfile:
@@ -168,21 +169,33 @@ def load_traits_from_ini(path="persona.ini") -> dict:
     return {k: int(v) for k, v in section.items()}
 
 
+# Serialises persona.ini rewrites, which happen on worker threads.
+_ini_lock = threading.Lock()
+
+
 def update_persona_ini(trait: str, value: int, ini_path="persona.ini"):
     """Update a single trait value in the persona.ini file. Only do this if configured
     to do so."""
+    update_persona_ini_traits({trait: value}, ini_path)
+
+
+def update_persona_ini_traits(traits: dict, ini_path="persona.ini"):
+    """Update several trait values in the persona.ini file with a single write. Only
+    do this if configured to do so."""
     from .config import ALLOW_UPDATE_PERSONALITY_INI
 
     if ALLOW_UPDATE_PERSONALITY_INI:
         import configparser
 
-        config = configparser.ConfigParser()
-        config.read(ini_path)
+        with _ini_lock:
+            config = configparser.ConfigParser()
+            config.read(ini_path)
 
-        if "PERSONALITY" not in config:
-            config["PERSONALITY"] = {}
+            if "PERSONALITY" not in config:
+                config["PERSONALITY"] = {}
 
-        config["PERSONALITY"][trait] = str(value)
+            for trait, value in traits.items():
+                config["PERSONALITY"][trait] = str(value)
 
-        with open(ini_path, "w") as f:
-            config.write(f)
+            with open(ini_path, "w") as f:
+                config.write(f)
@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import json
+import time
+
+import websockets.asyncio.client
+import websockets.exceptions
+from websockets.protocol import State
+
+from . import codec, runtime, trace
+from .config import (
+    AUDIO_CODEC,
+    INSTRUCTIONS,
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    OPENAI_REALTIME_URL,
+    REALTIME_PREWARM,
+    REALTIME_SESSION_MAX_AGE,
+    TEXT_ONLY_MODE,
+    VOICE,
+)
+
+
+SESSION_READY_TIMEOUT = 10
+PREWARM_HANDOVER_TIMEOUT = 3
+PREWARM_MAX_BACKOFF = 300
+
+
+def realtime_uri() -> str:
+    return f"{OPENAI_REALTIME_URL}?model={OPENAI_MODEL}"
+
+
+def realtime_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "openai-beta": "realtime=v1",
+    }
+
+
+def session_config(tools) -> dict:
+    """The session.update payload used for voice conversations."""
+    return {
+        "type": "session.update",
+        "session": {
+            "voice": VOICE,
+            "modalities": ["text"] if TEXT_ONLY_MODE else ["audio", "text"],
+            "input_audio_format": codec.get(AUDIO_CODEC).name,
+            "output_audio_format": codec.get(AUDIO_CODEC).name,
+            "turn_detection": {"type": "server_vad"},
+            "instructions": INSTRUCTIONS,
+            "tools": tools,
+        },
+    }
+
+
+async def open_session(tools):
+    """Connect to the realtime API and send the session configuration."""
+    ws = await websockets.asyncio.client.connect(
+        realtime_uri(), additional_headers=realtime_headers()
+    )
+    await ws.send(json.dumps(session_config(tools)))
+    return ws
+
+
+async def _wait_until_configured(ws):
+    """Consume events until the server acknowledges our session.update."""
+    while True:
+        data = json.loads(await ws.recv())
+        if data.get("type") == "session.updated":
+            return
+        if data.get("type") == "error":
+            message = (data.get("error") or {}).get("message", "Unknown error")
+            raise RuntimeError(f"session.update rejected: {message}")
+
+
+class ConnectionManager:
+    """
+    Keeps one realtime session connected and configured ahead of the next button
+    press, so `acquire` can hand over a socket that is ready for audio instead of
+    paying for DNS, TLS, the websocket upgrade and session.update on the hot path.
+
+    All coroutines run on the runtime loop (see core.runtime); other threads use
+    `request_prewarm`.
+    """
+
+    def __init__(self, tools=None):
+        self.tools = tools
+        self.ws = None
+        self.connected_at = 0.0
+        self.ready = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.wanted_until = 0.0
+        self.handovers = 0
+        self.cold_starts = 0
+
+    @property
+    def wanted(self) -> bool:
+        return REALTIME_PREWARM or time.monotonic() < self.wanted_until
+
+    async def prewarm(self, hold_seconds=None):
+        """Make sure a warm connection exists (or is being established)."""
+        if not OPENAI_API_KEY or self.tools is None:
+            return
+        if hold_seconds:
+            self.wanted_until = max(self.wanted_until, time.monotonic() + hold_seconds)
+        if not self.wanted:
+            return
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._keep_warm())
+
+    async def acquire(self):
+        """
+        Return a connected, configured websocket. A warm socket is handed over if
+        one is ready (or nearly ready); otherwise a fresh one is opened.
+        """
+        if self.task and not self.task.done():
+            if not self.ready.is_set():
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self.ready.wait(), timeout=PREWARM_HANDOVER_TIMEOUT
+                    )
+
+            if self.ready.is_set() and self.ws and self.ws.state is State.OPEN:
+                ws = self.ws
+                await self._stop_keeper(close=False)
+                self.handovers += 1
+                trace.mark("session_updated")
+                print(
+                    f"🔥 Using pre-warmed realtime session "
+                    f"({time.monotonic() - self.connected_at:.0f}s old)"
+                )
+                return ws
+
+            await self._stop_keeper(close=True)
+
+        self.cold_starts += 1
+        return await open_session(self.tools)
+
+    async def _stop_keeper(self, close: bool):
+        if self.task and not self.task.done():
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self.task
+        self.task = None
+        self.ready.clear()
+        if close:
+            await self._discard()
+        self.ws = None
+
+    async def _keep_warm(self):
+        backoff = 1
+        try:
+            while self.wanted:
+                try:
+                    self.ws = await open_session(self.tools)
+                    await asyncio.wait_for(
+                        _wait_until_configured(self.ws), timeout=SESSION_READY_TIMEOUT
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Realtime pre-warm failed: {e}")
+                    await self._discard()
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, PREWARM_MAX_BACKOFF)
+                    continue
+
+                backoff = 1
+                self.connected_at = time.monotonic()
+                self.ready.set()
+                print("🔥 Realtime session pre-warmed")
+
+                # Idle on the socket so pings are answered and a server-side close is
+                # noticed. Cancelling recv() on hand-over loses no messages.
+                refresh_at = self.connected_at + REALTIME_SESSION_MAX_AGE
+                try:
+                    while self.wanted and time.monotonic() < refresh_at:
+                        timeout = refresh_at - time.monotonic()
+                        if not REALTIME_PREWARM:
+                            timeout = min(timeout, self.wanted_until - time.monotonic())
+                        await asyncio.wait_for(self.ws.recv(), timeout=max(timeout, 0))
+                except (TimeoutError, websockets.exceptions.ConnectionClosed):
+                    pass
+
+                self.ready.clear()
+                await self._discard()
+        finally:
+            self.ready.clear()
+
+    async def _discard(self):
+        if self.ws is not None:
+            with contextlib.suppress(Exception):
+                await self.ws.close()
+        self.ws = None
+
+
+manager = ConnectionManager()
+
+
+def configure(tools):
+    """Set the tool definitions sessions are configured with."""
+    manager.tools = tools
+
+
+def request_prewarm(hold_seconds=None):
+    """Thread-safe: start warming a realtime session on the runtime loop."""
+    runtime.submit(manager.prewarm(hold_seconds))
@@ -0,0 +1,97 @@
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+
+class SessionRecorder:
+    """
+    Writes every websocket event of a session to a gzipped JSON lines file, one
+    `{"t": seconds, "dir": "send" | "recv" | "meta", "event": {...}}` record per
+    line, `t` on the monotonic clock relative to the start of the recording. Mic
+    audio is in the recorded input_audio_buffer.append events.
+
+    Events are queued and compressed on a writer thread, so recording costs the
+    event loop one queue put per message.
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self.start = time.monotonic()
+        self.events = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="billy-recorder", daemon=True
+        )
+        self._thread.start()
+        self.record("meta", json.dumps({"time": time.time(), **(meta or {})}))
+
+    def record(self, direction, message):
+        if isinstance(message, bytes):
+            message = message.decode("utf-8")
+        self.events += 1
+        self._queue.put((time.monotonic() - self.start, direction, message))
+
+    def close(self):
+        """Finish writing in the background; safe to call more than once."""
+        self._queue.put(None)
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            with gzip.open(self.path, "wt", compresslevel=6) as f:
+                while (item := self._queue.get()) is not None:
+                    t, direction, message = item
+                    f.write(
+                        f'{{"t": {t:.6f}, "dir": "{direction}", "event": {message}}}\n'
+                    )
+        except OSError as e:
+            print(f"⚠️ Session recording failed: {e}")
+            return
+        print(f"💾 Session recorded to {self.path}")
+
+
+class RecordingWebSocket:
+    """Wraps a websocket connection, recording everything sent and received."""
+
+    def __init__(self, ws, recorder: SessionRecorder):
+        self.ws = ws
+        self.recorder = recorder
+
+    async def send(self, message):
+        self.recorder.record("send", message)
+        await self.ws.send(message)
+
+    async def recv(self, *args, **kwargs):
+        message = await self.ws.recv(*args, **kwargs)
+        self.recorder.record("recv", message)
+        return message
+
+    async def __aiter__(self):
+        async for message in self.ws:
+            self.recorder.record("recv", message)
+            yield message
+
+    async def close(self, *args, **kwargs):
+        try:
+            await self.ws.close(*args, **kwargs)
+        finally:
+            self.recorder.close()
+
+    def __getattr__(self, name):
+        return getattr(self.ws, name)
+
+
+def wrap(ws, directory, meta=None) -> RecordingWebSocket:
+    """Start recording `ws` to a new file in `directory`."""
+    name = time.strftime("session-%Y%m%d-%H%M%S.jsonl.gz")
+    return RecordingWebSocket(ws, SessionRecorder(os.path.join(directory, name), meta))
+
+
+def load(path) -> list[dict]:
+    """Read a recording back as a list of `{"t", "dir", "event"}` records."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Preallocated single-producer / single-consumer ring of audio frames.
+
+    The producer only ever advances the write counter and the consumer only ever
+    advances the read counter, so neither side needs a lock: the counters are plain
+    ints whose assignment is atomic under the GIL, and data is copied in before the
+    write counter moves. That keeps the consumer safe to call from a PortAudio
+    callback, which must never block.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.int16):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self._data = np.zeros((self.capacity, channels), dtype=dtype)
+        self._written = 0
+        self._read = 0
+        self._flush_to = None
+
+    @property
+    def written(self) -> int:
+        """Total frames ever written."""
+        return self._written
+
+    @property
+    def consumed(self) -> int:
+        """Total frames ever read (or flushed)."""
+        return self._read
+
+    def available(self) -> int:
+        """Frames waiting to be read."""
+        return self._written - self._read
+
+    def free(self) -> int:
+        """Frames that can be written without overwriting unread data."""
+        return self.capacity - self.available()
+
+    def write(self, frames) -> int:
+        """Copy as many frames as fit; returns the number of frames written."""
+        frames = np.asarray(frames).reshape(-1, self.channels)
+        count = min(len(frames), self.free())
+        if count <= 0:
+            return 0
+
+        start = self._written % self.capacity
+        first = min(count, self.capacity - start)
+        self._data[start : start + first] = frames[:first]
+        if count > first:
+            self._data[: count - first] = frames[first:count]
+        self._written += count
+        return count
+
+    def read_into(self, out) -> int:
+        """Fill `out` from the ring; returns the number of frames copied."""
+        if self._flush_to is not None:
+            self._read = max(self._read, self._flush_to)
+            self._flush_to = None
+
+        count = min(len(out), self.available())
+        if count <= 0:
+            return 0
+
+        start = self._read % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self._data[start : start + first]
+        if count > first:
+            out[first:count] = self._data[: count - first]
+        self._read += count
+        return count
+
+    def read(self, max_frames: int) -> np.ndarray:
+        """Return up to `max_frames` frames as a new array."""
+        out = np.empty(
+            (min(max_frames, self.available()), self.channels), self._data.dtype
+        )
+        count = self.read_into(out)
+        return out[:count]
+
+    def request_flush(self):
+        """
+        Drop everything written so far. Safe to call from any thread: the consumer
+        applies it on its next read, so the read counter still has a single writer.
+        """
+        self._flush_to = self._written
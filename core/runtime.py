@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+
+# One long-lived event loop shared by everything that outlives a single button
+# press (pre-warmed realtime connections, background reconnects), so objects bound
+# to a loop can be handed from one session to the next.
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the runtime loop, starting its thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="billy-runtime", daemon=True
+            ).start()
+    return _loop
+
+
+def submit(coro):
+    """Schedule a coroutine on the runtime loop; returns a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro):
+    """Run a coroutine on the runtime loop and block the calling thread for it."""
+    return submit(coro).result()
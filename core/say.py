@@ -1,28 +1,26 @@
-import asyncio
-import base64
 import json
-import os
 
 import websockets.legacy.client
 
+from . import assets, codec, events
 from .audio import (
-    enqueue_wav_to_playback,
+    CODEC,
+    enqueue_clip,
     ensure_playback_worker_started,
+    playback_mark,
     playback_queue,
-    rotate_and_save_response_audio,
+    response_archiver,
 )
-from .config import CHUNK_MS, INSTRUCTIONS, OPENAI_API_KEY, OPENAI_MODEL, VOICE
+from .config import CHUNK_MS, INSTRUCTIONS, VOICE
 from .movements import move_head, stop_all_motors
+from .realtime import realtime_headers, realtime_uri
 
 
 async def say(text: str):
     print(f"🗣️ say() called with text={text!r}")
 
-    uri = f"wss://api.openai.com/v1/realtime?model={OPENAI_MODEL}"
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "openai-beta": "realtime=v1",
-    }
+    uri = realtime_uri()
+    headers = realtime_headers()
 
     try:
         async with websockets.legacy.client.connect(uri, extra_headers=headers) as ws:
@@ -33,7 +31,7 @@ async def say(text: str):
                     "session": {
                         "voice": VOICE,
                         "modalities": ["text", "audio"],
-                        "output_audio_format": "pcm16",
+                        "output_audio_format": CODEC.name,
                         "turn_detection": {"type": "semantic_vad"},
                         "instructions": INSTRUCTIONS,
                     },
@@ -75,14 +73,18 @@ async def say(text: str):
             )
             print("📤 Prompt sent, waiting for response...")
 
-            full_audio = bytearray()
+            decoder = codec.Decoder(CODEC)
+            # Kept apart from the archiver's response in progress, which may be a
+            # conversation's, and saved in one go once complete.
+            recorded = []
+            received = 0
             full_text = ""
 
             ensure_playback_worker_started(CHUNK_MS)
             move_head("on")
 
             async for message in ws:
-                parsed = json.loads(message)
+                parsed = events.parse(message)
 
                 # Handle explicit error responses from OpenAI
                 if parsed.get("type") == "error":
@@ -92,18 +94,14 @@ async def say(text: str):
                     print(f"🛑 OpenAI Error ({code}): {msg}")
 
                     stop_all_motors()
-                    sound_path = (
-                        "sounds/noapikey.wav"
-                        if code == "invalid_api_key"
-                        else "sounds/error.wav"
-                    )
-
-                    if os.path.exists(sound_path):
-                        print(f"🔊 Playing {os.path.basename(sound_path)}...")
-                        await asyncio.to_thread(enqueue_wav_to_playback, sound_path)
-                        await asyncio.to_thread(playback_queue.join)
+                    name = "noapikey" if code == "invalid_api_key" else "error"
+
+                    clip = assets.system_clip(name)
+                    if clip:
+                        print(f"🔊 Playing {name}.wav...")
+                        await enqueue_clip(clip)
                     else:
-                        print(f"⚠️ {sound_path} not found, skipping audio.")
+                        print(f"⚠️ sounds/{name}.wav not found, skipping audio.")
 
                     return  # stop say()
 
@@ -111,9 +109,10 @@ async def say(text: str):
                 if parsed["type"] in ("response.audio", "response.audio.delta"):
                     b64 = parsed.get("audio") or parsed.get("delta")
                     if b64:
-                        chunk = base64.b64decode(b64)
+                        chunk = decoder.decode(events.decode_audio(b64))
                         playback_queue.put(chunk)
-                        full_audio.extend(chunk)
+                        recorded.append(chunk)
+                        received += len(chunk)
 
                 # Capture text
                 if parsed["type"] in (
@@ -128,26 +127,25 @@ async def say(text: str):
                     await ws.send(json.dumps({"type": "session.end"}))
                     break
 
-            print(f"✅ Audio received: {len(full_audio)} bytes")
+            print(f"✅ Audio received: {received} bytes")
             print(f"📝 Transcript: {full_text.strip()}")
 
-            rotate_and_save_response_audio(full_audio)
-            playback_queue.put(None)
-            await asyncio.to_thread(playback_queue.join)
+            response_archiver.save(b"".join(recorded))
+            await playback_mark()
 
     except Exception as e:
         stop_all_motors()
         print(f"❌ say() failed: {e}")
 
         msg = str(e).lower()
-        path = "sounds/noapikey.wav" if "invalid_api_key" in msg else "sounds/error.wav"
+        name = "noapikey" if "invalid_api_key" in msg else "error"
 
-        if os.path.exists(path):
-            print(f"🔊 Playing {os.path.basename(path)}...")
-            await asyncio.to_thread(enqueue_wav_to_playback, path)
-            await asyncio.to_thread(playback_queue.join)
+        clip = assets.system_clip(name)
+        if clip:
+            print(f"🔊 Playing {name}.wav...")
+            await enqueue_clip(clip)
         else:
-            print(f"⚠️ {path} not found, skipping audio.")
+            print(f"⚠️ sounds/{name}.wav not found, skipping audio.")
 
     finally:
         move_head("off")
@@ -1,36 +1,41 @@
 import asyncio
-import base64
+import contextlib
 import json
-import os
-import re
 import socket
 import time
 from typing import Any
 
-import numpy as np
-import websockets.asyncio.client
 import websockets.exceptions
 
-from . import audio
+from . import assets, audio, codec, events, movements, realtime, recorder, trace
 from .config import (
     CHUNK_MS,
     DEBUG_MODE,
     DEBUG_MODE_INCLUDE_DELTA,
-    INSTRUCTIONS,
+    ECHO_GATE_THRESHOLD,
+    MIC_PREROLL_MS,
     MIC_TIMEOUT_SECONDS,
-    OPENAI_API_KEY,
+    MIC_VAD,
+    MIC_VAD_FLATNESS,
+    MIC_VAD_HANGOVER_MS,
+    MIC_VAD_KEEPALIVE_MS,
+    MIC_VAD_PREROLL_MS,
+    MIC_VAD_THRESHOLD,
     OPENAI_MODEL,
     PERSONALITY,
     RUN_MODE,
+    SESSION_RECORD_DIR,
     SILENCE_THRESHOLD,
     TEXT_ONLY_MODE,
-    VOICE,
 )
 from .ha import send_conversation_prompt
 from .mic import MicManager
-from .movements import move_tail_async, stop_all_motors
+from .movements import stop_all_motors
 from .mqtt import mqtt_publish
-from .personality import update_persona_ini
+from .personality import update_persona_ini_traits
+from .tools import ToolExecutor
+from .uplink import MicUplink, chunk_rms
+from .vad import VoiceActivityGate
 
 
 TOOLS = [
@@ -74,70 +79,135 @@ TOOLS = [
 ]
 
 
+realtime.configure(TOOLS)
+
+
+# Conversation states, published on billy/state as they change.
+IDLE = "idle"
+LISTENING = "listening"
+THINKING = "thinking"
+SPEAKING = "speaking"
+
+# Silence after the last activity that is tolerated before the timeout countdown
+# starts; the conversation ends MIC_TIMEOUT_SECONDS after that.
+SILENCE_GRACE_SECONDS = 2
+
+
 class BillySession:
-    def __init__(self, interrupt_event=None):
+    """
+    One conversation, from button press until silence, an interruption or an error.
+
+    The websocket and the mic stream stay open for the whole conversation. Turns are
+    an explicit state machine driven by websocket and playback events:
+
+        idle → listening → thinking → speaking → listening → … → idle
+
+    Mic audio is only sent upstream while listening or thinking. The silence timeout
+    is a timer handle on the event loop, re-armed by mic activity and by the end of
+    each response, instead of a polling task.
+    """
+
+    def __init__(self, interrupt_event=None, press_time=None):
         self.ws = None
         self.ws_lock: asyncio.Lock = asyncio.Lock()
         self.loop = None
-        self.audio_buffer = bytearray()
-        self.committed = False
+        self.state = IDLE
+        # Response audio arrives in audio.CODEC; playback wants 24 kHz PCM16.
+        self.audio_decoder = codec.Decoder(audio.CODEC)
         self.first_text = True
         self.full_response_text = ""
         self.last_rms = 0.0
         self.last_activity = [time.time()]
         self.session_active = asyncio.Event()
         self.user_spoke_after_assistant = False
-        self.allow_mic_input = True
         self.interrupt_event = interrupt_event or asyncio.Event()
         self.mic = MicManager()
-        self.mic_timeout_task: asyncio.Task | None = None
-
-        # Track whenever a session is updated after creation, and OpenAI is ready to
-        # receive voice.
+        self.uplink: MicUplink | None = None
+        self.silence_timer: asyncio.TimerHandle | None = None
+        self.turn_task: asyncio.Task | None = None
+        self.responses = 0
+        self.turns = 0
+        # Song the assistant asked for, played after the conversation ends.
+        self.pending_song = None
+        # Number of the last response that called a tool; the response to its
+        # result finishes that turn.
+        self.tool_response = 0
+
+        self.tools = ToolExecutor(self.send_event)
+        self.tools.register("update_personality", self.update_personality)
+        self.tools.register("play_song", self.play_song)
+        self.tools.register("smart_home_command", self.smart_home_command)
+
+        # Bootstrap timing, all time.monotonic(): button press, wake-up clip done,
+        # and the moment mic audio started flowing upstream.
+        self.press_time = press_time
+        self.wake_clip_done_at = None
+        self.listening_at = None
+        self.connect_ms = 0.0
+        self.bootstrap_reported = False
+
+        # Set once the server has acknowledged our session configuration.
         self.session_initialized = False
         self.run_mode = RUN_MODE
 
+        # Realtime event type → handler; events without one are ignored.
+        self.handlers = {
+            "session.updated": self.on_session_updated,
+            "input_audio_buffer.speech_started": self.on_speech_started,
+            "input_audio_buffer.speech_stopped": self.on_speech_stopped,
+            "input_audio_buffer.committed": self.on_committed,
+            "response.created": self.on_response_created,
+            "response.text.delta": self.on_text_delta,
+            "response.audio_transcript.delta": self.on_text_delta,
+            "response.audio_transcript.done": self.on_transcript_done,
+            "response.function_call_arguments.done": self.on_function_call,
+            "response.done": self.on_response_done,
+            "error": self.on_error,
+        }
+        if not TEXT_ONLY_MODE:
+            self.handlers["response.audio"] = self.on_audio_delta
+            self.handlers[events.AUDIO_DELTA] = self.on_audio_delta
+
+    def set_state(self, state):
+        if state == self.state:
+            return
+        if DEBUG_MODE:
+            print(f"\n🔀 State: {self.state} → {state}")
+        self.state = state
+        mqtt_publish("billy/state", state)
+
+        if state == LISTENING:
+            self.arm_silence_timer()
+        else:
+            self.cancel_silence_timer()
+
     async def start(self):
         self.loop = asyncio.get_running_loop()
         print("\n⏱️ Session starting...")
+        if trace.current is None:
+            trace.begin("conversation", start=self.press_time)
 
-        self.audio_buffer.clear()
-        self.committed = False
-        self.first_text = True
-        self.full_response_text = ""
         self.last_activity[0] = time.time()
         self.session_active.set()
-        self.user_spoke_after_assistant = False
-        self.allow_mic_input = True
+
+        if not TEXT_ONLY_MODE:
+            audio.playback_done_event.clear()
+            audio.ensure_playback_worker_started(CHUNK_MS)
+
+        # Open the mic before connecting: anything said while the wake-up clip plays
+        # and the session connects is kept as pre-roll and sent once it's ready.
+        try:
+            self.open_mic()
+        except Exception as e:
+            print(f"❌ Error opening mic input: {e}")
+            await self.stop_session()
+            return
 
         async with self.ws_lock:
             if self.ws is None:
-                uri = f"wss://api.openai.com/v1/realtime?model={OPENAI_MODEL}"
-                headers = {
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "openai-beta": "realtime=v1",
-                }
-
+                connect_started = time.monotonic()
                 try:
-                    self.ws = await websockets.asyncio.client.connect(
-                        uri, additional_headers=headers
-                    )
-                    await self.ws.send(
-                        json.dumps({
-                            "type": "session.update",
-                            "session": {
-                                "voice": VOICE,
-                                "modalities": ["text"]
-                                if TEXT_ONLY_MODE
-                                else ["audio", "text"],
-                                "input_audio_format": "pcm16",
-                                "output_audio_format": "pcm16",
-                                "turn_detection": {"type": "server_vad"},
-                                "instructions": INSTRUCTIONS,
-                                "tools": TOOLS,
-                            },
-                        })
-                    )
+                    self.ws = await realtime.manager.acquire()
 
                 except websockets.exceptions.ConnectionClosedError as e:
                     reason = getattr(e, "reason", str(e))
@@ -157,63 +227,164 @@ class BillySession:
                     await self._play_error_sound("error", str(e))
                     return
 
-        if not TEXT_ONLY_MODE:
-            audio.playback_done_event.clear()
-            audio.ensure_playback_worker_started(CHUNK_MS)
+                if not self.session_active.is_set():
+                    # Stopped while connecting: stop_session() is waiting for the lock
+                    # and would leave run_stream without a socket.
+                    print("🛑 Session stopped while connecting, closing the socket")
+                    with contextlib.suppress(Exception):
+                        await self.ws.close()
+                    self.ws = None
+                    return
+
+                self.connect_ms = (time.monotonic() - connect_started) * 1000
+                trace.mark("connected")
+
+                if SESSION_RECORD_DIR:
+                    self.ws = recorder.wrap(
+                        self.ws,
+                        SESSION_RECORD_DIR,
+                        {
+                            "model": OPENAI_MODEL,
+                            "mic_rate": audio.MIC_RATE,
+                            "chunk_ms": CHUNK_MS,
+                            "audio_codec": audio.CODEC.name,
+                        },
+                    )
 
         await self.run_stream()
 
+        if self.pending_song:
+            await asyncio.sleep(1.0)
+            await audio.play_song(self.pending_song)
+
+    def open_mic(self):
+        audio.reset_mic_encoder()
+        self.uplink = MicUplink(
+            audio.MIC_RATE,
+            self.send_mic_audio,
+            analyse=self.analyse_mic_audio,
+            capacity_ms=MIC_PREROLL_MS,
+            chunk_size=audio.CHUNK_SIZE,
+            echo_threshold=ECHO_GATE_THRESHOLD,
+            gate=self.make_vad_gate(),
+        )
+        self.mic.start(self.mic_callback)
+
+    @staticmethod
+    def make_vad_gate():
+        if not MIC_VAD:
+            return None
+        return VoiceActivityGate(
+            audio.MIC_RATE,
+            MIC_VAD_THRESHOLD,
+            max_flatness=MIC_VAD_FLATNESS,
+            hangover_ms=MIC_VAD_HANGOVER_MS,
+            preroll_ms=MIC_VAD_PREROLL_MS,
+            keepalive_ms=MIC_VAD_KEEPALIVE_MS,
+        )
+
+    def wake_clip_finished(self):
+        """Called from the wake-up clip thread once the clip has played out."""
+        self.wake_clip_done_at = time.monotonic()
+        self.report_bootstrap_latency()
+
+    def report_bootstrap_latency(self):
+        """
+        Log press-to-listening time next to what the old serial bootstrap (play the
+        wake-up clip, then connect, then open the mic) would have taken.
+        """
+        if (
+            self.bootstrap_reported
+            or self.press_time is None
+            or self.listening_at is None
+            or self.wake_clip_done_at is None
+        ):
+            return
+        self.bootstrap_reported = True
+        overlapped = (self.listening_at - self.press_time) * 1000
+        serial = (self.wake_clip_done_at - self.press_time) * 1000 + self.connect_ms
+        print(
+            f"\n⏱️ Press-to-listening: {overlapped:.0f} ms "
+            f"(serial clip-then-connect: ~{serial:.0f} ms)"
+        )
+
     def mic_callback(self, indata, *_):
-        if not self.allow_mic_input or not self.session_active.is_set():
+        # Billy doesn't listen to himself: nothing is captured while he speaks.
+        if self.state == SPEAKING or not self.session_active.is_set():
             return
-        samples = indata[:, 0]
-        rms = np.sqrt(np.mean(np.square(samples.astype(np.float32))))
-        self.last_rms = rms
+        self.uplink.push(indata, echo=audio.is_playing())
+
+    def analyse_mic_audio(self, samples):
+        """Track mic activity for the silence timeout; runs on the uplink task."""
+        rms = chunk_rms(samples, audio.CHUNK_SIZE or len(samples))
+        self.last_rms = float(rms[-1])
 
         if DEBUG_MODE:
-            print(f"\r🎙 Mic Volume: {rms:.1f}     ", end='', flush=True)
+            print(f"\r🎙 Mic Volume: {self.last_rms:.1f}     ", end='', flush=True)
 
-        if rms > SILENCE_THRESHOLD:
+        if rms.max() > SILENCE_THRESHOLD:
             self.last_activity[0] = time.time()
             self.user_spoke_after_assistant = True
+            if self.state == LISTENING:
+                self.arm_silence_timer()
 
-        audio.send_mic_audio(self.ws, samples, self.loop)
+    async def send_mic_audio(self, samples):
+        await audio.send_mic_audio(self.ws, samples)
+
+    # === Silence timeout ===
+    def arm_silence_timer(self):
+        """(Re)start the silence countdown from now."""
+        self.cancel_silence_timer()
+        if self.loop is None:
+            return
+        delay = SILENCE_GRACE_SECONDS + MIC_TIMEOUT_SECONDS
+        self.silence_timer = self.loop.call_later(delay, self.on_silence_timeout)
+
+        # Wag the tail once a second while the countdown runs, like a fidget.
+        start = time.monotonic() + SILENCE_GRACE_SECONDS + 0.5
+        for i in range(MIC_TIMEOUT_SECONDS):
+            movements.move_tail(at=start + i, tag="waiting")
+
+    def cancel_silence_timer(self):
+        if self.silence_timer is not None:
+            self.silence_timer.cancel()
+            self.silence_timer = None
+        movements.scheduler.cancel(tag="waiting")
+
+    def on_silence_timeout(self):
+        self.silence_timer = None
+        if self.state != LISTENING or not self.session_active.is_set():
+            return
+        print(f"\n⏱️ No mic activity for {MIC_TIMEOUT_SECONDS}s. Ending input...")
+        self.turn_task = asyncio.create_task(self.stop_session())
 
     async def run_stream(self):
-        if not TEXT_ONLY_MODE and audio.playback_done_event.is_set():
-            await asyncio.to_thread(audio.playback_done_event.wait)
+        if self.uplink.backlog_ms():
+            print(f"\n🎙️ Flushing {self.uplink.backlog_ms():.0f} ms of mic pre-roll")
+        self.uplink.start()
+        if self.listening_at is None:
+            self.listening_at = time.monotonic()
+            self.report_bootstrap_latency()
 
         print("🎙️ Mic stream active. Say something...")
-        mqtt_publish("billy/state", "listening")
-
-        # Ensure we hold a reference to the mic checker task, or it may be destroyed.
-        self.mic_timeout_task: asyncio.Task = asyncio.create_task(
-            self.mic_timeout_checker()
-        )
+        self.set_state(LISTENING)
 
         try:
-            self.mic.start(self.mic_callback)
-
             async for message in self.ws:
                 if not self.session_active.is_set():
                     print("🚪 Session marked as inactive, stopping stream loop.")
                     break
-                data = json.loads(message)
+                data = events.parse(message)
                 if DEBUG_MODE and (
                     DEBUG_MODE_INCLUDE_DELTA
                     or not data.get('type', "").endswith('delta')
                 ):
                     print(f"\n🔁 Raw message: {data} ")
 
-                # If the session has been updated properly, flag it as so. We can't
-                # send audio until the session is fully initialized.
-                if data.get('type', "") == 'session_updated':
-                    self.session_initialized = True
-
                 await self.handle_message(data)
 
         except Exception as e:
-            print(f"❌ Error opening mic input: {e}")
+            print(f"❌ Error in session stream: {e}")
             self.session_active.clear()
 
         finally:
@@ -223,278 +394,239 @@ class BillySession:
             except Exception as e:
                 print(f"⚠️ Error while stopping mic: {e}")
 
+            await self.uplink.stop()
+            if DEBUG_MODE:
+                print(f"\n🎙️ Uplink stats: {self.uplink.stats()}")
+
             try:
-                await self.post_response_handling()
+                await self.end_conversation()
             except Exception as e:
-                print(f"⚠️ Error in post_response_handling: {e}")
+                print(f"⚠️ Error ending conversation: {e}")
 
     async def handle_message(self, data):
-        # If this speech segment is done, add some newlines to the full response text,
-        # so it's clearer in logging.
-        if data['type'] == 'response.audio_transcript.done':
-            self.full_response_text += "\n\n"
-
-        if not TEXT_ONLY_MODE and data["type"] in (
-            "response.audio",
-            "response.audio.delta",
-        ):
-            if not self.committed and self.session_initialized:
-                async with self.ws_lock:
-                    await self.ws.send(
-                        json.dumps({"type": "input_audio_buffer.commit"})
-                    )
-                self.committed = True
-            audio_b64 = data.get("audio") or data.get("delta")
-            if audio_b64:
-                audio_chunk = base64.b64decode(audio_b64)
-                self.audio_buffer.extend(audio_chunk)
-                self.last_activity[0] = time.time()
-                audio.playback_queue.put(audio_chunk)
-
-                if self.interrupt_event.is_set():
-                    print("⛔ Assistant turn interrupted. Stopping response playback.")
-                    while not audio.playback_queue.empty():
-                        try:
-                            audio.playback_queue.get_nowait()
-                            audio.playback_queue.task_done()
-                        except Exception:
-                            break
-
-                    self.session_active.clear()
-                    self.interrupt_event.clear()
-                    return
+        handler = self.handlers.get(data.get("type"))
+        if handler is not None:
+            await handler(data)
 
-        if (
-            data["type"] in ("response.audio_transcript.delta", "response.text.delta")
-            and "delta" in data
-        ):
-            self.allow_mic_input = False
-            if self.first_text:
-                mqtt_publish("billy/state", "speaking")
-                print("\n🐟 Billy: ", end='', flush=True)
-                self.first_text = False
-                self.user_spoke_after_assistant = False
-            print(data["delta"], end='', flush=True)
-            self.full_response_text += data["delta"]
-
-        if data["type"] == "response.function_call_arguments.done":
-            if data.get("name") == "update_personality":
-                args = json.loads(data["arguments"])
-                changes = []
-                for trait, val in args.items():
-                    if hasattr(PERSONALITY, trait) and isinstance(val, int):
-                        setattr(PERSONALITY, trait, val)
-                        update_persona_ini(trait, val)
-                        changes.append((trait, val))
-                if changes:
-                    print("\n🎛️ Personality updated via function_call:")
-                    for trait, val in changes:
-                        print(f"  - {trait.capitalize()}: {val}%")
-                    print("\n🧠 New Instructions:\n")
-                    print(PERSONALITY.generate_prompt())
-
-                    self.user_spoke_after_assistant = True
-                    self.full_response_text = ""
-                    self.last_activity[0] = time.time()
-
-                    confirmation_text = " ".join([
-                        f"Okay, {trait} is now set to {val}%." for trait, val in changes
-                    ])
-                    async with self.ws_lock:
-                        await self.ws.send(
-                            json.dumps({
-                                "type": "conversation.item.create",
-                                "item": {
-                                    "type": "message",
-                                    "role": "user",
-                                    "content": [
-                                        {
-                                            "type": "input_text",
-                                            "text": confirmation_text,
-                                        }
-                                    ],
-                                },
-                            })
-                        )
-                        await self.ws.send(json.dumps({"type": "response.create"}))
-
-            elif data.get("name") == "play_song":
-                args = json.loads(data["arguments"])
-                song_name = args.get("song")
-                if song_name:
-                    print(f"\n🎵 Assistant requested to play song: {song_name} ")
-                    await self.stop_session()
-                    await asyncio.sleep(1.0)
-                    await audio.play_song(song_name)
-                    return
+    async def on_session_updated(self, data):
+        self.session_initialized = True
+        trace.mark("session_updated")
 
-            elif data.get("name") == "smart_home_command":
-                args = json.loads(data["arguments"])
-                prompt = args.get("prompt")
-
-                if prompt:
-                    print(f"\n🏠 Sending to Home Assistant Conversation API: {prompt} ")
-
-                    ha_response = await send_conversation_prompt(prompt)
-                    # Try to extract plain speech text
-                    speech_text = None
-                    if isinstance(ha_response, dict):
-                        speech_text = (
-                            ha_response.get("speech", {}).get("plain", {}).get("speech")
-                        )
-
-                    if speech_text:
-                        print(f"🔍 HA debug: {ha_response.get('data')}")
-                        ha_message = f"Home Assistant says: {speech_text}"
-                        print(f"\n📣 {ha_message}")
-
-                        async with self.ws_lock:
-                            await self.ws.send(
-                                json.dumps({
-                                    "type": "conversation.item.create",
-                                    "item": {
-                                        "type": "message",
-                                        "role": "user",
-                                        "content": [
-                                            {"type": "input_text", "text": ha_message}
-                                        ],
-                                    },
-                                })
-                            )
-                            await self.ws.send(json.dumps({"type": "response.create"}))
-                    else:
-                        print(f"⚠️ Failed to parse HA response: {ha_response}")
-                        async with self.ws_lock:
-                            await self.ws.send(
-                                json.dumps({
-                                    "type": "conversation.item.create",
-                                    "item": {
-                                        "type": "message",
-                                        "role": "user",
-                                        "content": [
-                                            {
-                                                "type": "input_text",
-                                                "text": "Home Assistant didn't understand the request.",
-                                            }
-                                        ],
-                                    },
-                                })
-                            )
-                            await self.ws.send(json.dumps({"type": "response.create"}))
-
-        elif data["type"] == "response.done":
-            error = data.get("status_details", {}).get("error")
-            if error:
-                error_type = error.get("type")
-                error_message = error.get("message", "Unknown error")
-                print(f"\n❌ OpenAI API Error [{error_type}]: {error_message}")
-            else:
-                print("\n✿ Assistant response complete.")
-
-            if not TEXT_ONLY_MODE:
-                await asyncio.to_thread(audio.playback_queue.join)
-
-                # Let the last audio chunk finish playing
-                await asyncio.sleep(1)
-
-                if len(self.audio_buffer) > 0:
-                    print(f"💾 Saving audio buffer ({len(self.audio_buffer)} bytes)")
-                    audio.rotate_and_save_response_audio(self.audio_buffer)
-                else:
-                    print("⚠️ Audio buffer was empty, skipping save.")
-
-                self.audio_buffer.clear()
-                audio.playback_done_event.set()
-                self.last_activity[0] = time.time()
-
-                # Allow mic input only after a short delay
-                self.allow_mic_input = True
-
-            if self.run_mode == "dory":
-                print("🎣 Dory mode active. Ending session after single response.")
-                await self.stop_session()
-                return
+    async def on_speech_started(self, data):
+        self.last_activity[0] = time.time()
+        self.user_spoke_after_assistant = True
+        # Still listening, but the user is talking: no countdown meanwhile.
+        self.cancel_silence_timer()
+
+    async def on_speech_stopped(self, data):
+        trace.mark("speech_stopped")
 
-        elif data["type"] == "error":
-            error: dict[str, Any] = data.get("error") or {}
-            code = error.get("code", "error").lower()
-            message = error.get("message", "Unknown error")
+    async def on_committed(self, data):
+        if self.state == LISTENING:
+            self.set_state(THINKING)
 
-            code = "noapikey" if "invalid_api_key" in code else "error"
+    async def on_response_created(self, data):
+        await self.on_committed(data)
+        self.responses += 1
+        self.audio_decoder.reset()
 
-            print(f"\n🛑 API Error ({code}): {message}")
-            await self._play_error_sound(code, message)
+    async def on_audio_delta(self, data):
+        audio_b64 = data.get("audio") or data.get("delta")
+        if not audio_b64:
             return
+        trace.mark("first_delta")
+        audio_chunk = self.audio_decoder.decode(events.decode_audio(audio_b64))
+        audio.response_archiver.write(audio_chunk)
+        self.last_activity[0] = time.time()
+        audio.playback_queue.put(audio_chunk)
+        self.set_state(SPEAKING)
 
-    async def mic_timeout_checker(self):
-        print("🛡️ Mic timeout checker active")
-        last_tail_move = 0
-
-        while self.session_active.is_set():
-            now = time.time()
-            idle_seconds = now - max(self.last_activity[0], audio.last_played_time)
-            timeout_offset = 2
-
-            if idle_seconds - timeout_offset > 0.5:
-                elapsed = idle_seconds - timeout_offset
-                progress = min(elapsed / MIC_TIMEOUT_SECONDS, 1.0)
-                bar_len = 20
-                filled = int(bar_len * progress)
-                bar = '█' * filled + '-' * (bar_len - filled)
-                print(
-                    f"\r👂 {MIC_TIMEOUT_SECONDS}s timeout: [{bar}] {elapsed:.1f}s "
-                    f"| Mic Volume:: {self.last_rms:.4f} / Threshold: {SILENCE_THRESHOLD:.4f}",
-                    end='',
-                    flush=True,
-                )
-
-                if now - last_tail_move > 1.0:
-                    move_tail_async(duration=0.2)
-                    last_tail_move = now
-
-                if elapsed > MIC_TIMEOUT_SECONDS:
-                    print(
-                        f"\n⏱️ No mic activity for {MIC_TIMEOUT_SECONDS}s. Ending input..."
-                    )
-                    await self.stop_session()
+        if self.interrupt_event.is_set():
+            print("⛔ Assistant turn interrupted. Stopping response playback.")
+            while not audio.playback_queue.empty():
+                try:
+                    audio.playback_queue.get_nowait()
+                    audio.playback_queue.task_done()
+                except Exception:
                     break
 
-            await asyncio.sleep(0.5)
-
-    async def post_response_handling(self):
-        print(f"\n🧠 Full response: {self.full_response_text.strip()} ")
+            self.session_active.clear()
+            self.interrupt_event.clear()
 
-        if not self.session_active.is_set():
-            print("🚪 Session inactive after timeout or interruption. Not restarting.")
-            mqtt_publish("billy/state", "idle")
-            stop_all_motors()
-            async with self.ws_lock:
-                if self.ws:
-                    await self.ws.close()
-                    await self.ws.wait_closed()
-                    self.ws = None
+    async def on_text_delta(self, data):
+        if "delta" not in data:
             return
+        self.set_state(SPEAKING)
+        if self.first_text:
+            print("\n🐟 Billy: ", end='', flush=True)
+            self.first_text = False
+            self.user_spoke_after_assistant = False
+        print(data["delta"], end='', flush=True)
+        self.full_response_text += data["delta"]
+
+    async def on_transcript_done(self, data):
+        # This speech segment is done: add some newlines to the full response
+        # text, so it's clearer in logging.
+        self.full_response_text += "\n\n"
+
+    async def on_function_call(self, data):
+        # Runs alongside the message loop; results come back as function_call_output.
+        if self.tools.submit(data):
+            self.tool_response = self.responses
+
+    async def send_event(self, event):
+        """Send `event` on the websocket, unless the conversation is over."""
+        async with self.ws_lock:
+            if self.ws is None or not self.session_active.is_set():
+                return
+            with contextlib.suppress(websockets.exceptions.ConnectionClosed):
+                await self.ws.send(json.dumps(event))
+
+    async def update_personality(self, args):
+        changes = {
+            trait: val
+            for trait, val in args.items()
+            if hasattr(PERSONALITY, trait) and isinstance(val, int)
+        }
+        if not changes:
+            return {"error": "No known personality traits given."}
+
+        for trait, val in changes.items():
+            setattr(PERSONALITY, trait, val)
+        print("\n🎛️ Personality updated via function_call:")
+        for trait, val in changes.items():
+            print(f"  - {trait.capitalize()}: {val}%")
+        print("\n🧠 New Instructions:\n")
+        print(PERSONALITY.generate_prompt())
+
+        self.user_spoke_after_assistant = True
+        self.full_response_text = ""
+        self.last_activity[0] = time.time()
 
-        if not self.run_mode and (
-            re.search(r"[a-zA-Z]\?\s*$", self.full_response_text.strip())
-            and self.user_spoke_after_assistant
-        ):
-            print("🔁 Follow-up detected. Restarting...\n")
-            await self.start()
+        await asyncio.to_thread(update_persona_ini_traits, changes)
+        return {"updated": {trait: f"{val}%" for trait, val in changes.items()}}
+
+    async def play_song(self, args):
+        song_name = args.get("song")
+        if not song_name:
+            return {"error": "No song given."}
+        print(f"\n🎵 Assistant requested to play song: {song_name} ")
+        # The conversation ends here; start() plays the song once it has.
+        self.pending_song = song_name
+        self.turn_task = asyncio.create_task(self.stop_session())
+        return None
+
+    async def smart_home_command(self, args):
+        prompt = args.get("prompt")
+        if not prompt:
+            return {"error": "No prompt given."}
+        print(f"\n🏠 Sending to Home Assistant Conversation API: {prompt} ")
+
+        ha_response = await send_conversation_prompt(prompt)
+        # Try to extract plain speech text
+        speech_text = None
+        if isinstance(ha_response, dict):
+            speech_text = ha_response.get("speech", {}).get("plain", {}).get("speech")
+
+        if not speech_text:
+            print(f"⚠️ Failed to parse HA response: {ha_response}")
+            return {"error": "Home Assistant didn't understand the request."}
+
+        print(f"🔍 HA debug: {ha_response.get('data')}")
+        print(f"\n📣 Home Assistant says: {speech_text}")
+        return {"speech": speech_text}
+
+    async def on_response_done(self, data):
+        error = data.get("status_details", {}).get("error")
+        if error:
+            error_type = error.get("type")
+            error_message = error.get("message", "Unknown error")
+            print(f"\n❌ OpenAI API Error [{error_type}]: {error_message}")
         else:
-            print("🛑 No follow-up. Ending session.")
-            mqtt_publish("billy/state", "idle")
-            stop_all_motors()
-            async with self.ws_lock:
-                await self.ws.close()
-                await self.ws.wait_closed()
-                self.ws = None
+            print("\n✿ Assistant response complete.")
+
+        trace.mark("response_done")
+
+        # Finish the turn once its audio has played, without holding up the
+        # message loop meanwhile.
+        self.turn_task = asyncio.create_task(self.finish_turn(self.responses))
+
+    async def on_error(self, data):
+        error: dict[str, Any] = data.get("error") or {}
+        code = error.get("code", "error").lower()
+        message = error.get("message", "Unknown error")
+
+        code = "noapikey" if "invalid_api_key" in code else "error"
+
+        print(f"\n🛑 API Error ({code}): {message}")
+        await self._play_error_sound(code, message)
+
+    async def finish_turn(self, response):
+        """Go back to listening once response number `response` has been heard."""
+        if not TEXT_ONLY_MODE:
+            # Wait until the last chunk of the response has left the speaker
+            await audio.playback_mark()
+
+        if response != self.responses or not self.session_active.is_set():
+            return  # a newer response (e.g. after a tool call) took over
+
+        if self.tools.tasks or self.tool_response == response:
+            # A function call has no text or audio of its own. Its result is sent
+            # with a response.create, and that response finishes the turn.
+            return
+
+        if not TEXT_ONLY_MODE:
+            # Written to disk on the archiver's thread, not here.
+            archiver = audio.response_archiver
+            if archiver.pending:
+                print(f"💾 Saving response audio ({archiver.pending} bytes)")
+                archiver.commit()
+            elif archiver.keep > 0:
+                print("⚠️ Response audio was empty, skipping save.")
+            audio.playback_done_event.set()
+
+        self.turns += 1
+        await asyncio.to_thread(trace.finish)
+        response_text = self.full_response_text.strip()
+        print(f"\n🧠 Full response: {response_text} ")
+        self.full_response_text = ""
+        self.first_text = True
+        self.last_activity[0] = time.time()
+
+        if self.run_mode == "dory":
+            print("🎣 Dory mode active. Ending session after single response.")
+            await self.stop_session()
+            return
+
+        # Same connection, same mic stream: just start listening again, dropping
+        # anything captured while the answer was still playing. The conversation
+        # ends when the silence timeout runs out, or on an interruption.
+        print("🔁 Listening...\n")
+        self.uplink.clear()
+        trace.begin()
+        self.set_state(LISTENING)
+
+    async def end_conversation(self):
+        # A pending finish_turn sees the session is inactive and returns on its own,
+        # leaving the audio of an unfinished response to be dropped here.
+        self.cancel_silence_timer()
+        audio.response_archiver.discard()
+        await self.tools.cancel()
+        await asyncio.to_thread(trace.finish)
+        print(f"\n🛑 Conversation ended after {self.turns} turn(s).")
+        self.set_state(IDLE)
+        stop_all_motors()
+        await self.close_ws()
 
     async def stop_session(self):
         print("🛑 Stopping session...")
         self.session_active.clear()
+        self.cancel_silence_timer()
         self.mic.stop()
+        await self.close_ws()
 
+    async def close_ws(self):
+        """Close this conversation's websocket and warm up one for the next."""
         async with self.ws_lock:
             if self.ws:
                 try:
@@ -503,6 +635,7 @@ class BillySession:
                 except Exception as e:
                     print(f"⚠️ Error closing websocket: {e}")
                 self.ws = None
+        await realtime.manager.prewarm()
 
     async def request_stop(self):
         print("🛑 Stop requested via external signal.")
@@ -519,15 +652,14 @@ class BillySession:
         stop_all_motors()
 
         filename = f"{code}.wav"
-        sound_path = os.path.join("sounds", filename)
 
         print(f"🛑 Error ({code}): {message or 'No message'}")
         print(f"🔊 Attempting to play {filename}...")
 
-        if os.path.exists(sound_path):
-            await asyncio.to_thread(audio.enqueue_wav_to_playback, sound_path)
-            await asyncio.to_thread(audio.playback_queue.join)
+        clip = assets.system_clip(code)
+        if clip:
+            await audio.enqueue_clip(clip)
         else:
-            print(f"⚠️ {sound_path} not found, skipping audio playback.")
+            print(f"⚠️ sounds/{filename} not found, skipping audio playback.")
 
         await self.stop_session()
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+from .config import CHUNK_MS, PLAYBACK_VOLUME
+from .lipsync import LipSyncPlanner
+from .resample import StreamingResampler, to_int16
+from .uplink import chunk_rms
+
+
+SONGS_DIR = "./sounds/songs"
+BUNDLE_DIR = ".bundle"
+# Bump when the bundle layout or the analysis changes, so old caches are rebuilt.
+BUNDLE_VERSION = 1
+OUTPUT_RATE = 48000
+ANALYSIS_RATE = 24000
+SOURCES = ("full.wav", "vocals.wav", "drums.wav", "metadata.txt")
+TAIL_FLAP_DURATION = 0.2
+
+
+def load_metadata(path):
+    metadata = {
+        "bpm": None,
+        "head_moves": [],
+        "tail_threshold": 1500,
+        "gain": 1.0,
+        "compensate_tail": 0.0,
+        "half_tempo_tail_flap": False,
+    }
+    if not os.path.exists(path):
+        print(f"⚠️ No metadata.txt found at {path}")
+        return metadata
+
+    with open(path) as f:
+        for line in f:
+            if '=' in line:
+                key, value = line.strip().split('=', 1)
+                if key == "head_moves":
+                    metadata[key] = [
+                        (float(v.split(':')[0]), float(v.split(':')[1]))
+                        for v in value.split(',')
+                    ]
+                elif key in ("bpm", "tail_threshold", "gain", "compensate_tail"):
+                    metadata[key] = float(value.strip())
+                elif key == "half_tempo_tail_flap":
+                    metadata[key] = value.strip().lower() == "true"
+    return metadata
+
+
+@dataclass
+class SongBundle:
+    """
+    A compiled song: output-ready 48 kHz stereo PCM (memory-mapped), the smoothed
+    vocal envelope per chunk, tail flap times on the beat grid and the head-move
+    timeline. Times are seconds from the start of the song.
+    """
+
+    name: str
+    path: str
+    meta: dict
+    audio: np.ndarray
+    envelope: np.ndarray
+    tail_times: np.ndarray
+    head_moves: np.ndarray
+
+    @property
+    def chunk_frames(self) -> int:
+        return int(OUTPUT_RATE * self.meta["chunk_ms"] / 1000)
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / OUTPUT_RATE
+
+    def chunks(self, start=0):
+        """
+        Yield `(frames, envelope, tail_offsets, head_moves)` per chunk from chunk
+        index `start`, with times relative to the chunk's first frame.
+        """
+        size = self.chunk_frames
+        seconds = size / OUTPUT_RATE
+        for index in range(start, -(-len(self.audio) // size)):
+            begin, end = index * seconds, (index + 1) * seconds
+            tails = self.tail_times[
+                np.searchsorted(self.tail_times, begin) : np.searchsorted(
+                    self.tail_times, end
+                )
+            ]
+            heads = self.head_moves[
+                (self.head_moves[:, 0] >= begin) & (self.head_moves[:, 0] < end)
+            ]
+            yield (
+                self.audio[index * size : (index + 1) * size],
+                self.envelope[index : index + 1],
+                tails - begin,
+                [(offset - begin, duration) for offset, duration in heads],
+            )
+
+
+def song_dir(song_name) -> str:
+    return os.path.join(SONGS_DIR, song_name)
+
+
+def source_key(path) -> str:
+    """
+    Fingerprint of everything a bundle is built from. WAVs are identified by size
+    and mtime (hashing them would cost as much as compiling); metadata.txt and the
+    settings that shape the analysis are hashed by content.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{BUNDLE_VERSION}:{CHUNK_MS}:{PLAYBACK_VOLUME}".encode())
+    for name in SOURCES:
+        file = os.path.join(path, name)
+        if not os.path.exists(file):
+            digest.update(f"{name}:missing".encode())
+        elif name.endswith(".wav"):
+            stat = os.stat(file)
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        else:
+            with open(file, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _read_mono(path, gain=1.0):
+    """Read a WAV as mono float32 (channels averaged) and its sample rate."""
+    with wave.open(path, 'rb') as wf:
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    mono = samples.reshape((-1, channels)).mean(axis=1, dtype=np.float32)
+    return mono * gain, rate
+
+
+def _tail_times(drums, metadata, head_moves, chunk_seconds):
+    """
+    Beat grid for the tail: on every beat the tail flaps if the drums peaked above
+    `tail_threshold` since the previous beat, unless a head move is in progress.
+    """
+    bpm = metadata.get("bpm") or 120
+    beat_length = 60.0 / bpm
+    if metadata.get("half_tempo_tail_flap"):
+        beat_length *= 2
+    # Beats fire early by `compensate_tail` beats to make up for tail motor lag.
+    offset = metadata.get("compensate_tail", 0.0) * beat_length
+
+    peaks = chunk_rms(drums, int(ANALYSIS_RATE * chunk_seconds))
+    if not len(peaks):
+        return np.zeros(0, dtype=np.float64)
+    chunk_times = np.arange(len(peaks)) * chunk_seconds
+
+    beats = np.arange(0, chunk_times[-1] + beat_length, beat_length) - offset
+    triggers = np.searchsorted(chunk_times, beats)
+    triggers = triggers[triggers < len(peaks)]
+
+    times = []
+    previous = 0
+    for trigger in triggers:
+        peak = peaks[previous : trigger + 1].max(initial=0)
+        previous = trigger + 1
+        when = chunk_times[trigger]
+        head_out = any(start <= when < start + length for start, length in head_moves)
+        if peak > metadata.get("tail_threshold", 1500) and not head_out:
+            times.append(when)
+    return np.asarray(times, dtype=np.float64)
+
+
+def compile_song(song_name, path=None) -> str:
+    """Build the bundle for a song directory; returns the bundle path."""
+    path = path or song_dir(song_name)
+    bundle = os.path.join(path, BUNDLE_DIR)
+    key = source_key(path)
+
+    metadata = load_metadata(os.path.join(path, "metadata.txt"))
+    gain = metadata.get("gain", 1.0)
+    head_moves = np.asarray(metadata.get("head_moves", []), dtype=np.float64).reshape(
+        -1, 2
+    )
+    chunk_seconds = CHUNK_MS / 1000
+
+    print(f"🛠️ Compiling song bundle for {song_name}...")
+    main, rate_main = _read_mono(os.path.join(path, "full.wav"), gain * PLAYBACK_VOLUME)
+    main = to_int16(StreamingResampler(rate_main, OUTPUT_RATE).process(main))
+
+    vocals, rate_vocals = _read_mono(os.path.join(path, "vocals.wav"), gain)
+    vocals = StreamingResampler(rate_vocals, ANALYSIS_RATE).process(vocals)
+    envelope = LipSyncPlanner(None, None, rate=ANALYSIS_RATE).envelope(vocals)
+
+    drums, rate_drums = _read_mono(os.path.join(path, "drums.wav"), gain)
+    drums = StreamingResampler(rate_drums, ANALYSIS_RATE).process(drums)
+    tail_times = _tail_times(drums, metadata, head_moves, chunk_seconds)
+
+    meta = {
+        "version": BUNDLE_VERSION,
+        "source_key": key,
+        "name": song_name,
+        "sample_rate": OUTPUT_RATE,
+        "channels": 2,
+        "chunk_ms": CHUNK_MS,
+        "frames": len(main),
+        "metadata": metadata,
+    }
+
+    # Build next to the final location and swap it in, so a crash mid-compile never
+    # leaves a bundle that looks valid.
+    staging = bundle + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(
+        os.path.join(staging, "audio.npy"), np.repeat(main[:, np.newaxis], 2, axis=1)
+    )
+    np.save(os.path.join(staging, "envelope.npy"), envelope.astype(np.float32))
+    np.save(os.path.join(staging, "tail.npy"), tail_times)
+    np.save(os.path.join(staging, "head.npy"), head_moves)
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(bundle, ignore_errors=True)
+    os.replace(staging, bundle)
+    print(
+        f"✅ Compiled {song_name}: {len(main) / OUTPUT_RATE:.1f}s, "
+        f"{len(tail_times)} tail flaps, {len(head_moves)} head moves"
+    )
+    return bundle
+
+
+def _load_meta(bundle):
+    try:
+        with open(os.path.join(bundle, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_song(song_name, path=None) -> SongBundle:
+    """Open a song's bundle, compiling it first if it is missing or stale."""
+    path = path or song_dir(song_name)
+    bundle = os.path.join(path, BUNDLE_DIR)
+    meta = _load_meta(bundle)
+    if meta is None or meta.get("source_key") != source_key(path):
+        compile_song(song_name, path)
+        meta = _load_meta(bundle)
+
+    return SongBundle(
+        name=song_name,
+        path=bundle,
+        meta=meta,
+        audio=np.load(os.path.join(bundle, "audio.npy"), mmap_mode="r"),
+        envelope=np.load(os.path.join(bundle, "envelope.npy")),
+        tail_times=np.load(os.path.join(bundle, "tail.npy")),
+        head_moves=np.load(os.path.join(bundle, "head.npy")).reshape(-1, 2),
+    )
+
+
+if __name__ == "__main__":
+    # python -m core.songs [song ...]: compile bundles ahead of time
+    names = sys.argv[1:] or sorted(
+        d for d in os.listdir(SONGS_DIR) if os.path.isdir(song_dir(d))
+    )
+    for name in names:
+        compile_song(name)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+from .config import TOOL_TIMEOUT_SECONDS, TRACE_HISTORY
+
+
+# Per tool: outcome counts and the latency in ms of its recent calls, across
+# sessions. Outcomes are "ok", "error", "timeout" and "cancelled".
+counts: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+latency: dict[str, deque] = defaultdict(lambda: deque(maxlen=TRACE_HISTORY))
+_lock = threading.Lock()
+
+
+def record(name, outcome, ms):
+    with _lock:
+        counts[name][outcome] += 1
+        latency[name].append(ms)
+
+
+def summary() -> dict:
+    """Calls per outcome and p50/p95 latency in ms of each tool."""
+    with _lock:
+        snapshot = {name: (dict(counts[name]), list(latency[name])) for name in counts}
+
+    result = {}
+    for name, (outcomes, values) in snapshot.items():
+        result[name] = dict(outcomes)
+        if values:
+            p50, p95 = np.percentile(values, [50, 95])
+            result[name]["p50"] = round(float(p50), 1)
+            result[name]["p95"] = round(float(p95), 1)
+    return result
+
+
+def publish_summary():
+    from .mqtt import mqtt_available, mqtt_publish
+
+    if mqtt_available():
+        mqtt_publish("billy/tools", json.dumps(summary()), retain=True, retry=False)
+
+
+class ToolExecutor:
+    """
+    Runs the assistant's function calls as asyncio tasks next to the websocket
+    loop, so audio deltas and cancellations keep being handled while a tool
+    waits on Home Assistant or the SD card.
+
+    Each tool is an async function taking the parsed arguments and returning a
+    JSON-serialisable result, or None if it has nothing to report (e.g. it ends
+    the conversation). Calls that take longer than their timeout are cancelled
+    and reported to the model as an error. Results are sent back as
+    function_call_output items, followed by a response.create once no other
+    call is outstanding, so the model answers with all results at hand.
+    """
+
+    def __init__(self, send, timeout=TOOL_TIMEOUT_SECONDS):
+        # async send(event: dict), e.g. a locked ws.send of the JSON.
+        self.send = send
+        self.timeout = timeout
+        self.tools = {}
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    def register(self, name, fn, timeout=None):
+        self.tools[name] = (fn, timeout or self.timeout)
+
+    def submit(self, data: dict) -> asyncio.Task | None:
+        """Start the call described by a response.function_call_arguments.done event."""
+        name = data.get("name")
+        call_id = data.get("call_id") or f"call_{len(self.tasks)}"
+        if name not in self.tools:
+            print(f"⚠️ Unknown tool requested: {name}")
+            return None
+        task = asyncio.create_task(self._run(name, call_id, data.get("arguments")))
+        self.tasks[call_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(call_id, None))
+        return task
+
+    async def _run(self, name, call_id, arguments):
+        fn, timeout = self.tools[name]
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            args = json.loads(arguments or "{}")
+            result = await asyncio.wait_for(fn(args), timeout)
+        except TimeoutError:
+            outcome = "timeout"
+            result = {"error": f"{name} timed out after {timeout:g}s"}
+        except asyncio.CancelledError:
+            record(name, "cancelled", (time.monotonic() - started) * 1000)
+            raise
+        except Exception as e:
+            outcome = "error"
+            result = {"error": str(e)}
+
+        ms = (time.monotonic() - started) * 1000
+        record(name, outcome, ms)
+        print(f"🧰 Tool {name}: {outcome} in {ms:.0f} ms")
+        publish_summary()
+
+        if result is None:
+            return
+        await self.send({
+            "type": "conversation.item.create",
+            "item": {
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": json.dumps(result),
+            },
+        })
+        # This task is still in self.tasks until it returns.
+        if len(self.tasks) <= 1:
+            await self.send({"type": "response.create"})
+
+    async def cancel(self):
+        """Cancel outstanding calls, e.g. when the conversation is interrupted."""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
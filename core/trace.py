@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+from .config import TRACE_FILE, TRACE_FILE_MAX_BYTES, TRACE_HISTORY
+
+
+# Points a turn passes through, in the order they normally happen. Each is recorded
+# once per trace, as milliseconds since the trace started (the button press for the
+# first turn of a conversation, the return to listening for follow-ups).
+POINTS = (
+    "button",  # on_button accepted the press
+    "connected",  # websocket handed over (warm) or opened (cold)
+    "session_updated",  # session.update acknowledged, audio can flow
+    "speech_stopped",  # server VAD decided the user finished speaking
+    "first_delta",  # first response.audio.delta arrived
+    "first_write",  # playback_worker wrote the first response sample
+    "first_heard",  # ...and the time that sample reaches the speaker
+    "response_done",  # response.done arrived
+)
+
+# Intervals summarised across traces: (name, from point, to point).
+SPANS = (
+    ("connect", "button", "connected"),
+    ("bootstrap", "button", "session_updated"),
+    ("server", "speech_stopped", "first_delta"),
+    ("decode", "first_delta", "first_write"),
+    ("output", "first_write", "first_heard"),
+    ("turn", "speech_stopped", "first_heard"),
+    ("response", "first_delta", "response_done"),
+)
+
+
+class Trace:
+    """Timestamps of the points one conversation turn passed through."""
+
+    def __init__(self, kind="turn", start=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.start = time.monotonic() if start is None else start
+        self.wall = time.time() - (time.monotonic() - self.start)
+        self.points: dict[str, float] = {}
+
+    def mark(self, point, at=None):
+        """Record `point` at monotonic time `at` (None = now); first one wins."""
+        if point not in self.points:
+            at = time.monotonic() if at is None else at
+            self.points[point] = round((at - self.start) * 1000, 2)
+
+    def spans(self) -> dict[str, float]:
+        return {
+            name: round(self.points[end] - self.points[begin], 2)
+            for name, begin, end in SPANS
+            if begin in self.points and end in self.points
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "time": round(self.wall, 3),
+            "points": self.points,
+            "spans": self.spans(),
+        }
+
+
+# The trace being recorded, and the most recent finished ones. Points arrive from
+# the button thread, the runtime loop and the playback worker.
+current: Trace | None = None
+history: deque = deque(maxlen=TRACE_HISTORY)
+_lock = threading.Lock()
+
+
+def begin(kind="turn", start=None) -> Trace:
+    """Start a new trace, dropping an unfinished one."""
+    global current
+    with _lock:
+        current = Trace(kind, start)
+        return current
+
+
+def mark(point, at=None):
+    """Record `point` on the current trace, if there is one."""
+    with _lock:
+        if current is not None:
+            current.mark(point, at)
+
+
+def finish() -> Trace | None:
+    """
+    Close the current trace: keep it in `history`, append it to TRACE_FILE and
+    publish the updated summary. Does file and network I/O, so keep it off the
+    event loop and the audio threads.
+    """
+    global current
+    with _lock:
+        trace, current = current, None
+        if trace is None or not trace.points:
+            return None
+        history.append(trace)
+
+    record = trace.to_dict()
+    if record["spans"]:
+        print(
+            "⏱️ Trace: "
+            + ", ".join(f"{name} {ms:.0f} ms" for name, ms in record["spans"].items())
+        )
+    _write(record)
+    publish_summary()
+    return trace
+
+
+def _write(record):
+    if not TRACE_FILE:
+        return
+    try:
+        directory = os.path.dirname(TRACE_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Keep one old file around instead of growing without bound on the SD card.
+        if (
+            os.path.exists(TRACE_FILE)
+            and os.path.getsize(TRACE_FILE) > TRACE_FILE_MAX_BYTES
+        ):
+            os.replace(TRACE_FILE, TRACE_FILE + ".1")
+        with open(TRACE_FILE, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write trace: {e}")
+
+
+def summary() -> dict:
+    """p50/p95 in ms of each span over the traces in `history`."""
+    with _lock:
+        traces = list(history)
+
+    result = {}
+    for name, _, _ in SPANS:
+        values = [s[name] for s in (t.spans() for t in traces) if name in s]
+        if values:
+            p50, p95 = np.percentile(values, [50, 95])
+            result[name] = {
+                "p50": round(float(p50), 1),
+                "p95": round(float(p95), 1),
+                "n": len(values),
+            }
+    return result
+
+
+def publish_summary():
+    from .mqtt import mqtt_available, mqtt_publish
+
+    if mqtt_available():
+        mqtt_publish("billy/latency", json.dumps(summary()), retain=True, retry=False)
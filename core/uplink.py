@@ -0,0 +1,170 @@
+import asyncio
+import contextlib
+import time
+
+import numpy as np
+
+from .ringbuffer import RingBuffer
+
+
+class MicUplink:
+    """
+    Moves microphone audio from the PortAudio callback to the realtime websocket.
+
+    The callback side (`push`) only copies frames into a ring buffer. A task on the
+    session's event loop (`run`) drains the ring, hands each batch to `analyse` and
+    `send`, and grows the batch from `min_batch_ms` up to `max_batch_ms` while audio
+    piles up behind a slow send, so a congested link costs fewer, larger appends
+    instead of stalling capture.
+
+    Capture can begin before the websocket is ready: the ring then holds the
+    pre-roll until `start` is called. Frames pushed with `echo=True` (captured while
+    Billy himself was playing audio) are silenced per chunk unless they are louder
+    than `echo_threshold`, so the wake-up clip isn't sent upstream as user speech
+    while someone talking over it still is.
+
+    With a `gate` (core.vad.VoiceActivityGate), only the audio it passes is sent;
+    `analyse` still sees everything captured.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        send,
+        analyse=None,
+        capacity_ms=2000,
+        min_batch_ms=50,
+        max_batch_ms=200,
+        chunk_size=None,
+        echo_threshold=None,
+        gate=None,
+    ):
+        self.rate = rate
+        self.send = send
+        self.analyse = analyse
+        # Channel 0 holds the samples, channel 1 whether they were captured as echo.
+        self.ring = RingBuffer(int(rate * capacity_ms / 1000), 2)
+        self.min_batch = int(rate * min_batch_ms / 1000)
+        self.max_batch = int(rate * max_batch_ms / 1000)
+        self.chunk_size = chunk_size or self.min_batch
+        self.echo_threshold = echo_threshold
+        self.gate = gate
+        self.task: asyncio.Task | None = None
+
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.sent_frames = 0
+        self.sent_batches = 0
+        self.send_errors = 0
+        self.last_batch_ms = 0.0
+        self.last_send_ms = 0.0
+        self.max_backlog_ms = 0.0
+        self.gated_frames = 0
+
+    def push(self, indata, echo=False):
+        """Copy the first mic channel into the ring. Safe for the audio callback."""
+        samples = indata[:, 0] if indata.ndim > 1 else indata
+        self.captured_frames += len(samples)
+        written = self.ring.write(
+            np.column_stack((samples, np.full(len(samples), echo, dtype=np.int16)))
+        )
+        if written < len(samples):
+            self.dropped_frames += len(samples) - written
+
+    def backlog_ms(self) -> float:
+        return self.ring.available() * 1000 / self.rate
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+        self.task = None
+
+    def clear(self):
+        """Drop captured audio that hasn't been sent yet."""
+        self.ring.request_flush()
+        if self.gate:
+            self.gate.reset()
+
+    async def run(self):
+        poll = self.min_batch / self.rate / 2
+        while True:
+            if self.ring.available() < self.min_batch:
+                await asyncio.sleep(poll)
+                continue
+
+            backlog = self.backlog_ms()
+            self.max_backlog_ms = max(self.max_backlog_ms, backlog)
+
+            frames = self.ring.read(self.max_batch)
+            samples = self._gate_echo(frames[:, 0], frames[:, 1])
+            self.last_batch_ms = len(samples) * 1000 / self.rate
+
+            if self.analyse:
+                self.analyse(samples)
+            if self.gate:
+                samples = self.gate.process(samples)
+                if not len(samples):
+                    continue
+
+            started = time.monotonic()
+            try:
+                await self.send(samples)
+                self.sent_frames += len(samples)
+                self.sent_batches += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.send_errors += 1
+                print(f"❌ Failed to send audio chunk: {e}")
+            self.last_send_ms = (time.monotonic() - started) * 1000
+
+    def _gate_echo(self, samples, echo):
+        if self.echo_threshold is None or not echo.any():
+            return samples
+
+        samples = samples.copy()
+        for start in range(0, len(samples), self.chunk_size):
+            block = slice(start, start + self.chunk_size)
+            if not echo[block].any():
+                continue
+            if chunk_rms(samples[block], self.chunk_size)[0] < self.echo_threshold:
+                samples[block] = 0
+                self.gated_frames += len(samples[block])
+        return samples
+
+    def stats(self) -> dict:
+        stats = {
+            "captured_frames": self.captured_frames,
+            "dropped_frames": self.dropped_frames,
+            "gated_frames": self.gated_frames,
+            "sent_frames": self.sent_frames,
+            "sent_batches": self.sent_batches,
+            "send_errors": self.send_errors,
+            "backlog_ms": round(self.backlog_ms(), 1),
+            "max_backlog_ms": round(self.max_backlog_ms, 1),
+            "last_batch_ms": round(self.last_batch_ms, 1),
+            "last_send_ms": round(self.last_send_ms, 1),
+            # PCM16 at the capture rate, before resampling and base64.
+            "captured_bytes": self.captured_frames * 2,
+            "sent_bytes": self.sent_frames * 2,
+        }
+        if self.gate:
+            stats["vad"] = self.gate.stats()
+        return stats
+
+
+def chunk_rms(samples, chunk_size) -> np.ndarray:
+    """RMS of each consecutive `chunk_size` block (the tail block may be shorter)."""
+    samples = np.asarray(samples, dtype=np.float32)
+    full = len(samples) // chunk_size * chunk_size
+    rms = np.sqrt(np.mean(np.square(samples[:full].reshape(-1, chunk_size)), axis=1))
+    if full < len(samples):
+        rms = np.append(rms, np.sqrt(np.mean(np.square(samples[full:]))))
+    return rms
@@ -0,0 +1,124 @@
+from collections import deque
+
+import numpy as np
+
+
+class VoiceActivityGate:
+    """
+    Local voice activity detection in front of the uplink, so silence isn't
+    streamed to the realtime API.
+
+    Audio is judged in `frame_ms` frames, all frames of a batch at once: a frame
+    starts speech if it is louder than `threshold` (RMS) and its spectrum is
+    peaky rather than noise-like (spectral flatness below `max_flatness`). Once
+    speech has started, loudness alone keeps it going, so unvoiced sounds don't
+    cut it off, and `hangover_ms` more audio is forwarded after the last speech
+    frame, which lets the server VAD hear the pause that ends a turn.
+
+    The last `preroll_ms` of gated audio is kept and sent ahead of the first
+    speech frame so word onsets aren't clipped. While gated, one frame is still
+    forwarded every `keepalive_ms`, so the server keeps receiving audio.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        threshold: float,
+        max_flatness=0.45,
+        frame_ms=20,
+        hangover_ms=800,
+        preroll_ms=300,
+        keepalive_ms=2000,
+    ):
+        self.rate = rate
+        self.threshold = threshold
+        self.max_flatness = max_flatness
+        self.frame_size = max(1, int(rate * frame_ms / 1000))
+        self.hangover_frames = int(hangover_ms / frame_ms)
+        self.keepalive_frames = max(1, int(keepalive_ms / frame_ms))
+        self.window = np.hanning(self.frame_size).astype(np.float32)
+        self.preroll = deque(maxlen=int(preroll_ms / frame_ms))
+
+        self.speech_frames = 0
+        self.forwarded_frames = 0
+        self.gated_frames = 0
+        self.keepalives = 0
+        self.onsets = 0
+        self.reset()
+
+    def reset(self):
+        """Forget buffered audio and end any speech in progress."""
+        self.active = False
+        self.hangover = 0
+        self.since_sent = 0
+        self.preroll.clear()
+        self._rest = np.zeros(0, dtype=np.int16)
+
+    def features(self, frames: np.ndarray):
+        """RMS and spectral flatness of each row of `frames`."""
+        frames = frames.astype(np.float32)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        power = np.square(np.abs(np.fft.rfft(frames * self.window, axis=1)[:, 1:]))
+        power += 1e-6
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return rms, flatness
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Return the part of `samples` (plus pre-roll) that should be sent. A partial
+        frame at the end is held back until the next call.
+        """
+        samples = np.concatenate((self._rest, samples))
+        count = len(samples) // self.frame_size
+        self._rest = samples[count * self.frame_size :]
+        if not count:
+            return self._rest[:0]
+
+        frames = samples[: count * self.frame_size].reshape(count, self.frame_size)
+        rms, flatness = self.features(frames)
+        loud = rms > self.threshold
+        voiced = loud & (flatness < self.max_flatness)
+
+        out = []
+        for i, frame in enumerate(frames):
+            if voiced[i] or (self.active and loud[i]):
+                if not self.active:
+                    self.active = True
+                    self.onsets += 1
+                    out.extend(self.preroll)
+                    self.preroll.clear()
+                self.hangover = self.hangover_frames
+                self.speech_frames += 1
+                out.append(frame)
+            elif self.hangover > 0:
+                self.hangover -= 1
+                self.active = self.hangover > 0
+                out.append(frame)
+            else:
+                self.active = False
+                self.since_sent += 1
+                if self.since_sent >= self.keepalive_frames:
+                    self.since_sent = 0
+                    self.keepalives += 1
+                    out.append(frame)
+                else:
+                    if len(self.preroll) == self.preroll.maxlen:
+                        self.gated_frames += 1
+                    self.preroll.append(frame)
+                continue
+            self.since_sent = 0
+
+        if not out:
+            return samples[:0]
+        self.forwarded_frames += len(out)
+        return np.concatenate(out)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "onsets": self.onsets,
+            "speech_frames": self.speech_frames,
+            "forwarded_frames": self.forwarded_frames,
+            "gated_frames": self.gated_frames,
+            "keepalives": self.keepalives,
+        }
@@ -7,7 +7,8 @@ import wave
 
 import websockets.legacy.client
 
-from .config import CUSTOM_INSTRUCTIONS, OPENAI_API_KEY, OPENAI_MODEL, VOICE
+from .config import CUSTOM_INSTRUCTIONS, VOICE
+from .realtime import realtime_headers, realtime_uri
 
 
 WAKEUP_DIR = os.path.abspath(
@@ -28,11 +29,8 @@ def generate_wake_clip_async(prompt, index):
     path = os.path.join(WAKEUP_DIR, f"{index}.wav")
 
     async def _generate():
-        uri = f"wss://api.openai.com/v1/realtime?model={OPENAI_MODEL}"
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "openai-beta": "realtime=v1",
-        }
+        uri = realtime_uri()
+        headers = realtime_headers()
 
         print(f"🔊 Connecting to OpenAI realtime for: {prompt} → {index}", flush=True)
 
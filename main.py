@@ -34,6 +34,7 @@ load_dotenv()
 
 # --- Imports that might use environment variables ---
 import core.button
+import core.ha
 from core.audio import playback_queue
 from core.movements import start_motor_watchdog, stop_all_motors
 from core.mqtt import start_mqtt, stop_mqtt
@@ -44,6 +45,7 @@ def signal_handler(sig, frame):
     playback_queue.put(None)
     stop_all_motors()
     stop_mqtt()
+    core.ha.close()
     sys.exit(0)
 
 
@@ -0,0 +1,148 @@
+"""
+Compare the realtime audio formats (pcm16, G.711 μ-law/A-law) for Billy's uplink
+(mic → resample → encode → base64 JSON append) and downlink (delta → base64
+decode → decode → resample to 24 kHz): bytes on the wire and CPU per second of
+audio, plus the SNR of each codec's quantisation (against the same response audio
+band-limited to the codec's sample rate, so the 8 kHz bandwidth isn't counted).
+
+Usage: python test/bench_codec.py [--seconds 20] [--mic-rate 48000] [--chunk-ms 50]
+                                  [--delta-ms 100]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core import codec
+from core.resample import StreamingResampler
+
+
+def make_signal(rate, seconds):
+    t = np.arange(int(rate * seconds)) / rate
+    voiceish = np.sin(2 * np.pi * 180 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    voiceish += 0.3 * np.sin(2 * np.pi * 1200 * t)
+    noise = np.random.default_rng(0).normal(0, 0.05, t.size)
+    return (np.clip(voiceish / 1.3 + noise, -1, 1) * 12000).astype(np.int16)
+
+
+def run_uplink(audio_codec, signal, rate, chunk):
+    encoder = codec.Encoder(audio_codec, rate)
+    wire = 0
+    for i in range(0, len(signal), chunk):
+        payload = encoder.encode(signal[i : i + chunk])
+        wire += len(
+            json.dumps({
+                "type": "input_audio_buffer.append",
+                "audio": base64.b64encode(payload).decode("utf-8"),
+            })
+        )
+    return wire
+
+
+def make_deltas(audio_codec, signal, step):
+    """What the server would send: 24 kHz audio in `audio_codec`, as delta events."""
+    encoder = codec.Encoder(audio_codec, codec.API_RATE)
+    return [
+        json.dumps({
+            "type": "response.audio.delta",
+            "delta": base64.b64encode(encoder.encode(signal[i : i + step])).decode(),
+        })
+        for i in range(0, len(signal), step)
+    ]
+
+
+def run_downlink(audio_codec, deltas):
+    decoder = codec.Decoder(audio_codec)
+    out = [
+        decoder.decode(base64.b64decode(json.loads(message)["delta"]))
+        for message in deltas
+    ]
+    return np.frombuffer(b"".join(out), dtype=np.int16)
+
+
+def band_limited(signal, rate):
+    """`signal` (24 kHz) down to `rate` and back, through the same resamplers."""
+    down = StreamingResampler(codec.API_RATE, rate).process_int16(signal)
+    return StreamingResampler(rate, codec.API_RATE).process_int16(down)
+
+
+def snr_db(reference, decoded):
+    reference = reference.astype(np.float64)
+    size = min(len(reference), len(decoded))
+    error = reference[:size] - decoded[:size].astype(np.float64)
+    return 10 * np.log10(np.mean(reference[:size] ** 2) / max(np.mean(error**2), 1e-12))
+
+
+def cpu_per_second(fn, seconds, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.process_time()
+        result = fn()
+        best = min(best, time.process_time() - start)
+    return best / seconds, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--mic-rate", type=int, default=48000)
+    parser.add_argument("--chunk-ms", type=int, default=50)
+    parser.add_argument("--delta-ms", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    mic = make_signal(args.mic_rate, args.seconds)
+    chunk = int(args.mic_rate * args.chunk_ms / 1000)
+    voice = make_signal(codec.API_RATE, args.seconds)
+
+    print(
+        f"📡 Per second of audio: mic {args.mic_rate} Hz in {args.chunk_ms} ms appends, "
+        f"response in {args.delta_ms} ms deltas (best of {args.repeats})"
+    )
+    print(
+        f"{'codec':<10} {'up kB/s':>9} {'up CPU':>10} {'down kB/s':>10} "
+        f"{'down CPU':>10} {'SNR':>8}"
+    )
+    baseline = None
+    for name, audio_codec in codec.CODECS.items():
+        up_cpu, up_bytes = cpu_per_second(
+            lambda c=audio_codec: run_uplink(c, mic, args.mic_rate, chunk),
+            args.seconds,
+            args.repeats,
+        )
+        deltas = make_deltas(
+            audio_codec, voice, int(codec.API_RATE * args.delta_ms / 1000)
+        )
+        down_bytes = sum(len(message) for message in deltas)
+        down_cpu, decoded = cpu_per_second(
+            lambda c=audio_codec, d=deltas: run_downlink(c, d),
+            args.seconds,
+            args.repeats,
+        )
+        if name == "pcm16":
+            snr = float("inf")
+            baseline = (up_bytes, down_bytes)
+        else:
+            snr = snr_db(band_limited(voice, audio_codec.rate), decoded)
+        print(
+            f"{name:<10} {up_bytes / args.seconds / 1000:>9.1f} "
+            f"{up_cpu * 1000:>7.2f} ms {down_bytes / args.seconds / 1000:>10.1f} "
+            f"{down_cpu * 1000:>7.2f} ms {snr:>5.1f} dB"
+        )
+        if baseline and name != "pcm16":
+            print(
+                f"{'':<10} {up_bytes / baseline[0]:>8.0%} of pcm16 up, "
+                f"{down_bytes / baseline[1]:.0%} down"
+            )
+
+
+if __name__ == "__main__":
+    main()
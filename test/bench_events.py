@@ -0,0 +1,181 @@
+"""
+Events per second through the realtime message path: decoding each websocket
+message (JSON parse, base64 audio) and finding its handler. Compares the old way
+(json.loads + base64.b64decode + an if-chain on the type) with core.events
+(audio delta fast path, orjson when installed) and a dispatch table.
+
+Messages come from a recorded session if one is given, otherwise from a
+synthetic response: one audio delta and one transcript delta per --delta-ms of
+24 kHz PCM16, shaped like the server's events.
+
+Usage: python test/bench_events.py [session.jsonl.gz] [--seconds 30]
+                                   [--delta-ms 100] [--repeats 5]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core import events, recorder
+
+
+def synthetic_messages(seconds, delta_ms):
+    rng = np.random.default_rng(0)
+    step = int(24000 * delta_ms / 1000)
+    ids = {"response_id": "resp_C1a2b3c4d5", "item_id": "item_C1a2b3c4d6"}
+    messages = [{"type": "response.created", "response": {"id": ids["response_id"]}}]
+    for i in range(int(seconds * 1000 / delta_ms)):
+        pcm = rng.normal(0, 3000, step).astype(np.int16).tobytes()
+        messages.append({
+            "type": "response.audio.delta",
+            "event_id": f"event_{i:012d}a",
+            **ids,
+            "output_index": 0,
+            "content_index": 0,
+            "delta": base64.b64encode(pcm).decode(),
+        })
+        messages.append({
+            "type": "response.audio_transcript.delta",
+            "event_id": f"event_{i:012d}b",
+            **ids,
+            "output_index": 0,
+            "content_index": 0,
+            "delta": " word",
+        })
+    messages.append({"type": "response.done", "response": {"status": "completed"}})
+    return [json.dumps(m, separators=(",", ":")) for m in messages]
+
+
+def recorded_messages(path):
+    return [
+        json.dumps(record["event"], separators=(",", ":"))
+        for record in recorder.load(path)
+        if record["dir"] == "recv"
+    ]
+
+
+HANDLED = (
+    "response.audio_transcript.done",
+    "input_audio_buffer.speech_started",
+    "input_audio_buffer.speech_stopped",
+    "input_audio_buffer.committed",
+    "response.created",
+    "response.audio",
+    "response.audio.delta",
+    "response.audio_transcript.delta",
+    "response.text.delta",
+    "response.function_call_arguments.done",
+    "response.done",
+    "error",
+)
+
+
+def old_path(messages):
+    """
+    json.loads, then the type checks BillySession.handle_message used to make, in
+    the same order (its elif branches folded into `or`s).
+    """
+    handled = 0
+    for message in messages:
+        data = json.loads(message)
+        if data["type"] == "response.audio_transcript.done":
+            handled += 1
+        if (
+            data["type"] == "input_audio_buffer.speech_started"
+            or data["type"] == "input_audio_buffer.speech_stopped"
+            or data["type"] in ("input_audio_buffer.committed", "response.created")
+        ):
+            handled += 1
+        if data["type"] in ("response.audio", "response.audio.delta"):
+            base64.b64decode(data.get("audio") or data.get("delta"))
+            handled += 1
+        if (
+            data["type"] in ("response.audio_transcript.delta", "response.text.delta")
+            and "delta" in data
+        ):
+            handled += 1
+        if (
+            data["type"] == "response.function_call_arguments.done"
+            or data["type"] == "response.done"
+            or data["type"] == "error"
+        ):
+            handled += 1
+    return handled
+
+
+def audio_handler(data):
+    events.decode_audio(data["delta"])
+    return 1
+
+
+TABLE = dict.fromkeys(HANDLED, lambda data: 1)
+TABLE["response.audio.delta"] = audio_handler
+
+
+def new_path(messages):
+    """core.events.parse and a type → handler table."""
+    handled = 0
+    for message in messages:
+        data = events.parse(message)
+        handler = TABLE.get(data.get("type"))
+        if handler is not None:
+            handled += handler(data)
+    return handled
+
+
+def events_per_second(fn, messages, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.process_time()
+        fn(messages)
+        best = min(best, time.process_time() - start)
+    return len(messages) / best, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("recording", nargs="?")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--delta-ms", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.recording:
+        messages = recorded_messages(args.recording)
+        source = args.recording
+    else:
+        messages = synthetic_messages(args.seconds, args.delta_ms)
+        source = f"{args.seconds:.0f}s synthetic response, {args.delta_ms} ms deltas"
+    audio_share = sum('"response.audio.delta"' in m[:40] for m in messages)
+    megabytes = sum(len(m) for m in messages) / 1e6
+    print(
+        f"📨 {len(messages)} events ({audio_share} audio deltas, {megabytes:.1f} MB) "
+        f"from {source}; best of {args.repeats}, CPU time"
+    )
+
+    backends = [("json", json.loads)]
+    if events.orjson:
+        backends.append(("orjson", events.orjson.loads))
+
+    baseline, _ = events_per_second(old_path, messages, args.repeats)
+    print(f"{'path':<34} {'events/s':>10} {'µs/event':>9} {'speedup':>8}")
+    print(f"{'json.loads + if-chain':<34} {baseline:>10.0f} {1e6 / baseline:>9.1f}")
+    for name, loads in backends:
+        events.loads = loads
+        rate, _ = events_per_second(new_path, messages, args.repeats)
+        label = f"events.parse ({name}) + table"
+        print(f"{label:<34} {rate:>10.0f} {1e6 / rate:>9.1f} {rate / baseline:>7.1f}x")
+    if not events.orjson:
+        print("  (orjson not installed; pip install orjson to compare)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark Home Assistant requests against a local stand-in for HA's conversation
+API: a new aiohttp session per request (how core.ha used to do it) versus the
+pooled, kept-alive core.ha.HomeAssistantClient. Reports latency percentiles, the
+connections the server saw and the client's retries and latency histogram.
+
+The stand-in answers after --delay-ms, fails --fail-rate of requests with a 503,
+closes idle connections after --server-keepalive seconds and, with --tls, serves
+HTTPS with a throwaway self-signed certificate (needs the openssl command), which
+is where connection reuse saves the most.
+
+Usage: python test/bench_ha.py [--calls 50] [--delay-ms 20] [--gap-ms 200]
+                               [--fail-rate 0.0] [--server-keepalive 75] [--tls]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PATH = "/api/conversation/process"
+
+
+def make_certificate(directory):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+            "-keyout", key, "-out", cert,
+        ],
+        check=True,
+        capture_output=True,
+    )  # fmt: skip
+    return cert, key
+
+
+async def start_stand_in(args, cert=None, key=None):
+    """Serve a fake conversation endpoint; returns (base URL, runner, peers seen)."""
+    import ssl
+
+    from aiohttp import web
+
+    peers = set()
+    rng = random.Random(0)
+
+    async def conversation(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        await asyncio.sleep(args.delay_ms / 1000)
+        if rng.random() < args.fail_rate:
+            return web.Response(status=503)
+        speech = f"Done: {body.get('text', '')}"
+        return web.json_response({
+            "response": {"speech": {"plain": {"speech": speech}}, "data": {}}
+        })
+
+    app = web.Application()
+    app.router.add_post(PATH, conversation)
+    runner = web.AppRunner(app, keepalive_timeout=args.server_keepalive)
+    await runner.setup()
+    context = None
+    if cert:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert, key)
+    site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=context)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return f"{'https' if cert else 'http'}://127.0.0.1:{port}", runner, peers
+
+
+async def per_call_session(url, payload):
+    import aiohttp
+
+    from core.ha import HomeAssistantError
+
+    async with (
+        aiohttp.ClientSession() as session,
+        session.post(url + PATH, json=payload) as resp,
+    ):
+        if resp.status != 200:
+            raise HomeAssistantError(f"HTTP {resp.status}")
+        return await resp.json()
+
+
+async def run(args, url, peers, pooled):
+    from core.ha import HomeAssistantClient, HomeAssistantError
+
+    client = HomeAssistantClient(host=url, token="bench")
+    latencies, failures = [], 0
+    peers.clear()
+    for i in range(args.calls):
+        payload = {"text": f"turn on light {i}", "language": "en"}
+        started = time.perf_counter()
+        try:
+            if pooled:
+                await client.post(PATH, payload)
+            else:
+                await per_call_session(url, payload)
+        except (HomeAssistantError, TimeoutError, OSError):
+            failures += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(args.gap_ms / 1000)
+    await client.close()
+    return np.asarray(latencies), failures, len(peers), client.stats()
+
+
+async def main_async(args, cert, key):
+    url, runner, peers = await start_stand_in(args, cert, key)
+    print(
+        f"🏠 Stand-in HA at {url}: {args.delay_ms} ms per request, "
+        f"{args.fail_rate:.0%} answered 503; {args.calls} calls {args.gap_ms} ms apart"
+    )
+    print(
+        f"{'client':<20} {'p50':>8} {'p95':>8} {'max':>8} "
+        f"{'failed':>7} {'connections':>12}"
+    )
+    try:
+        for name, pooled in (("session per call", False), ("pooled client", True)):
+            latencies, failures, connections, stats = await run(
+                args, url, peers, pooled
+            )
+            print(
+                f"{name:<20} {np.percentile(latencies, 50):>5.1f} ms "
+                f"{np.percentile(latencies, 95):>5.1f} ms {latencies.max():>5.1f} ms "
+                f"{failures:>7} {connections:>12}"
+            )
+        print(f"\n📊 Pooled client: {stats}")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--gap-ms", type=float, default=200)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument(
+        "--server-keepalive",
+        type=float,
+        default=75,
+        help="seconds the stand-in keeps idle connections open (HA: 75)",
+    )
+    args = parser.parse_args()
+
+    cert = key = None
+    if args.tls:
+        cert, key = make_certificate(tempfile.mkdtemp(prefix="billy-ha-bench-"))
+        # aiohttp builds its verifying SSL context on import, so trust the
+        # throwaway certificate before that.
+        os.environ["SSL_CERT_FILE"] = cert
+    asyncio.run(main_async(args, cert, key))
+
+
+if __name__ == "__main__":
+    main()
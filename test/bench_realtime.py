@@ -0,0 +1,218 @@
+"""
+Drive BillySession and say() against the local mock realtime server
+(test/mock_realtime.py) and report per-stage latency from core.trace.
+
+The microphone is replaced by synthetic speech, so no input device is needed;
+playback goes to the default output device (a dummy/null sink is fine), or
+nowhere with --text-only. Motors go to the simulated driver, whose flaps, duty
+cycle and command rate are reported as well.
+
+Usage: python test/bench_realtime.py [--sessions 5] [--say 3] [--follow-ups 1]
+                                     [--delta-ms 100] [--jitter-ms 20] [--cold]
+                                     [--motor-timeline motors.csv]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_realtime import (
+    MockRealtimeServer,
+    add_arguments,
+    config_from_args,
+    synthetic_speech,
+)
+
+
+class SyntheticMic:
+    """
+    Stands in for core.mic.MicManager: feeds the session's mic callback in real time
+    with an utterance each of the first `utterances` times the session starts
+    listening, then silence, so the conversation ends on the silence timeout.
+    """
+
+    def __init__(self, session, rate, chunk, speech_seconds, utterances=1):
+        self.session = session
+        self.rate = rate
+        self.chunk = chunk
+        self.utterances = utterances
+        self.speech = synthetic_speech(speech_seconds, seed=1)
+        self.speech = np.interp(
+            np.arange(int(len(self.speech) * rate / 24000)) * 24000 / rate,
+            np.arange(len(self.speech)),
+            self.speech,
+        ).astype(np.int16)
+        self.running = threading.Event()
+        self.thread = None
+
+    def start(self, callback):
+        self.stop()
+        self.running.set()
+        self.thread = threading.Thread(target=self.run, args=(callback,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def run(self, callback):
+        silence = np.zeros(self.chunk, dtype=np.int16)
+        utterance, position, was_listening = None, 0, False
+        spoken = 0
+        next_at = time.monotonic()
+        while self.running.is_set():
+            listening = self.session.state == "listening"
+            if listening and not was_listening and spoken < self.utterances:
+                utterance, position = self.speech, 0
+                spoken += 1
+            was_listening = listening
+
+            if utterance is not None and position < len(utterance):
+                block = utterance[position : position + self.chunk]
+                block = np.pad(block, (0, self.chunk - len(block)))
+                position += self.chunk
+            else:
+                block = silence
+            callback(block.reshape(-1, 1), self.chunk, None, None)
+
+            next_at += self.chunk / self.rate
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+
+def print_summary(title, summary):
+    print(f"\n📊 {title}")
+    if not summary:
+        print("  (no complete traces)")
+    for name, stats in summary.items():
+        print(
+            f"  {name:<10} p50 {stats['p50']:8.1f} ms   p95 {stats['p95']:8.1f} ms   n={stats['n']}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark Billy against the mock realtime API"
+    )
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--say", type=int, default=3)
+    parser.add_argument("--speech-seconds", type=float, default=1.5)
+    parser.add_argument(
+        "--cold", action="store_true", help="disable connection pre-warming"
+    )
+    parser.add_argument("--text-only", action="store_true", help="skip audio playback")
+    parser.add_argument(
+        "--motor-timeline", help="write the simulated motor timeline (.csv or .json)"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = await MockRealtimeServer(config_from_args(args)).start()
+    print(f"🧪 Mock realtime API on {server.uri}")
+
+    # Configure Billy before core.config is imported.
+    os.environ["OPENAI_REALTIME_URL"] = server.uri
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ["REALTIME_PREWARM"] = "false" if args.cold else "true"
+    os.environ["TEXT_ONLY_MODE"] = "true" if args.text_only else "false"
+    os.environ["MIC_TIMEOUT_SECONDS"] = "3"
+    os.environ["MQTT_HOST"] = ""
+    os.environ["TRACE_FILE"] = ""
+    # Benchmark responses must not replace the real sounds/response-history.
+    os.environ["RESPONSE_HISTORY_KEEP"] = "0"
+    os.environ["DEBUG_MODE"] = "false"
+    os.environ["MOTOR_DRIVER"] = "simulator"
+    if args.motor_timeline:
+        os.environ["MOTOR_TIMELINE_FILE"] = args.motor_timeline
+
+    from core import audio, movements, realtime, trace
+    from core.config import CHUNK_MS
+    from core.say import say
+    from core.session import BillySession
+
+    audio.MIC_RATE = 24000
+    audio.MIC_CHANNELS = 1
+    audio.CHUNK_SIZE = int(audio.MIC_RATE * CHUNK_MS / 1000)
+    movements.start_motor_watchdog()
+    await realtime.manager.prewarm()
+
+    started = time.perf_counter()
+    for _ in range(args.sessions):
+        if not args.cold:
+            # Let the next connection warm up, like an idle Billy would.
+            await asyncio.sleep(0.5)
+        press_time = time.monotonic()
+        trace.begin("conversation", start=press_time)
+        trace.mark("button", press_time)
+        session = BillySession(press_time=press_time)
+        session.mic = SyntheticMic(
+            session,
+            audio.MIC_RATE,
+            audio.CHUNK_SIZE,
+            args.speech_seconds,
+            utterances=args.follow_ups + 1,
+        )
+        await session.start()
+    session_seconds = time.perf_counter() - started
+    print_summary(
+        f"{args.sessions} conversation(s) in {session_seconds:.1f}s", trace.summary()
+    )
+
+    trace.history.clear()
+    say_times = []
+    for i in range(args.say):
+        trace.begin("say")
+        call = time.monotonic()
+        trace.mark("button", call)
+        await say(f"Benchmark message number {i}")
+        say_times.append((time.monotonic() - call) * 1000)
+        trace.finish()
+    if say_times:
+        heard = [
+            t.points["first_heard"] for t in trace.history if "first_heard" in t.points
+        ]
+        print(f"\n📊 {args.say} say() call(s)")
+        print(
+            f"  total      p50 {np.percentile(say_times, 50):8.1f} ms   p95 {np.percentile(say_times, 95):8.1f} ms"
+        )
+        if heard:
+            print(
+                f"  first_heard p50 {np.percentile(heard, 50):7.1f} ms   p95 {np.percentile(heard, 95):8.1f} ms"
+            )
+
+    motors = movements.driver.stats()
+    bus = movements.driver.bus_stats()
+    watchdog = movements.watchdog_stats()
+    print(
+        f"\n🐟 Motors: {bus['commands']} commands, {bus['redundant']} redundant dropped, "
+        f"{motors['commands']} changes in {bus['transactions']} bus transactions "
+        f"({bus['transactions'] / motors['seconds']:.1f}/s)"
+    )
+    for channel, stats in sorted(motors["channels"].items()):
+        trips = watchdog.get(channel, {})
+        print(
+            f"  pin {channel}: {stats['flaps']} flaps, duty cycle {stats['duty_cycle']:.1%}, "
+            f"{stats['commands']} commands, watchdog trips: "
+            f"{trips.get('max_on', 0)} max on, {trips.get('duty_cycle', 0)} duty cycle"
+        )
+
+    print(f"\n🧪 Mock server: {server.stats}")
+    print(
+        f"🔥 Pre-warm handovers: {realtime.manager.handovers}, cold starts: {realtime.manager.cold_starts}"
+    )
+    await realtime.manager._stop_keeper(close=True)  # pylint: disable=protected-access
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
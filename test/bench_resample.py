@@ -0,0 +1,113 @@
+"""
+Compare CPU cost of per-chunk FFT resampling (scipy.signal.resample) with the
+streaming polyphase resampler for the conversions Billy does on every chunk.
+
+Usage: python test/bench_resample.py [--seconds 20] [--chunk-ms 50]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.signal import resample
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.resample import StreamingResampler
+
+
+CONVERSIONS = [
+    ("playback 24k→48k", 24000, 48000),
+    ("mic 48k→24k", 48000, 24000),
+    ("mic 44.1k→24k", 44100, 24000),
+    ("mic 16k→24k", 16000, 24000),
+]
+
+
+def make_signal(rate, seconds):
+    t = np.arange(int(rate * seconds)) / rate
+    voiceish = np.sin(2 * np.pi * 180 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    noise = np.random.default_rng(0).normal(0, 0.05, t.size)
+    return (np.clip(voiceish + noise, -1, 1) * 12000).astype(np.int16)
+
+
+def run_fft(signal, src, dst, chunk):
+    out = []
+    for i in range(0, len(signal), chunk):
+        sub = signal[i : i + chunk]
+        out.append(resample(sub, int(len(sub) * dst / src)).astype(np.int16))
+    return np.concatenate(out)
+
+
+def run_streaming(signal, src, dst, chunk):
+    resampler = StreamingResampler(src, dst)
+    return np.concatenate([
+        resampler.process_int16(signal[i : i + chunk])
+        for i in range(0, len(signal), chunk)
+    ])
+
+
+def edge_error(fn, signal, src, dst, chunk):
+    """RMS difference between chunked output and resampling the signal in one go."""
+    chunked = fn(signal, src, dst, chunk).astype(np.float64)
+    whole = fn(signal, src, dst, len(signal)).astype(np.float64)
+    size = min(len(chunked), len(whole))
+    return np.sqrt(np.mean((chunked[:size] - whole[:size]) ** 2))
+
+
+def cpu_per_second(fn, signal, src, dst, chunk, seconds, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.process_time()
+        fn(signal, src, dst, chunk)
+        best = min(best, time.process_time() - start)
+    return best / seconds
+
+
+def check_passthrough():
+    """Equal rates must hand the input back untouched."""
+    signal = make_signal(24000, 1.0)
+    out = StreamingResampler(24000, 24000).process_int16(signal)
+    assert np.array_equal(out, signal), "24k→24k resampling changed the signal"
+    print("✅ 24k→24k passes audio through unchanged")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--chunk-ms", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    check_passthrough()
+
+    print(
+        f"⏱️ CPU seconds per second of audio ({args.chunk_ms} ms chunks, "
+        f"best of {args.repeats})"
+    )
+    print(
+        f"{'conversion':<20} {'fft/chunk':>12} {'polyphase':>12} {'speed-up':>10}"
+        f" {'fft edge err':>13} {'poly edge err':>14}"
+    )
+    for label, src, dst in CONVERSIONS:
+        signal = make_signal(src, args.seconds)
+        chunk = int(src * args.chunk_ms / 1000)
+        fft = cpu_per_second(
+            run_fft, signal, src, dst, chunk, args.seconds, args.repeats
+        )
+        poly = cpu_per_second(
+            run_streaming, signal, src, dst, chunk, args.seconds, args.repeats
+        )
+        fft_err = edge_error(run_fft, signal, src, dst, chunk)
+        poly_err = edge_error(run_streaming, signal, src, dst, chunk)
+        print(
+            f"{label:<20} {fft * 1000:>9.2f} ms {poly * 1000:>9.2f} ms"
+            f" {fft / poly:>9.1f}x {fft_err:>13.1f} {poly_err:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Local stand-in for the OpenAI realtime API, speaking the subset of the protocol
+Billy uses: session.update (including the pcm16/G.711 audio formats), input audio
+with a simple server VAD, conversation items, response.create/cancel and streamed
+audio/transcript deltas.
+
+Responses are synthetic (a voice-like tone with the configured transcript) or
+replayed from a recorded session (JSONL, optionally gzipped, one event per line or
+`{"t": seconds, "dir": "recv", "event": {...}}` records), with configurable delta
+size, pacing and jitter.
+
+Usage:
+    python test/mock_realtime.py [--port 8765] [--delta-ms 100] [--jitter-ms 20]
+    OPENAI_REALTIME_URL=ws://127.0.0.1:8765 OPENAI_API_KEY=mock python main.py
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import numpy as np
+import websockets.asyncio.server
+import websockets.exceptions
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core import codec
+
+
+RATE = 24000
+
+
+@dataclass
+class MockConfig:
+    delta_ms: int = 100  # audio per response.audio.delta
+    speed: float = 4.0  # how much faster than real time deltas are generated
+    jitter_ms: float = 0.0  # random extra delay per delta, 0..jitter_ms
+    first_delta_ms: float = 300.0  # "thinking" time before the first delta
+    response_seconds: float = 2.0  # length of a synthetic response
+    text: str = "Well hello there, I'm Billy Bass."
+    follow_up_text: str = "What else can I do for you?"
+    follow_ups: int = 0  # this many responses per connection end with a question
+    vad_threshold: float = 500.0  # RMS above which input audio counts as speech
+    silence_ms: int = 500  # quiet input after speech before speech_stopped
+    replay: list = field(default_factory=list)  # recorded responses, see load_replay
+    seed: int = 0
+
+
+def load_replay(path) -> list:
+    """
+    Split a recorded event stream into responses: lists of `(offset, event)` from
+    response.created to response.done, offsets relative to response.created.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    responses, current, start = [], None, 0.0
+    with opener(path, "rt") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "event" in record:
+                if record.get("dir", "recv") != "recv":
+                    continue
+                event, t = record["event"], float(record.get("t", i))
+            else:
+                event, t = record, float(i)
+
+            if event.get("type") == "response.created":
+                current, start = [], t
+            if current is not None:
+                current.append((t - start, event))
+            if event.get("type") == "response.done" and current is not None:
+                responses.append(current)
+                current = None
+    return responses
+
+
+def synthetic_speech(seconds, seed=0) -> np.ndarray:
+    """A vowel-ish tone with syllable-rate amplitude modulation, 24 kHz int16."""
+    t = np.arange(int(RATE * seconds)) / RATE
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    tone = np.sin(2 * np.pi * 140 * t) + 0.4 * np.sin(2 * np.pi * 280 * t)
+    noise = np.random.default_rng(seed).normal(0, 0.02, t.size)
+    return (np.clip(tone * syllables * 0.6 + noise, -1, 1) * 16000).astype(np.int16)
+
+
+class MockConnection:
+    def __init__(self, server, ws):
+        self.server = server
+        self.config = server.config
+        self.ws = ws
+        self.rng = random.Random(self.config.seed)
+        self.modalities = ["audio", "text"]
+        self.input_codec = codec.get("pcm16")
+        self.output_codec = codec.get("pcm16")
+        self.server_vad = False
+        self.speaking = False
+        self.quiet_ms = 0.0
+        self.responses = 0
+        self.response_task: asyncio.Task | None = None
+
+    async def send(self, event_type, **fields):
+        event = {
+            "type": event_type,
+            "event_id": f"event_{uuid.uuid4().hex[:16]}",
+            **fields,
+        }
+        await self.ws.send(json.dumps(event))
+        self.server.stats["events_sent"] += 1
+
+    async def run(self):
+        await self.send(
+            "session.created", session={"id": f"sess_{uuid.uuid4().hex[:12]}"}
+        )
+        async for message in self.ws:
+            data = json.loads(message)
+            self.server.stats["events_received"] += 1
+            handler = getattr(
+                self, "on_" + data.get("type", "").replace(".", "_"), None
+            )
+            if handler is None:
+                await self.send(
+                    "error",
+                    error={
+                        "type": "invalid_request_error",
+                        "code": "unknown_event",
+                        "message": f"Unsupported event type {data.get('type')!r}",
+                    },
+                )
+                continue
+            await handler(data)
+
+    async def on_session_update(self, data):
+        session = data.get("session", {})
+        self.modalities = session.get("modalities", self.modalities)
+        if "input_audio_format" in session:
+            self.input_codec = codec.get(session["input_audio_format"])
+        if "output_audio_format" in session:
+            self.output_codec = codec.get(session["output_audio_format"])
+        self.server_vad = (session.get("turn_detection") or {}).get("type") in (
+            "server_vad",
+            "semantic_vad",
+        )
+        await self.send("session.updated", session=session)
+
+    async def on_session_end(self, _data):
+        await self.ws.close()
+
+    async def on_input_audio_buffer_append(self, data):
+        payload = base64.b64decode(data["audio"])
+        self.server.stats["input_bytes"] += len(payload)
+        pcm = self.input_codec.decode(payload)
+        ms = len(pcm) * 1000 / self.input_codec.rate
+        self.server.stats["input_ms"] += ms
+        if not self.server_vad or not len(pcm):
+            return
+
+        rms = float(np.sqrt(np.mean(np.square(pcm, dtype=np.float64))))
+        if rms > self.config.vad_threshold:
+            self.quiet_ms = 0.0
+            if not self.speaking:
+                self.speaking = True
+                await self.send("input_audio_buffer.speech_started")
+        elif self.speaking:
+            self.quiet_ms += ms
+            if self.quiet_ms >= self.config.silence_ms:
+                self.speaking = False
+                await self.send("input_audio_buffer.speech_stopped")
+                await self.send("input_audio_buffer.committed")
+                self.start_response()
+
+    async def on_input_audio_buffer_commit(self, _data):
+        await self.send("input_audio_buffer.committed")
+
+    async def on_input_audio_buffer_clear(self, _data):
+        self.speaking = False
+        await self.send("input_audio_buffer.cleared")
+
+    async def on_conversation_item_create(self, data):
+        await self.send("conversation.item.created", item=data.get("item", {}))
+
+    async def on_response_create(self, data):
+        modalities = (data.get("response") or {}).get("modalities")
+        self.start_response(modalities)
+
+    async def on_response_cancel(self, _data):
+        if self.response_task and not self.response_task.done():
+            self.response_task.cancel()
+
+    def start_response(self, modalities=None):
+        if self.response_task and not self.response_task.done():
+            self.response_task.cancel()
+        self.response_task = asyncio.create_task(
+            self.respond(modalities or self.modalities)
+        )
+
+    async def respond(self, modalities):
+        self.responses += 1
+        self.server.stats["responses"] += 1
+        if self.config.replay:
+            replay = self.config.replay[(self.responses - 1) % len(self.config.replay)]
+            await self.replay(replay)
+        else:
+            await self.synthesize(modalities)
+
+    async def replay(self, events):
+        started = time.monotonic()
+        for offset, event in events:
+            delay = started + offset - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.ws.send(json.dumps(event))
+            self.server.stats["events_sent"] += 1
+            if event.get("type") == "response.audio.delta":
+                self.server.stats["deltas"] += 1
+
+    async def synthesize(self, modalities):
+        config = self.config
+        response_id = f"resp_{uuid.uuid4().hex[:12]}"
+        text = (
+            config.follow_up_text
+            if self.responses <= config.follow_ups
+            else config.text
+        )
+        audio = "audio" in modalities
+
+        await self.send(
+            "response.created", response={"id": response_id, "status": "in_progress"}
+        )
+        await asyncio.sleep(config.first_delta_ms / 1000)
+
+        pcm = (
+            synthetic_speech(config.response_seconds, self.responses) if audio else None
+        )
+        step = int(RATE * config.delta_ms / 1000)
+        encoder = codec.Encoder(self.output_codec, RATE)
+        count = max(1, -(-len(pcm) // step)) if audio else len(text.split())
+        words = text.split(" ")
+        per_delta = -(-len(words) // count)
+        interval = config.delta_ms / 1000 / config.speed
+
+        for i in range(count):
+            if audio:
+                chunk = encoder.encode(pcm[i * step : (i + 1) * step])
+                self.server.stats["output_bytes"] += len(chunk)
+                await self.send(
+                    "response.audio.delta",
+                    response_id=response_id,
+                    delta=base64.b64encode(chunk).decode("utf-8"),
+                )
+                self.server.stats["deltas"] += 1
+            piece = " ".join(words[i * per_delta : (i + 1) * per_delta])
+            if piece:
+                await self.send(
+                    "response.audio_transcript.delta"
+                    if audio
+                    else "response.text.delta",
+                    response_id=response_id,
+                    delta=piece + ("" if (i + 1) * per_delta >= len(words) else " "),
+                )
+            await asyncio.sleep(interval + self.rng.uniform(0, config.jitter_ms) / 1000)
+
+        if audio:
+            await self.send("response.audio.done", response_id=response_id)
+            await self.send(
+                "response.audio_transcript.done",
+                response_id=response_id,
+                transcript=text,
+            )
+        else:
+            await self.send("response.text.done", response_id=response_id, text=text)
+        await self.send(
+            "response.done",
+            response={"id": response_id, "status": "completed", "status_details": None},
+        )
+
+
+class MockRealtimeServer:
+    def __init__(self, config: MockConfig | None = None):
+        self.config = config or MockConfig()
+        self.server = None
+        self.stats = {
+            "connections": 0,
+            "events_received": 0,
+            "events_sent": 0,
+            "input_ms": 0.0,
+            "input_bytes": 0,
+            "output_bytes": 0,
+            "responses": 0,
+            "deltas": 0,
+        }
+
+    @property
+    def uri(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await websockets.asyncio.server.serve(self.handle, host, port)
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, ws):
+        self.stats["connections"] += 1
+        connection = MockConnection(self, ws)
+        try:
+            await connection.run()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if connection.response_task:
+                connection.response_task.cancel()
+
+
+def add_arguments(parser):
+    defaults = MockConfig()
+    parser.add_argument("--delta-ms", type=int, default=defaults.delta_ms)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=defaults.speed,
+        help="delta generation speed relative to real time",
+    )
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--first-delta-ms", type=float, default=defaults.first_delta_ms)
+    parser.add_argument(
+        "--response-seconds", type=float, default=defaults.response_seconds
+    )
+    parser.add_argument("--follow-ups", type=int, default=defaults.follow_ups)
+    parser.add_argument("--silence-ms", type=int, default=defaults.silence_ms)
+    parser.add_argument(
+        "--replay", help="recorded session (.jsonl or .jsonl.gz) to replay"
+    )
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(
+        delta_ms=args.delta_ms,
+        speed=args.speed,
+        jitter_ms=args.jitter_ms,
+        first_delta_ms=args.first_delta_ms,
+        response_seconds=args.response_seconds,
+        follow_ups=args.follow_ups,
+        silence_ms=args.silence_ms,
+        replay=load_replay(args.replay) if args.replay else [],
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = await MockRealtimeServer(config_from_args(args)).start(
+        args.host, args.port
+    )
+    print(f"🧪 Mock realtime API listening on {server.uri}")
+    try:
+        await asyncio.Future()
+    finally:
+        print(f"📊 {server.stats}")
+        await server.stop()
+
+
+if __name__ == "__main__":
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(main())
@@ -0,0 +1,227 @@
+"""
+Shared setup for running Billy's playback path offline (test/replay.py,
+test/replay_session.py): no sound card, network or MQTT, and motors go to the
+simulated driver (core.motors.SimulatedDriver).
+
+Import this before anything from `core`, since it configures the environment
+core.config reads.
+"""
+
+import heapq
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Nothing may leave the machine or overwrite local state.
+os.environ["MQTT_HOST"] = ""
+os.environ["REALTIME_PREWARM"] = "false"
+os.environ["TRACE_FILE"] = ""
+os.environ["SESSION_RECORD_DIR"] = ""
+os.environ["DEBUG_MODE"] = "false"
+os.environ["TEXT_ONLY_MODE"] = "false"
+os.environ["MOTOR_DRIVER"] = "simulator"
+os.environ["MOTOR_TIMELINE_FILE"] = ""
+
+from virtual_output import VirtualOutputStream
+
+from core import audio, movements
+from core.config import CHUNK_MS, OUTPUT_BUFFER_MS
+from core.motor_scheduler import MotorScheduler
+from core.motors import SimulatedDriver
+from core.output import OutputEngine
+
+
+def start_virtual_output(speed=0.0, path=None) -> OutputEngine:
+    """
+    Point the playback worker at a virtual sink running at `speed` times real time
+    (0 = unthrottled), writing to the WAV file `path` if given, and start it.
+    """
+    # Responses are saved as usual, just not over the real response history.
+    audio.RESPONSE_HISTORY_DIR = tempfile.mkdtemp(prefix="billy-replay-")
+    audio.response_archiver.directory = audio.RESPONSE_HISTORY_DIR
+    audio.output_engine = OutputEngine(
+        samplerate=48000,
+        channels=2,
+        buffer_ms=OUTPUT_BUFFER_MS,
+        stream_factory=lambda **kw: VirtualOutputStream(speed=speed, path=path, **kw),
+        speed=speed,
+    )
+    audio.output_engine.start()
+    audio.ensure_playback_worker_started(CHUNK_MS)
+    return audio.output_engine
+
+
+class VirtualScheduler(MotorScheduler):
+    """
+    The motor scheduler's rules (priorities, coalescing) on a virtual clock: events
+    fire only as `advance` reaches them, into a SimulatedDriver on the same clock,
+    so flaps, duty cycle and bus transactions come out as they would in real time
+    however fast the replay runs. The watchdog is the driver's `max_on`.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.driver = SimulatedDriver(
+            max_on=movements.WATCHDOG_TIMEOUT_SEC, clock=lambda: self.now
+        )
+        super().__init__(self.driver.set_many)
+
+    def _ensure_thread(self):
+        pass  # driven by advance()
+
+    def advance(self, until):
+        """Fire everything due up to `until`, in order, at its own time."""
+        while True:
+            with self._cond:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap or self._heap[0].at > until:
+                    break
+                self.now = self._heap[0].at
+                changes = self._take_due(self.now)
+            if changes:
+                self.apply(changes)
+        self.now = max(self.now, until)
+
+    def last_due(self) -> float:
+        """When the last pending event is due, or now if none is."""
+        with self._cond:
+            return max(
+                (event.at for event in self._heap if not event.cancelled),
+                default=self.now,
+            )
+
+
+class TimelineRecorder:
+    """
+    Places every motor command on the audio timeline as it is scheduled and hands
+    it on to the real scheduler at the matching wall-clock time. Since that one
+    coalesces whatever is due together (all of it at --speed 0), a VirtualScheduler
+    gets the same commands (and cancellations) on the audio clock, so its driver
+    holds what would actually be applied, in seconds of audio: that is what the
+    stats and the written timeline report, at any --speed.
+
+    Throttles are in percent, as scheduled. The live watchdog's stops are left out;
+    the virtual driver trips on its own.
+    """
+
+    def __init__(self, scheduler, engine, speed):
+        self.engine = engine
+        self.speed = speed
+        self.scheduled = 0
+        self.virtual = VirtualScheduler()
+        self.driver = self.virtual.driver
+        # Commands come from the playback thread, cancellations from the event loop.
+        self._lock = threading.Lock()
+        self._schedule = scheduler.schedule
+        self._cancel = scheduler.cancel
+        self._release = scheduler.release
+        scheduler.schedule = self.schedule
+        scheduler.cancel = self.cancel
+        scheduler.release = self.release
+
+    def audio_time(self, at):
+        # Playback commands are planned on the output stream's (virtual) clock
+        # against playout_time(), when the next frame written is heard, so the
+        # frames written so far anchor them to the audio at any speed.
+        written = self.engine.ring.written / self.engine.samplerate
+        return written + at - self.engine.playout_time()
+
+    def schedule(self, at, pin, throttle, priority=movements.PRIORITY_SPEECH, tag=None):
+        now = self.engine.clock()
+        at = now if at is None else at
+        self.scheduled += 1
+        if tag != "watchdog":
+            with self._lock:
+                self.virtual.advance(self.audio_time(now))
+                self.virtual.schedule(self.audio_time(at), pin, throttle, priority, tag)
+
+        delay = (at - now) / self.speed if self.speed > 0 else 0
+        return self._schedule(
+            time.monotonic() + max(delay, 0), pin, throttle, priority, tag
+        )
+
+    def cancel(self, tag=None, pin=None, below=None):
+        self._cancel(tag, pin, below)
+        with self._lock:
+            self.virtual.advance(self.audio_time(self.engine.clock()))
+            self.virtual.cancel(tag, pin, below)
+
+    def release(self, pin=None):
+        self._release(pin)
+        with self._lock:
+            self.virtual.advance(self.audio_time(self.engine.clock()))
+            self.virtual.release(pin)
+
+    def finish(self):
+        """Play the virtual schedule out to its last event and the end of the audio."""
+        end = self.engine.ring.written / self.engine.samplerate
+        with self._lock:
+            self.virtual.advance(max(end, self.virtual.last_due()))
+
+    def write(self, path):
+        """Write the applied timeline as CSV, or JSON if `path` ends in .json."""
+        self.driver.dump(path)
+
+    def show(self, limit=20):
+        timeline = sorted(self.driver.timeline, key=lambda e: e[0])
+        for at, pin, throttle in timeline[:limit]:
+            print(f"  {at:8.3f}s pin {pin} → {throttle}")
+        if len(timeline) > limit:
+            print(
+                f"  ... {len(timeline) - limit} more (use --timeline to write them all)"
+            )
+
+
+def show_motor_stats(driver):
+    """Commands, flaps and duty cycle per channel, as `driver` applied them."""
+    stats = driver.stats()
+    for channel, channel_stats in sorted(stats["channels"].items()):
+        print(
+            f"  pin {channel}: {channel_stats['commands']} commands, "
+            f"{channel_stats['flaps']} flaps, "
+            f"duty cycle {channel_stats['duty_cycle']:.1%}"
+        )
+    bus = driver.bus_stats()
+    print(
+        f"  driver: {bus['commands']} commands, {bus['redundant']} redundant dropped, "
+        f"{bus['transactions']} bus transactions"
+    )
+    if stats["watchdog_trips"]:
+        print(f"  ⚠️ watchdog trips: {stats['watchdog_trips']}")
+
+
+def show_motors(timeline, scheduler, speed, path=None):
+    """The motor report of the replay tools; `path` gets the applied timeline."""
+    timeline.finish()
+    print(
+        f"\n🐟 Motor commands: {timeline.scheduled} scheduled, "
+        f"{scheduler.fired} fired, {scheduler.skipped} skipped"
+    )
+    print("  applied on the audio clock:")
+    show_motor_stats(timeline.driver)
+    if speed > 0:
+        print(f"  live driver, at {speed}x real time:")
+        show_motor_stats(movements.driver)
+    if path:
+        timeline.write(path)
+        print(f"  applied timeline written to {path}")
+    else:
+        timeline.show()
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -1,69 +1,128 @@
+"""
+Offline render benchmark: push a WAV file or the response audio of a recorded
+session through the playback worker's DSP chain and lip-sync planner into a null
+or WAV file sink, with simulated motors, and report the real-time factor, CPU
+time per chunk, peak RSS and the motor timeline. No sound card or I2C bus needed.
+
+Usage: python test/replay.py [input.wav | session.jsonl.gz] [--out rendered.wav]
+                             [--speed 0] [--gain 1.0] [--timeline motors.csv]
+
+Without an input, sounds/response-history/response-1.wav is rendered.
+"""
+
+import argparse
+import base64
 import os
 import sys
+import time
 import wave
 
 import numpy as np
-from scipy.signal import resample
-
-
-# Add parent directory to sys.path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
-import core.movements
-from core.audio import (
-    CHUNK_MS,
-    RESPONSE_HISTORY_DIR,
-    detect_devices,
-    ensure_playback_worker_started,
-    play_random_wake_up_clip,
-    playback_done_event,
-    playback_queue,
+from offline import (
+    TimelineRecorder,
+    peak_rss_mb,
+    percentile,
+    show_motors,
+    start_virtual_output,
 )
 
-
-# Detect audio devices and start playback worker
-detect_devices()
-ensure_playback_worker_started(CHUNK_MS)
-
-# 🐟 Play a random wake-up clip first
-wake_up_clip = play_random_wake_up_clip()
-if wake_up_clip:
-    print(f"🎤 Playing wake-up clip: {wake_up_clip}")
-    playback_queue.join()  # Wait for clip to finish
-
-# 🎧 Now play the response-1.wav
-file_path = os.path.join(RESPONSE_HISTORY_DIR, "response-1.wav")
-if not os.path.exists(file_path):
-    print("❌ No response-1.wav found.")
-    exit(1)
-
-GAIN = 1.5  # Example: +50% louder
-
-with wave.open(file_path, 'rb') as wf:
-    rate = wf.getframerate()
-    channels = wf.getnchannels()
-    print(f"🎧 Playing back: {file_path} ({rate} Hz, {channels} channel(s))")
-
-    chunk_size = int(24000 * CHUNK_MS / 1000)
-    while True:
-        frames = wf.readframes(chunk_size)
-        if not frames:
-            break
-        samples = np.frombuffer(frames, dtype=np.int16)
-
-        if channels == 2:
-            samples = samples.reshape((-1, 2)).mean(axis=1).astype(np.int16)
-
-        if rate != 24000:
-            new_len = int(len(samples) * 24000 / rate)
-            samples = resample(samples, new_len).astype(np.int16)
-
-        # 🎛 Apply Gain
-        samples = np.clip(samples * GAIN, -32768, 32767).astype(np.int16)
-
-        playback_queue.put(samples.tobytes())
-
-playback_queue.put(None)  # Signal end of playback
-playback_done_event.wait()
-core.movements.stop_all_motors()
-print("✅ Playback complete.")
+from core import audio, codec, movements, recorder
+from core.config import CHUNK_MS
+from core.resample import StreamingResampler
+
+
+DEFAULT_INPUT = os.path.join(audio.RESPONSE_HISTORY_DIR, "response-1.wav")
+
+
+def wav_deltas(path, gain=1.0):
+    """24 kHz mono PCM16 in CHUNK_MS pieces, like realtime audio deltas."""
+    with wave.open(path, 'rb') as wf:
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    print(f"🎧 Rendering {path} ({rate} Hz, {channels} channel(s))")
+
+    mono = samples.reshape((-1, channels)).mean(axis=1, dtype=np.float32) * gain
+    pcm = StreamingResampler(rate, 24000).process_int16(mono)
+    step = int(24000 * CHUNK_MS / 1000)
+    return [pcm[i : i + step].tobytes() for i in range(0, len(pcm), step)]
+
+
+def recorded_deltas(path):
+    """The response audio deltas Billy received in a recorded session, as PCM16."""
+    records = recorder.load(path)
+    meta = next((r["event"] for r in records if r["dir"] == "meta"), {})
+    decoder = codec.Decoder(codec.get(meta.get("audio_codec", "pcm16")))
+    print(f"🎞️ Rendering response audio from {path} ({decoder.codec.name})")
+    return [
+        decoder.decode(base64.b64decode(record["event"]["delta"]))
+        for record in records
+        if record["dir"] == "recv"
+        and record["event"].get("type") == "response.audio.delta"
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", nargs="?", default=DEFAULT_INPUT)
+    parser.add_argument("--out", help="write the rendered 48 kHz stereo audio here")
+    parser.add_argument(
+        "--speed", type=float, default=0.0, help="sink speed, 0 = unthrottled"
+    )
+    parser.add_argument(
+        "--gain", type=float, default=1.0, help="gain applied to WAV input"
+    )
+    parser.add_argument(
+        "--timeline", help="write the applied motor timeline (.csv or .json)"
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ {args.input} not found.")
+        sys.exit(1)
+    if args.input.endswith((".jsonl", ".jsonl.gz")):
+        deltas = recorded_deltas(args.input)
+    else:
+        deltas = wav_deltas(args.input, args.gain)
+
+    engine = start_virtual_output(args.speed, args.out)
+    timeline = TimelineRecorder(movements.scheduler, engine, args.speed)
+    audio.chunk_cpu.clear()
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    for delta in deltas:
+        audio.playback_queue.put(delta)
+    done = audio.playback_mark().wait()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    engine.close()
+
+    seconds = engine.ring.written / engine.samplerate
+    chunk_us = np.asarray(list(audio.chunk_cpu)[: len(deltas)]) * 1e6
+    chunk_ms = seconds * 1000 / max(len(deltas), 1)
+
+    print(
+        f"\n📊 {seconds:.2f}s of audio in {len(deltas)} chunks ({chunk_ms:.0f} ms each)"
+        f"{'' if done else ' (playback did not complete)'}"
+    )
+    print(
+        f"  wall {wall:.3f}s → {seconds / wall:.1f}x real time (RTF {wall / seconds:.4f})"
+    )
+    print(f"  CPU  {cpu:.3f}s → RTF {cpu / seconds:.4f} (all threads)")
+    print(
+        f"  CPU per chunk: p50 {percentile(chunk_us, 50):.0f} µs, "
+        f"p95 {percentile(chunk_us, 95):.0f} µs, p99 {percentile(chunk_us, 99):.0f} µs, "
+        f"max {chunk_us.max(initial=0):.0f} µs "
+        f"({percentile(chunk_us, 50) / 10 / chunk_ms:.2f}% of a core at p50)"
+    )
+    print(f"  peak RSS {peak_rss_mb():.1f} MB")
+    print(f"  output stats: {engine.stats()}")
+    if args.out:
+        print(f"  rendered audio written to {args.out}")
+
+    show_motors(timeline, movements.scheduler, args.speed, args.timeline)
+
+    movements.stop_all_motors()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Replay a recorded realtime session (see SESSION_RECORD_DIR) through
+BillySession.handle_message, the playback worker, the output engine and the
+lip-sync planner, with no network, sound card or motor hardware, and report:
+
+- CPU time per event type spent on the event loop (decode + handle_message)
+- CPU time of everything else (playback worker, lip-sync, motor scheduler)
+- playback queue and output buffer depths
+- the motor command timeline, in seconds of audio
+
+Usage: python test/replay_session.py session-....jsonl.gz [--speed 0] [--timeline out.csv]
+
+--speed is relative to real time for both the event stream and the output sink;
+0 (default) runs as fast as possible.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+from offline import (
+    TimelineRecorder,
+    peak_rss_mb,
+    percentile,
+    show_motors,
+    start_virtual_output,
+)
+
+from core import audio, events, movements, recorder
+from core.session import BillySession
+from core.uplink import MicUplink
+
+
+# Tool calls would reach Home Assistant or start a song; they're counted, not run.
+SKIPPED_EVENTS = ("response.function_call_arguments.done",)
+
+
+class NullSocket:
+    """Takes the place of the websocket; outbound events are only counted."""
+
+    def __init__(self):
+        self.sent = defaultdict(int)
+
+    async def send(self, message):
+        self.sent[json.loads(message).get("type", "?")] += 1
+
+    async def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+async def replay(records, speed):
+    engine = audio.output_engine
+    session = BillySession()
+    session.loop = asyncio.get_running_loop()
+    socket = NullSocket()
+    session.ws = socket
+    session.uplink = MicUplink(24000, session.send_mic_audio)
+    session.session_active.set()
+    # The silence timeout and its tail wiggles run on wall-clock time, which means
+    # nothing in a replay.
+    session.arm_silence_timer = lambda: None
+
+    cpu = defaultdict(float)
+    counts = defaultdict(int)
+    queue_depths, buffered_ms = [], []
+    skipped = 0
+    mic_ms = 0.0
+
+    started = time.monotonic()
+    for record in records:
+        event = record["event"]
+        if record["dir"] == "send":
+            if event.get("type") == "input_audio_buffer.append":
+                mic_ms += len(event.get("audio", "")) * 3 / 4 / 2 / 24
+            continue
+        if record["dir"] != "recv":
+            continue
+        if event.get("type") in SKIPPED_EVENTS:
+            skipped += 1
+            continue
+
+        if speed > 0:
+            delay = started + record["t"] / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        message = json.dumps(event)
+        begin = time.thread_time()
+        data = events.parse(message)
+        await session.handle_message(data)
+        cpu[data["type"]] += time.thread_time() - begin
+        counts[data["type"]] += 1
+
+        queue_depths.append(audio.playback_queue.qsize())
+        buffered_ms.append(engine.buffered_seconds() * 1000)
+
+    # Let everything queued play out through the sink.
+    await audio.playback_mark()
+    session.cancel_silence_timer()
+    return {
+        "cpu": cpu,
+        "counts": counts,
+        "queue_depths": queue_depths,
+        "buffered_ms": buffered_ms,
+        "skipped": skipped,
+        "mic_ms": mic_ms,
+        "sent": dict(socket.sent),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a recorded realtime session offline"
+    )
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=0.0)
+    parser.add_argument(
+        "--timeline", help="write the applied motor timeline (.csv or .json)"
+    )
+    args = parser.parse_args()
+
+    records = recorder.load(args.recording)
+    meta = next((r["event"] for r in records if r["dir"] == "meta"), {})
+    print(f"🎞️ Replaying {args.recording}: {len(records)} records, {meta}")
+
+    engine = start_virtual_output(args.speed)
+    timeline = TimelineRecorder(movements.scheduler, engine, args.speed)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = asyncio.run(replay(records, args.speed))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    audio_seconds = engine.ring.written / engine.samplerate
+    loop_cpu = sum(result["cpu"].values())
+
+    print(
+        f"\n📊 {sum(result['counts'].values())} events in {wall:.2f}s wall, {cpu:.2f}s CPU"
+    )
+    print(
+        f"  audio played: {audio_seconds:.1f}s ({audio_seconds / wall:.1f}x real time)"
+    )
+    print(f"  mic audio in recording: {result['mic_ms'] / 1000:.1f}s")
+    print(f"  tool calls skipped: {result['skipped']}")
+    print("\n⏱️ Event loop CPU per event type:")
+    for name, seconds in sorted(result["cpu"].items(), key=lambda kv: -kv[1]):
+        count = result["counts"][name]
+        print(
+            f"  {name:<40} {count:6d} × {seconds / count * 1e6:8.1f} µs = {seconds * 1000:8.1f} ms"
+        )
+    print(
+        f"  other threads (playback, lip-sync, motors): {(cpu - loop_cpu) * 1000:.1f} ms"
+    )
+
+    print("\n📦 Depths after each event:")
+    depths, buffered = result["queue_depths"], result["buffered_ms"]
+    print(
+        f"  playback queue  p50 {percentile(depths, 50):6.1f}  p95 {percentile(depths, 95):6.1f}  max {max(depths, default=0)}"
+    )
+    print(
+        f"  output buffer   p50 {percentile(buffered, 50):6.1f}  p95 {percentile(buffered, 95):6.1f}  max {max(buffered, default=0):.1f} ms"
+    )
+    print(f"  output stats: {engine.stats()}")
+    print(f"  peak RSS {peak_rss_mb():.1f} MB")
+
+    show_motors(timeline, movements.scheduler, args.speed, args.timeline)
+
+    engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Regression test: one conversation turn in which the assistant calls a tool.
+
+The response carrying the function call has no text or audio. The conversation
+must stay open until the tool's result has been sent back and the model has
+answered it, instead of ending (and cancelling the tool) as soon as that empty
+response is done.
+
+Runs offline (see test/offline.py) against a scripted websocket, with a stand-in
+for Home Assistant that is still busy when the function-call response is done.
+
+Usage: python test/test_tool_turn.py   (or: pytest test/test_tool_turn.py)
+"""
+
+import asyncio
+import json
+
+from offline import start_virtual_output
+
+from core import session as session_module
+from core.session import LISTENING, BillySession
+from core.uplink import MicUplink
+
+
+HA_SPEECH = "Turned on the kitchen light."
+REPLY = "The kitchen light is on now."
+
+
+class ScriptedSocket:
+    """Plays the server's side: answers a response.create with a short reply."""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+
+    def push(self, event_type, **fields):
+        self.incoming.put_nowait(json.dumps({"type": event_type, **fields}))
+
+    async def send(self, message):
+        event = json.loads(message)
+        self.sent.append(event)
+        if event["type"] == "response.create":
+            self.push("response.created", response={"id": "resp_2"})
+            self.push("response.text.delta", delta=REPLY)
+            self.push("response.done", response={"id": "resp_2", "status": "completed"})
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self):
+        self.incoming.put_nowait(None)
+
+    async def wait_closed(self):
+        pass
+
+
+async def home_assistant(prompt):
+    await asyncio.sleep(0.3)
+    return {"speech": {"plain": {"speech": HA_SPEECH}}, "data": {}}
+
+
+async def play_tool_turn():
+    session_module.send_conversation_prompt = home_assistant
+    session = BillySession()
+    session.loop = asyncio.get_running_loop()
+    session.ws = ws = ScriptedSocket()
+    session.uplink = MicUplink(24000, session.send_mic_audio)
+    session.session_active.set()
+    stream = asyncio.create_task(session.run_stream())
+
+    ws.push("response.created", response={"id": "resp_1"})
+    ws.push(
+        "response.function_call_arguments.done",
+        call_id="call_1",
+        name="smart_home_command",
+        arguments=json.dumps({"prompt": "turn on the kitchen light"}),
+    )
+    ws.push(
+        "response.done",
+        response={
+            "id": "resp_1",
+            "status": "completed",
+            "output": [{"type": "function_call", "call_id": "call_1"}],
+        },
+    )
+
+    # finish_turn counts the turn before it is back to listening.
+    for _ in range(100):
+        if session.turns and session.state == LISTENING:
+            break
+        if not session.session_active.is_set():
+            break
+        await asyncio.sleep(0.05)
+    result = {
+        "active": session.session_active.is_set(),
+        "state": session.state,
+        "turns": session.turns,
+        "sent": ws.sent,
+    }
+    await session.stop_session()
+    await stream
+    return result
+
+
+def test_tool_call_turn():
+    start_virtual_output()
+    result = asyncio.run(play_tool_turn())
+
+    outputs = [
+        event["item"]
+        for event in result["sent"]
+        if event["type"] == "conversation.item.create"
+        and event["item"]["type"] == "function_call_output"
+    ]
+    assert len(outputs) == 1, result["sent"]
+    assert outputs[0]["call_id"] == "call_1"
+    assert json.loads(outputs[0]["output"]) == {"speech": HA_SPEECH}
+    assert [e["type"] for e in result["sent"]][-1] == "response.create"
+
+    assert result["active"], "the conversation ended during the tool call"
+    assert result["turns"] == 1
+    assert result["state"] == LISTENING
+
+
+if __name__ == "__main__":
+    test_tool_call_turn()
+    print("✅ Tool-call turn: result sent, answered, listening again")
@@ -0,0 +1,119 @@
+"""
+A stand-in for sounddevice's OutputStream, so the playback path can run offline
+(see test/offline.py), at any speed and without a sound card.
+"""
+
+import threading
+import time
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class VirtualOutputStream:
+    """
+    Stands in for `sd.OutputStream` where there is no sound card: a thread pulls
+    buffers through the callback at `speed` times real time (0 = as fast as the
+    producers keep up), so the whole playback path can run offline.
+
+    Time on a virtual stream is counted in frames pulled (`clock`), so playout
+    times, and the lip-sync planned against them, come out the same at any speed.
+    Audio is dropped, or written to a WAV file if `path` is given.
+    """
+
+    def __init__(
+        self,
+        samplerate=48000,
+        channels=2,
+        dtype='int16',
+        device=None,  # pylint: disable=unused-argument
+        blocksize=0,
+        callback=None,
+        speed=1.0,
+        latency=0.0,
+        path=None,
+    ):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self.blocksize = blocksize or 1024
+        self.callback = callback
+        self.speed = speed
+        self.latency = latency
+        self.path = path
+        self.frames = 0
+        self._wav = None
+        # Unthrottled streams only pull whole buffers of queued frames (or the rest
+        # once producers go quiet), so their clock doesn't race ahead through
+        # silence. Reports queued frames; set by OutputEngine.
+        self.pending = None
+        self._start = time.monotonic()
+        self._running = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self) -> bool:
+        return self._running.is_set()
+
+    def clock(self) -> float:
+        """Stream time: when the stream started plus the audio pulled since."""
+        return self._start + self.frames / self.samplerate
+
+    def start(self):
+        if self.path and self._wav is None:
+            # Stays open from start() to close(), like the stream it stands in for.
+            self._wav = wave.open(self.path, 'wb')  # noqa: SIM115
+            self._wav.setnchannels(self.channels)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(self.samplerate)
+        self._start = time.monotonic() - self.frames / self.samplerate
+        self._running.set()
+        self._thread = threading.Thread(
+            target=self._run, name="billy-virtual-output", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+    def consume(self, buffer):
+        """Called with each buffer the callback filled."""
+        if self._wav is not None:
+            self._wav.writeframes(buffer.tobytes())
+
+    def _run(self):
+        buffer = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+        status = SimpleNamespace(output_underflow=False)
+        period = self.blocksize / self.samplerate
+        next_at = time.monotonic()
+        last_pending, settled_at = 0, 0.0
+        while self._running.is_set():
+            if self.speed <= 0 and self.pending is not None:
+                pending = self.pending()
+                if pending != last_pending:
+                    last_pending, settled_at = pending, time.monotonic() + 0.005
+                if pending < self.blocksize and (
+                    not pending or time.monotonic() < settled_at
+                ):
+                    time.sleep(0.001)
+                    continue
+
+            now = self.clock()
+            info = SimpleNamespace(
+                currentTime=now, outputBufferDacTime=now + self.latency
+            )
+            self.callback(buffer, self.blocksize, info, status)
+            self.frames += self.blocksize
+            self.consume(buffer)
+
+            if self.speed > 0:
+                next_at += period / self.speed
+                time.sleep(max(0.0, next_at - time.monotonic()))